@@ -3,8 +3,8 @@ AI-powered website analysis and automation recommendations
 """
 import os
 import json
-from typing import List
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+import time
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from .schema import (
     WebsiteExtraction, 
     WebsiteAnalysis, 
@@ -14,6 +14,12 @@ from .schema import (
     Priority,
     WorkflowConfig
 )
+from .llm_cache import llm_cache, make_key, prompt_version, estimate_tokens
+from .single_flight import analysis_flights
+from .stream_parser import AnalysisStreamParser
+from .llm_stream import streaming_enabled, stream_chat_completion
+from services.llm_gateway import llm_gateway, LLMPriority
+from services.llm_metrics import llm_metrics
 
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY', 'sk-emergent-057Bd2801D88b71Ce3')
 
@@ -77,13 +83,13 @@ Response format (JSON):
 }
 """
 
-async def analyze_website_for_automations(extraction: WebsiteExtraction) -> WebsiteAnalysis:
-    """
-    Use AI to analyze website and recommend automations
-    Uses dual-model approach: GPT-4 + Claude for best results
-    """
-    
-    # Prepare website summary for AI
+ANALYSIS_MODEL = "gpt-4o"
+# Cached analyses are only reused while SYSTEM_PROMPT is unchanged
+SYSTEM_PROMPT_VERSION = prompt_version(SYSTEM_PROMPT)
+STREAM_QUEUE_TIMEOUT = float(os.environ.get('ANALYSIS_STREAM_QUEUE_TIMEOUT', '30'))  # Max seconds a stream waits for a model slot
+
+def _build_prompt(extraction: WebsiteExtraction) -> str:
+    """Prepare website summary for AI"""
     website_summary = f"""
 Website: {extraction.url}
 Title: {extraction.title}
@@ -107,19 +113,48 @@ Content Sample:
 {extraction.content_text[:1000]}
 """
     
-    # Call GPT-4 for analysis
-    chat = LlmChat(
-        api_key=EMERGENT_LLM_KEY,
-        session_id=f"website-analysis-{hash(extraction.url)}",
-        system_message=SYSTEM_PROMPT
-    ).with_model("openai", "gpt-4o")
+    return f"Analyze this website and recommend 5-8 high-value automations:\n\n{website_summary}\n\nReturn valid JSON only."
+
+
+async def analyze_website_for_automations(
+    extraction: WebsiteExtraction,
+    priority: LLMPriority = LLMPriority.BACKGROUND
+) -> WebsiteAnalysis:
+    """
+    Use AI to analyze website and recommend automations
+    Uses dual-model approach: GPT-4 + Claude for best results
+    """
+    prompt = _build_prompt(extraction)
     
-    user_message = UserMessage(
-        text=f"Analyze this website and recommend 5-8 high-value automations:\n\n{website_summary}\n\nReturn valid JSON only."
+    # Identical prompt, model and system prompt -> reuse the earlier (or in-flight) analysis
+    cache_key = make_key(ANALYSIS_MODEL, SYSTEM_PROMPT_VERSION, prompt)
+    return await analysis_flights.run(
+        f"analysis:{cache_key}",
+        lambda: _analyze_with_llm(extraction, prompt, cache_key, priority)
     )
+
+
+async def _analyze_with_llm(
+    extraction: WebsiteExtraction,
+    prompt: str,
+    cache_key: str,
+    priority: LLMPriority
+) -> WebsiteAnalysis:
+    cached = await llm_cache.get(cache_key)
+    if cached:
+        return WebsiteAnalysis(**cached)
     
     try:
-        response = await chat.send_message(user_message)
+        # Call GPT-4 for analysis
+        response = await llm_gateway.complete(
+            ANALYSIS_MODEL,
+            prompt,
+            system_message=SYSTEM_PROMPT,
+            session_id=f"website-analysis-{hash(extraction.url)}",
+            priority=priority,
+            feature="analysis",
+            api_key=EMERGENT_LLM_KEY
+        )
         
         # Parse JSON response
         # Try to extract JSON from response (might have markdown code blocks)
@@ -134,43 +169,173 @@ Content Sample:
         # Validate and parse recommendations
         recommendations = []
         for rec_data in analysis_data.get('recommendations', []):
-            try:
-                # Build workflow config
-                workflow_config = None
-                if 'workflow_config' in rec_data:
-                    workflow_config = WorkflowConfig(**rec_data['workflow_config'])
-                
-                rec = AutomationRecommendation(
-                    key=rec_data['key'],
-                    title=rec_data['title'],
-                    description=rec_data['description'],
-                    rationale=rec_data['rationale'],
-                    expected_impact=rec_data['expected_impact'],
-                    category=AutomationCategory(rec_data['category']),
-                    priority=Priority(rec_data['priority']),
-                    workflow_config=workflow_config,
-                    estimated_value=rec_data.get('estimated_value')
-                )
+            rec = _parse_recommendation(rec_data)
+            if rec:
                 recommendations.append(rec)
-            except Exception as e:
-                print(f"Warning: Failed to parse recommendation: {e}")
-                continue
         
-        return WebsiteAnalysis(
-            url=extraction.url,
-            business_type=extraction.business_type,
-            summary=analysis_data.get('summary', 'Analysis completed'),
-            strengths=analysis_data.get('strengths', []),
-            opportunities=analysis_data.get('opportunities', []),
-            recommendations=recommendations,
-            confidence_score=0.85
+        analysis = _build_analysis(extraction, analysis_data, recommendations)
+        
+        await llm_cache.put(
+            cache_key,
+            analysis.model_dump(mode="json"),
+            tokens=estimate_tokens(SYSTEM_PROMPT, prompt, response),
+            model=ANALYSIS_MODEL
         )
+        return analysis
         
     except Exception as e:
         print(f"AI Analysis error: {e}")
         # Fallback: Return basic recommendations based on business type
         return _fallback_recommendations(extraction)
 
+
+def _parse_recommendation(rec_data: Dict[str, Any]) -> Optional[AutomationRecommendation]:
+    """Validate one recommendation from the LLM; None if it is malformed"""
+    try:
+        # Build workflow config
+        workflow_config = None
+        if 'workflow_config' in rec_data:
+            workflow_config = WorkflowConfig(**rec_data['workflow_config'])
+        
+        return AutomationRecommendation(
+            key=rec_data['key'],
+            title=rec_data['title'],
+            description=rec_data['description'],
+            rationale=rec_data['rationale'],
+            expected_impact=rec_data['expected_impact'],
+            category=AutomationCategory(rec_data['category']),
+            priority=Priority(rec_data['priority']),
+            workflow_config=workflow_config,
+            estimated_value=rec_data.get('estimated_value')
+        )
+    except Exception as e:
+        print(f"Warning: Failed to parse recommendation: {e}")
+        return None
+
+
+def _build_analysis(
+    extraction: WebsiteExtraction,
+    analysis_data: Dict[str, Any],
+    recommendations: List[AutomationRecommendation]
+) -> WebsiteAnalysis:
+    return WebsiteAnalysis(
+        url=extraction.url,
+        business_type=extraction.business_type,
+        summary=analysis_data.get('summary', 'Analysis completed'),
+        strengths=analysis_data.get('strengths', []),
+        opportunities=analysis_data.get('opportunities', []),
+        recommendations=recommendations,
+        confidence_score=0.85
+    )
+
+
+async def _stream_llm_text(extraction: WebsiteExtraction, prompt: str) -> AsyncIterator[str]:
+    """
+    Token stream when an OpenAI-compatible streaming endpoint is configured,
+    otherwise the whole LlmChat response as a single chunk
+    """
+    if streaming_enabled():
+        async with llm_gateway.slot(ANALYSIS_MODEL, LLMPriority.INTERACTIVE, timeout=STREAM_QUEUE_TIMEOUT):
+            started = time.monotonic()
+            completion = []
+            error = "cancelled"
+            try:
+                async for delta in stream_chat_completion(ANALYSIS_MODEL, SYSTEM_PROMPT, prompt):
+                    completion.append(delta)
+                    yield delta
+                error = None
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                llm_metrics.observe(
+                    ANALYSIS_MODEL,
+                    "analysis_stream",
+                    estimate_tokens(SYSTEM_PROMPT, prompt),
+                    estimate_tokens("".join(completion)),
+                    time.monotonic() - started,
+                    error
+                )
+        return
+    
+    yield await llm_gateway.complete(
+        ANALYSIS_MODEL,
+        prompt,
+        system_message=SYSTEM_PROMPT,
+        session_id=f"website-analysis-{hash(extraction.url)}",
+        priority=LLMPriority.INTERACTIVE,
+        feature="analysis_stream",
+        api_key=EMERGENT_LLM_KEY
+    )
+
+
+def _analysis_events(analysis: WebsiteAnalysis) -> List[Tuple[str, Any]]:
+    """Replay a finished analysis as stream events"""
+    events = [
+        ("summary", {"summary": analysis.summary, "business_type": analysis.business_type.value}),
+        ("strengths", analysis.strengths),
+        ("opportunities", analysis.opportunities)
+    ]
+    events.extend(("recommendation", rec.model_dump(mode="json")) for rec in analysis.recommendations)
+    return events
+
+
+async def stream_website_analysis(extraction: WebsiteExtraction) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of analyze_website_for_automations
+    Yields ("summary" | "strengths" | "opportunities" | "recommendation", data)
+    as each part of the LLM output completes, then ("analysis", WebsiteAnalysis)
+    with the full result. Cache hits and the fallback are replayed at once.
+    """
+    prompt = _build_prompt(extraction)
+    cache_key = make_key(ANALYSIS_MODEL, SYSTEM_PROMPT_VERSION, prompt)
+    
+    cached = await llm_cache.get(cache_key)
+    if cached:
+        analysis = WebsiteAnalysis(**cached)
+        for event in _analysis_events(analysis):
+            yield event
+        yield ("analysis", analysis)
+        return
+    
+    parser = AnalysisStreamParser()
+    analysis_data: Dict[str, Any] = {}
+    recommendations: List[AutomationRecommendation] = []
+    try:
+        async for chunk in _stream_llm_text(extraction, prompt):
+            for key, value in parser.feed(chunk):
+                if key == "recommendation":
+                    rec = _parse_recommendation(value)
+                    if rec:
+                        recommendations.append(rec)
+                        yield ("recommendation", rec.model_dump(mode="json"))
+                elif key == "summary":
+                    analysis_data[key] = value
+                    yield ("summary", {"summary": value, "business_type": extraction.business_type.value})
+                elif key in ("strengths", "opportunities"):
+                    analysis_data[key] = value
+                    yield (key, value)
+    except Exception as e:
+        print(f"AI Analysis stream error: {e}")
+    
+    if not parser.done and not recommendations:
+        # Nothing usable arrived: replay the fallback in full
+        analysis = _fallback_recommendations(extraction)
+        for event in _analysis_events(analysis):
+            yield event
+        yield ("analysis", analysis)
+        return
+    
+    analysis = _build_analysis(extraction, analysis_data, recommendations)
+    if parser.done:
+        await llm_cache.put(
+            cache_key,
+            analysis.model_dump(mode="json"),
+            tokens=estimate_tokens(SYSTEM_PROMPT, prompt, parser.text),
+            model=ANALYSIS_MODEL
+        )
+    yield ("analysis", analysis)
+
 def _fallback_recommendations(extraction: WebsiteExtraction) -> WebsiteAnalysis:
     """
     Fallback recommendations if AI fails
@@ -0,0 +1,445 @@
+"""
+Single-pass HTML extraction with pluggable parser backends
+
+One walk over the parsed document collects every WebsiteExtraction field
+(title, meta, headings, nav links, forms, CTAs, main text). Backends:
+- selectolax: lexbor HTML5 parser (fastest)
+- lxml: libxml2 HTML parser
+- html.parser: BeautifulSoup with the stdlib parser (always available, reference)
+
+Output matches the original BeautifulSoup multi-pass extractor on the
+fixture corpus in tests/fixtures/pages. The fast backends build their own
+trees, so malformed markup (unclosed inline tags, markup inside <title>,
+elements inside <template>) can still parse differently than html.parser.
+"""
+import os
+import re
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup, Tag, NavigableString
+from bs4.element import Comment, Declaration, Doctype, ProcessingInstruction
+from .schema import WebsiteExtraction, FormInfo, CTAInfo, BusinessType
+from .keyword_matcher import KeywordMatcher
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # Optional fast backend
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # Optional fast backend
+    lxml = None
+
+# Parser backend: auto, selectolax, lxml or html.parser
+EXTRACT_PARSER = os.environ.get('EXTRACT_PARSER', 'auto')
+
+BUSINESS_KEYWORDS = {
+    BusinessType.ECOMMERCE: ['shop', 'cart', 'product', 'buy', 'store', 'checkout', 'price', 'add to cart'],
+    BusinessType.SERVICE: ['service', 'consultation', 'appointment', 'schedule', 'book', 'contact us'],
+    BusinessType.BLOG: ['blog', 'article', 'post', 'author', 'published', 'category', 'tag'],
+    BusinessType.SAAS: ['pricing', 'plans', 'subscription', 'trial', 'demo', 'signup', 'features', 'api'],
+    BusinessType.PORTFOLIO: ['portfolio', 'work', 'project', 'case study', 'about me'],
+}
+
+CTA_VERBS = ['buy', 'get', 'start', 'try', 'download', 'sign up', 'signup', 'join', 'learn', 'contact', 'book', 'schedule', 'subscribe', 'register']
+
+# Compiled once; each scan costs one pass over the text however long the lists get
+BUSINESS_MATCHER = KeywordMatcher(BUSINESS_KEYWORDS)
+CTA_MATCHER = KeywordMatcher({'cta': CTA_VERBS})
+
+SOCIAL_PATTERNS = {
+    'facebook': re.compile(r'facebook\.com/([^/\s"]+)'),
+    'instagram': re.compile(r'instagram\.com/([^/\s"]+)'),
+    'twitter': re.compile(r'twitter\.com/([^/\s"]+)'),
+    'linkedin': re.compile(r'linkedin\.com/(?:company|in)/([^/\s"]+)'),
+}
+
+MAX_H2 = 10
+MAX_NAV_LINKS = 20
+MAX_FORMS = 5
+MAX_CTA_ELEMENTS = 30
+MAX_CONTENT_CHARS = 5000
+
+# Strings under these tags are not "text" (BeautifulSoup string containers)
+NON_TEXT_CONTAINERS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+# Subtrees dropped from the main content text
+NON_CONTENT_TAGS = frozenset(['script', 'style', 'nav', 'footer', 'header'])
+FORM_FIELD_TAGS = frozenset(['input', 'textarea', 'select'])
+
+# Walk events
+START, END, TEXT, COMMENT = 0, 1, 2, 3
+
+Event = Tuple[int, Optional[str], Any]
+
+
+# ========== BACKENDS ==========
+# Each backend turns HTML into a flat event stream (START tag node / TEXT str /
+# COMMENT str / END) and knows how to read an attribute off its own node type.
+
+class Bs4Backend:
+    name = "html.parser"
+
+    _NON_TEXT_STRINGS = (Comment, Declaration, Doctype, ProcessingInstruction)
+
+    def events(self, html: str) -> Iterator[Event]:
+        soup = BeautifulSoup(html, 'html.parser')
+        stack = [iter(soup.contents)]
+        while stack:
+            for node in stack[-1]:
+                if isinstance(node, Tag):
+                    yield START, node.name, node
+                    stack.append(iter(node.contents))
+                    break
+                if isinstance(node, NavigableString):
+                    kind = COMMENT if isinstance(node, self._NON_TEXT_STRINGS) else TEXT
+                    yield kind, None, str(node)
+            else:
+                stack.pop()
+                if stack:
+                    yield END, None, None
+
+    @staticmethod
+    def attr(node, name: str) -> Optional[str]:
+        return node.get(name)
+
+
+class LxmlBackend:
+    name = "lxml"
+
+    def __init__(self):
+        self._parser = lxml.html.HTMLParser(encoding='utf-8')
+
+    def events(self, html: str) -> Iterator[Event]:
+        try:
+            root = lxml.html.document_fromstring(html.encode('utf-8', errors='ignore'), parser=self._parser)
+        except etree.ParserError:  # Empty document
+            return
+        for event, el in etree.iterwalk(root, events=('start', 'end', 'comment', 'pi')):
+            if event == 'start':
+                yield START, el.tag, el
+                if el.text:
+                    yield TEXT, None, el.text
+            elif event == 'end':
+                yield END, None, None
+                if el.tail:
+                    yield TEXT, None, el.tail
+            else:
+                if event == 'comment':
+                    yield COMMENT, None, el.text or ''
+                if el.tail:
+                    yield TEXT, None, el.tail
+
+    @staticmethod
+    def attr(node, name: str) -> Optional[str]:
+        return node.get(name)
+
+
+class SelectolaxBackend:
+    name = "selectolax"
+
+    def events(self, html: str) -> Iterator[Event]:
+        root = LexborHTMLParser(html).root
+        if root is None:
+            return
+        yield START, root.tag, root
+        stack = [root]
+        node = root.child
+        while stack:
+            if node is not None:
+                tag = node.tag
+                if tag == '-text':
+                    yield TEXT, None, node.text_content or ''
+                elif tag == '-comment':
+                    yield COMMENT, None, node.comment_content or ''
+                elif not tag.startswith(('-', '_', '#')):
+                    yield START, tag, node
+                    stack.append(node)
+                    node = node.child
+                    continue
+                node = node.next
+            else:
+                parent = stack.pop()
+                yield END, None, None
+                node = parent.next if stack else None
+
+    @staticmethod
+    def attr(node, name: str) -> Optional[str]:
+        attributes = node.attributes
+        if name not in attributes:
+            return None
+        value = attributes[name]
+        return '' if value is None else value
+
+
+_BACKENDS = {
+    "selectolax": SelectolaxBackend if LexborHTMLParser is not None else None,
+    "lxml": LxmlBackend if lxml is not None else None,
+    "html.parser": Bs4Backend,
+}
+_backend_cache: Dict[str, Any] = {}
+
+
+def available_backends() -> List[str]:
+    return [name for name, cls in _BACKENDS.items() if cls is not None]
+
+
+def get_backend(name: Optional[str] = None):
+    """
+    Resolve a parser backend; 'auto' picks the fastest installed one,
+    and a missing optional backend falls back to html.parser
+    """
+    name = name or EXTRACT_PARSER
+    if name == 'auto':
+        name = available_backends()[0]
+    if _BACKENDS.get(name) is None:
+        name = "html.parser"
+    if name not in _backend_cache:
+        _backend_cache[name] = _BACKENDS[name]()
+    return _backend_cache[name]
+
+
+# ========== EXTRACTION ==========
+
+def _single_string(node: Dict[str, Any]) -> Optional[str]:
+    """BeautifulSoup Tag.string semantics over a captured <title> subtree"""
+    kids = node["kids"]
+    if len(kids) != 1:
+        return None
+    child = kids[0]
+    if isinstance(child, str):
+        return child
+    return _single_string(child)
+
+
+def extract_website_data(html: str, url: str, backend: Optional[str] = None) -> WebsiteExtraction:
+    """
+    Extract structured data from fetched HTML in a single document walk
+    Pure and picklable so it can run in the extraction process pool
+    """
+    parser = get_backend(backend)
+    attr = parser.attr
+
+    # Metadata
+    title_root = None
+    title_stack: List[Dict[str, Any]] = []
+    description = None
+    description_seen = False
+    keywords: List[str] = []
+    keywords_seen = False
+
+    # Element text collectors (BeautifulSoup get_text(strip=True) equivalents)
+    active: List[List[str]] = []
+    h1_texts: List[List[str]] = []
+    h2_texts: List[List[str]] = []
+    nav_state = {"nav": None, "header": None}  # first <nav> / first <header>: {"open", "links"}
+    cta_elements: List[Tuple[str, Optional[str], List[str]]] = []
+    cta_seen = 0
+    forms: List[Dict[str, Any]] = []
+    open_forms: List[Dict[str, Any]] = []
+
+    content_parts: List[str] = []
+    content_len = 0
+    non_text_depth = 0
+    non_content_depth = 0
+
+    # Per open element: (tag, collectors pushed, nav keys opened, form opened)
+    stack: List[Tuple[str, int, Tuple[str, ...], bool]] = []
+
+    for kind, tag, value in parser.events(html):
+        if kind == TEXT:
+            if title_stack:
+                title_stack[-1]["kids"].append(value)
+            if non_text_depth:
+                continue
+            text = value.strip()
+            if not text:
+                continue
+            for collector in active:
+                collector.append(text)
+            if not non_content_depth and content_len <= MAX_CONTENT_CHARS:
+                content_parts.append(text)
+                content_len += len(text) + 1
+            continue
+
+        if kind == COMMENT:
+            if title_stack:
+                title_stack[-1]["kids"].append(value)
+            continue
+
+        if kind == END:
+            tag, pushed, nav_keys, form_opened = stack.pop()
+            if pushed:
+                del active[-pushed:]
+            for key in nav_keys:
+                nav_state[key]["open"] = False
+            if form_opened:
+                open_forms.pop()
+            if tag in NON_TEXT_CONTAINERS:
+                non_text_depth -= 1
+            if tag in NON_CONTENT_TAGS:
+                non_content_depth -= 1
+            if title_stack:
+                title_stack.pop()
+            continue
+
+        # START
+        node = value
+        pushed = 0
+        nav_keys: Tuple[str, ...] = ()
+        form_opened = False
+
+        if title_stack:
+            child = {"kids": []}
+            title_stack[-1]["kids"].append(child)
+            title_stack.append(child)
+        elif tag == 'title' and title_root is None:
+            title_root = {"kids": []}
+            title_stack.append(title_root)
+
+        if tag == 'meta':
+            meta_name = attr(node, 'name')
+            if meta_name == 'description' and not description_seen:
+                description_seen = True
+                description = attr(node, 'content') or None
+            elif meta_name == 'keywords' and not keywords_seen:
+                keywords_seen = True
+                content = attr(node, 'content')
+                if content:
+                    keywords = [k.strip() for k in content.split(',')]
+
+        elif tag == 'h1':
+            collector = []
+            h1_texts.append(collector)
+            active.append(collector)
+            pushed += 1
+
+        elif tag == 'h2' and len(h2_texts) < MAX_H2:
+            collector = []
+            h2_texts.append(collector)
+            active.append(collector)
+            pushed += 1
+
+        elif tag in ('nav', 'header') and nav_state[tag] is None:
+            nav_state[tag] = {"open": True, "links": []}
+            nav_keys = (tag,)
+
+        elif tag == 'form' and len(forms) < MAX_FORMS:
+            method = attr(node, 'method')
+            form = {
+                "action": attr(node, 'action'),
+                "method": ('GET' if method is None else method).upper(),
+                "inputs": [],
+                "has_email": False,
+                "has_phone": False
+            }
+            forms.append(form)
+            open_forms.append(form)
+            form_opened = True
+
+        elif tag in FORM_FIELD_TAGS and open_forms:
+            input_type = attr(node, 'type')
+            if input_type is None:
+                input_type = 'text'
+            input_name = attr(node, 'name') or ''
+            input_placeholder = attr(node, 'placeholder') or ''
+            for form in open_forms:
+                if input_type in ('text', 'email', 'tel', 'textarea', 'select'):
+                    form["inputs"].append(f"{input_name or input_placeholder or input_type}")
+                if input_type == 'email' or 'email' in input_name.lower():
+                    form["has_email"] = True
+                if input_type == 'tel' or 'phone' in input_name.lower():
+                    form["has_phone"] = True
+
+        if tag == 'a':
+            href = attr(node, 'href')
+            if href is not None:
+                for key in ('nav', 'header'):
+                    state = nav_state[key]
+                    if state is not None and state["open"] and len(state["links"]) < MAX_NAV_LINKS:
+                        collector = []
+                        state["links"].append((href, collector))
+                        active.append(collector)
+                        pushed += 1
+
+        if tag in ('a', 'button') and cta_seen < MAX_CTA_ELEMENTS:
+            cta_seen += 1
+            collector = []
+            cta_elements.append((tag, attr(node, 'href') if tag == 'a' else None, collector))
+            active.append(collector)
+            pushed += 1
+
+        if tag in NON_TEXT_CONTAINERS:
+            non_text_depth += 1
+        if tag in NON_CONTENT_TAGS:
+            non_content_depth += 1
+
+        stack.append((tag, pushed, nav_keys, form_opened))
+
+    # Assemble fields
+    title = _single_string(title_root) if title_root is not None else None
+    h1_tags = [''.join(parts) for parts in h1_texts]
+    h2_tags = [''.join(parts) for parts in h2_texts]
+
+    nav_links = []
+    nav = nav_state["nav"] or nav_state["header"]
+    if nav:
+        for href, parts in nav["links"]:
+            text = ''.join(parts)
+            if text:
+                nav_links.append({'text': text, 'href': urljoin(url, href)})
+
+    ctas = []
+    for element_tag, href, parts in cta_elements:
+        cta_text = ''.join(parts)
+        if CTA_MATCHER.search(cta_text):
+            ctas.append(CTAInfo(
+                text=cta_text,
+                url=urljoin(url, href) if href else None,
+                type='button' if element_tag == 'button' else 'link'
+            ))
+
+    content_text = ' '.join(content_parts)[:MAX_CONTENT_CHARS]
+
+    # Extract social links (raw HTML, so links in scripts and attributes count too)
+    social_links = {}
+    html_lower = html.lower()
+    for platform, pattern in SOCIAL_PATTERNS.items():
+        match = pattern.search(html_lower)
+        if match:
+            social_links[platform] = match.group(0)
+
+    # Detect business type based on content
+    content_lower = (title or '').lower() + ' ' + (description or '').lower() + ' ' + content_text.lower()
+
+    found = BUSINESS_MATCHER.find(content_lower)
+    business_scores = {bt: 0 for bt in BusinessType}
+    business_scores.update(BUSINESS_MATCHER.score(found))
+
+    business_type = max(business_scores, key=business_scores.get)
+    if business_scores[business_type] == 0:
+        business_type = BusinessType.OTHER
+
+    # Detect features (all feature words are business keywords, so reuse the scan)
+    has_blog = 'blog' in found or any('blog' in link['href'] for link in nav_links)
+    has_shop = business_type == BusinessType.ECOMMERCE or 'shop' in found
+    has_booking = 'book' in found or 'appointment' in found or 'schedule' in found
+
+    return WebsiteExtraction(
+        url=url,
+        title=title,
+        description=description,
+        h1_tags=h1_tags,
+        h2_tags=h2_tags,
+        nav_links=nav_links,
+        forms=[FormInfo(**form) for form in forms],
+        ctas=ctas,
+        content_text=content_text,
+        keywords=keywords,
+        business_type=business_type,
+        has_blog=has_blog,
+        has_shop=has_shop,
+        has_booking=has_booking,
+        social_links=social_links
+    )
@@ -0,0 +1,201 @@
+"""
+Shared HTTP client for website fetching
+One pooled keep-alive client per process, opened and closed with the app lifespan
+"""
+import os
+import time
+import codecs
+import asyncio
+import httpx
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, List
+from urllib.parse import urlparse
+from .schema import FetchedPage
+
+USER_AGENT = "GR8-AI-Automation-Bot/1.0"
+
+# Pool configuration
+FETCH_TIMEOUT = float(os.environ.get('FETCH_TIMEOUT', '15.0'))
+FETCH_CONNECT_TIMEOUT = float(os.environ.get('FETCH_CONNECT_TIMEOUT', '5.0'))
+FETCH_MAX_CONNECTIONS = int(os.environ.get('FETCH_MAX_CONNECTIONS', '100'))
+FETCH_MAX_KEEPALIVE = int(os.environ.get('FETCH_MAX_KEEPALIVE', '20'))
+FETCH_KEEPALIVE_EXPIRY = float(os.environ.get('FETCH_KEEPALIVE_EXPIRY', '30.0'))
+FETCH_PER_HOST_LIMIT = int(os.environ.get('FETCH_PER_HOST_LIMIT', '6'))
+FETCH_HTTP2 = os.environ.get('FETCH_HTTP2', 'true').lower() == 'true'
+
+# Download limits per page
+FETCH_MAX_BYTES = int(os.environ.get('FETCH_MAX_BYTES', str(5 * 1024 * 1024)))  # 5MB
+FETCH_BUDGET = float(os.environ.get('FETCH_BUDGET', '20.0'))  # Wall-clock seconds per page
+
+_client: Optional[httpx.AsyncClient] = None
+
+# host -> [semaphore, active users]
+_host_slots: Dict[str, List] = {}
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=FETCH_HTTP2 and _http2_available(),
+        timeout=httpx.Timeout(FETCH_TIMEOUT, connect=FETCH_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=FETCH_MAX_CONNECTIONS,
+            max_keepalive_connections=FETCH_MAX_KEEPALIVE,
+            keepalive_expiry=FETCH_KEEPALIVE_EXPIRY
+        ),
+        follow_redirects=True,
+        headers={'User-Agent': USER_AGENT}
+    )
+
+
+async def start_fetch_client() -> httpx.AsyncClient:
+    """
+    Open the shared client (call from app startup)
+    """
+    return get_fetch_client()
+
+
+def get_fetch_client() -> httpx.AsyncClient:
+    """
+    Get the shared client, creating it lazily outside the app lifespan
+    (scripts, background jobs)
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_fetch_client():
+    """
+    Close the shared client and drop pooled connections (call from app shutdown)
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_slots.clear()
+
+
+@asynccontextmanager
+async def host_slot(url: str):
+    """
+    Limit concurrent requests to a single host so one slow site
+    cannot take the whole pool
+    """
+    host = urlparse(url).netloc.lower()
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = [asyncio.Semaphore(FETCH_PER_HOST_LIMIT), 0]
+        _host_slots[host] = slot
+    slot[1] += 1
+    try:
+        async with slot[0]:
+            yield
+    finally:
+        slot[1] -= 1
+        if slot[1] == 0:
+            _host_slots.pop(host, None)
+
+
+def _response_encoding(response: httpx.Response) -> str:
+    """Declared charset from Content-Type, falling back to UTF-8"""
+    charset = response.charset_encoding
+    if charset:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+
+async def fetch_html(
+    url: str,
+    max_bytes: int = FETCH_MAX_BYTES,
+    budget: float = FETCH_BUDGET,
+    headers: Optional[Dict[str, str]] = None
+) -> FetchedPage:
+    """
+    Stream an HTML page, stopping at max_bytes or when the time budget runs out
+    
+    The content type is checked from headers before any body is read, and
+    the body is decoded incrementally with the declared charset, so memory
+    per page is bounded by max_bytes.
+    
+    Pass If-None-Match / If-Modified-Since in headers for a conditional
+    GET; a 304 comes back as a FetchedPage with not_modified=True and no body.
+    
+    Raises:
+        httpx.HTTPStatusError: On error responses (other than 304)
+        ValueError: If the response is not HTML
+    """
+    client = get_fetch_client()
+    deadline = time.monotonic() + budget
+    
+    async with host_slot(url):
+        async with client.stream('GET', url, headers=headers) as response:
+            etag = response.headers.get('etag')
+            last_modified = response.headers.get('last-modified')
+            if response.status_code == 304:
+                return FetchedPage(
+                    url=str(response.url),
+                    status_code=304,
+                    etag=etag,
+                    last_modified=last_modified,
+                    not_modified=True
+                )
+            response.raise_for_status()
+            
+            content_type = response.headers.get('content-type', '')
+            if 'text/html' not in content_type:
+                raise ValueError(f"Not an HTML page: {content_type}")
+            
+            encoding = _response_encoding(response)
+            decoder = codecs.getincrementaldecoder(encoding)(errors='ignore')
+            parts = []
+            bytes_read = 0
+            truncated = False
+            
+            chunks = response.aiter_bytes()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    truncated = True
+                    break
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    truncated = True
+                    break
+                
+                if bytes_read + len(chunk) > max_bytes:
+                    chunk = chunk[:max_bytes - bytes_read]
+                    truncated = True
+                bytes_read += len(chunk)
+                parts.append(decoder.decode(chunk))
+                if truncated:
+                    break
+            
+            parts.append(decoder.decode(b'', final=True))
+            
+            return FetchedPage(
+                url=str(response.url),
+                status_code=response.status_code,
+                html=''.join(parts),
+                content_type=content_type,
+                encoding=encoding,
+                bytes_read=bytes_read,
+                truncated=truncated,
+                etag=etag,
+                last_modified=last_modified
+            )
@@ -0,0 +1,72 @@
+"""
+Compiled multi-keyword matcher
+All keywords go into one trie-shaped regex, so a single scan of the text
+finds every keyword regardless of how long the keyword lists grow
+"""
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Any
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex alternation shaped like a prefix trie (shared prefixes tested once)"""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy, so the longest keyword at a position wins; its prefixes are credited in find()
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive matcher for keywords grouped into categories.
+
+    Keywords match at the start of a word, so 'product' finds 'products'
+    but 'api' does not fire inside 'capital'. Overlapping keywords are all
+    reported ('add to cart' also counts 'cart').
+    """
+
+    def __init__(self, categories: Dict[Any, Iterable[str]]):
+        self.categories: Dict[str, List[Any]] = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                self.categories.setdefault(keyword.lower(), []).append(category)
+
+        keywords = list(self.categories)
+        # Every keyword that is also a prefix of a longer one matches at the same spot
+        self._prefixes = {kw: [p for p in keywords if kw.startswith(p)] for kw in keywords}
+        # Zero-width lookahead so matches may overlap
+        self._pattern = re.compile(r'\b(?=(' + _trie_pattern(keywords) + '))', re.IGNORECASE)
+
+    def find(self, text: str) -> Counter:
+        """Occurrences of each keyword in the text"""
+        found: Counter = Counter()
+        for match in self._pattern.finditer(text):
+            found.update(self._prefixes[match.group(1).lower()])
+        return found
+
+    def search(self, text: str) -> bool:
+        """True if any keyword occurs in the text"""
+        return self._pattern.search(text) is not None
+
+    def score(self, found: Dict[str, int]) -> Dict[Any, int]:
+        """Distinct keywords found per category"""
+        scores: Counter = Counter()
+        for keyword in found:
+            for category in self.categories[keyword]:
+                scores[category] += 1
+        return dict(scores)
+
+    def count_categories(self, text: str) -> Dict[Any, int]:
+        return self.score(self.find(text))
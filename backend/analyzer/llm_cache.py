@@ -0,0 +1,119 @@
+"""
+LLM response cache keyed by a fingerprint of the exact request
+In-process LRU in front of a Mongo collection shared by all workers
+"""
+import os
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any
+
+LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', str(24 * 3600)))  # Seconds a cached response is served
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '256'))
+
+
+def prompt_version(system_prompt: str) -> str:
+    """Short fingerprint of a system prompt; editing the prompt changes it"""
+    return hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:12]
+
+
+def make_key(model: str, version: str, prompt: str) -> str:
+    """Cache key for one request: model, system prompt version and user prompt"""
+    return hashlib.sha256(f"{model}\n{version}\n{prompt}".encode('utf-8')).hexdigest()
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return sum(len(text or '') for text in texts) // 4
+
+
+class LLMResultCache:
+    def __init__(self, ttl: int = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.collection = None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+
+    def attach(self, db):
+        """Share entries across workers through Mongo (memory-only until attached)"""
+        self.collection = db["llm_cache"]
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    @staticmethod
+    def _is_live(entry: Dict[str, Any]) -> bool:
+        expires_at = entry["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at > datetime.now(timezone.utc)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached result for a key, or None; counts the hit or miss"""
+        entry = self._entries.get(key)
+        if entry is not None and not self._is_live(entry):
+            del self._entries[key]
+            entry = None
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif self.collection is not None:
+            try:
+                entry = await self.collection.find_one({"_id": key})
+            except Exception as e:
+                print(f"LLM cache read error: {e}")
+                entry = None
+            # Mongo's TTL sweep runs about once a minute, so check expiry here too
+            if entry and self._is_live(entry):
+                self._remember(key, entry)
+            else:
+                entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.saved_tokens += entry.get("tokens", 0)
+        return entry["result"]
+
+    async def put(self, key: str, result: Dict[str, Any], tokens: int = 0, model: Optional[str] = None):
+        now = datetime.now(timezone.utc)
+        entry = {
+            "_id": key,
+            "model": model,
+            "result": result,
+            "tokens": tokens,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl)
+        }
+        self._remember(key, entry)
+
+        if self.collection is not None:
+            try:
+                await self.collection.replace_one({"_id": key}, entry, upsert=True)
+            except Exception as e:
+                print(f"LLM cache write error: {e}")
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "saved_tokens": self.saved_tokens
+        }
+
+
+# Process-wide cache, attached to Mongo at startup
+llm_cache = LLMResultCache()
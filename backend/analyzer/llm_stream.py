@@ -0,0 +1,62 @@
+"""
+Token streaming from an OpenAI-compatible chat completions endpoint
+LlmChat only returns whole responses; when LLM_STREAM_BASE_URL and a key are
+configured, streaming analyses read tokens from this endpoint instead
+"""
+import os
+import json
+import httpx
+from typing import AsyncIterator, Optional
+
+LLM_STREAM_BASE_URL = os.environ.get('LLM_STREAM_BASE_URL', '').rstrip('/')  # e.g. https://api.openai.com/v1
+LLM_STREAM_API_KEY = os.environ.get('LLM_STREAM_API_KEY', os.environ.get('OPENAI_API_KEY', ''))
+LLM_STREAM_TIMEOUT = float(os.environ.get('LLM_STREAM_TIMEOUT', '60.0'))  # Max seconds between chunks
+
+
+def streaming_enabled() -> bool:
+    return bool(LLM_STREAM_BASE_URL and LLM_STREAM_API_KEY)
+
+
+async def stream_chat_completion(
+    model: str,
+    system_message: str,
+    prompt: str,
+    client: Optional[httpx.AsyncClient] = None
+) -> AsyncIterator[str]:
+    """
+    Yield content deltas as the model writes them
+    Raises httpx errors on connection or HTTP failures
+    """
+    payload = {
+        "model": model,
+        "stream": True,
+        "messages": [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ]
+    }
+    headers = {"Authorization": f"Bearer {LLM_STREAM_API_KEY}"}
+
+    own_client = client is None
+    if own_client:
+        client = httpx.AsyncClient(timeout=httpx.Timeout(LLM_STREAM_TIMEOUT, connect=5.0))
+    try:
+        async with client.stream("POST", f"{LLM_STREAM_BASE_URL}/chat/completions", json=payload, headers=headers) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+                for choice in chunk.get("choices", []):
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+    finally:
+        if own_client:
+            await client.aclose()
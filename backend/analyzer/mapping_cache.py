@@ -0,0 +1,139 @@
+"""
+Cache of job-title -> AI agent mappings
+In-process LRU in front of a Mongo collection; entries are tied to the
+model/prompt version that produced them
+"""
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any
+
+JOB_MAPPING_CACHE_SIZE = int(os.environ.get('JOB_MAPPING_CACHE_SIZE', '1024'))
+JOB_MAPPING_CACHE_RETENTION = int(os.environ.get('JOB_MAPPING_CACHE_RETENTION', str(90 * 24 * 3600)))  # Seconds kept in Mongo
+
+# Salary and savings depend on local pricing, so they are recomputed on every hit
+SAVINGS_FIELDS = ('estimated_annual_salary', 'ai_annual_cost', 'annual_savings', 'monthly_savings')
+
+TITLE_ABBREVIATIONS = {
+    'rep': 'representative',
+    'reps': 'representative',
+    'sr': 'senior',
+    'jr': 'junior',
+    'mgr': 'manager',
+    'asst': 'assistant',
+    'admin': 'administrative',
+    'exec': 'executive',
+    'dev': 'developer',
+    'eng': 'engineer',
+}
+
+
+def normalize_job_title(title: str) -> str:
+    """
+    Cache key for a job title: lowercase, punctuation dropped,
+    common abbreviations expanded ("Sr. Sales Rep" == "senior sales representative")
+    """
+    words = re.findall(r'[a-z0-9]+', title.lower())
+    return ' '.join(TITLE_ABBREVIATIONS.get(word, word) for word in words)
+
+
+class JobMappingCache:
+    def __init__(self, version: str, max_entries: int = JOB_MAPPING_CACHE_SIZE):
+        self.version = version
+        self.max_entries = max_entries
+        self.collection = None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def attach(self, db):
+        """Persist mappings in Mongo (memory-only until attached)"""
+        self.collection = db["job_mappings"]
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index("version")
+            await self.collection.create_index("created_at", expireAfterSeconds=JOB_MAPPING_CACHE_RETENTION)
+
+    def _key(self, title: str) -> str:
+        return f"{self.version}:{normalize_job_title(title)}"
+
+    async def get(self, title: str) -> Optional[Dict[str, Any]]:
+        """Cached mapping for a job title (without savings fields), memory first, then Mongo"""
+        key = self._key(title)
+        mapping = self._entries.get(key)
+        if mapping is not None:
+            self._entries.move_to_end(key)
+        elif self.collection is not None:
+            try:
+                doc = await self.collection.find_one({"_id": key})
+            except Exception as e:
+                print(f"Job mapping cache read error: {e}")
+                doc = None
+            if doc:
+                mapping = doc["mapping"]
+                self._remember(key, mapping)
+
+        if mapping is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(mapping)
+
+    async def put(self, title: str, mapping: Dict[str, Any]):
+        key = self._key(title)
+        mapping = {k: v for k, v in mapping.items() if k not in SAVINGS_FIELDS}
+        self._remember(key, mapping)
+
+        if self.collection is not None:
+            try:
+                await self.collection.replace_one({"_id": key}, {
+                    "_id": key,
+                    "title": normalize_job_title(title),
+                    "version": self.version,
+                    "mapping": mapping,
+                    "created_at": datetime.now(timezone.utc)
+                }, upsert=True)
+            except Exception as e:
+                print(f"Job mapping cache write error: {e}")
+
+    async def invalidate(self, version: Optional[str] = None) -> int:
+        """
+        Drop cached mappings for one prompt version, or every version
+        other than the current one when no version is given
+        Returns the number of Mongo documents removed
+        """
+        if version is None:
+            stale = [key for key in self._entries if not key.startswith(f"{self.version}:")]
+            query = {"version": {"$ne": self.version}}
+        else:
+            stale = [key for key in self._entries if key.startswith(f"{version}:")]
+            query = {"version": version}
+        for key in stale:
+            del self._entries[key]
+
+        if self.collection is None:
+            return 0
+        try:
+            result = await self.collection.delete_many(query)
+            return result.deleted_count
+        except Exception as e:
+            print(f"Job mapping cache delete error: {e}")
+            return 0
+
+    def _remember(self, key: str, mapping: Dict[str, Any]):
+        self._entries[key] = mapping
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,168 @@
+"""
+Conditional-GET page cache for analyzed websites
+In-process LRU (bounded by entries and bytes) in front of a Mongo collection
+"""
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from .schema import FetchedPage, WebsiteExtraction
+
+PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', '3600'))  # Seconds before revalidation
+PAGE_CACHE_RETENTION = int(os.environ.get('PAGE_CACHE_RETENTION', str(7 * 24 * 3600)))  # Seconds kept in Mongo
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', '256'))
+PAGE_CACHE_MAX_BYTES = int(os.environ.get('PAGE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))  # 64MB
+
+
+def normalize_url(url: str) -> str:
+    """
+    Cache key for a URL: lowercase scheme/host, no default port,
+    no fragment, no trailing slash, sorted query
+    """
+    if not url.startswith(('http://', 'https://')):
+        url = f"https://{url}"
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+class PageCache:
+    def __init__(
+        self,
+        ttl: int = PAGE_CACHE_TTL,
+        max_entries: int = PAGE_CACHE_MAX_ENTRIES,
+        max_bytes: int = PAGE_CACHE_MAX_BYTES
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.collection = None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def attach(self, db):
+        """Persist entries in Mongo (memory-only until attached)"""
+        self.collection = db["page_cache"]
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index("fetched_at", expireAfterSeconds=PAGE_CACHE_RETENTION)
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        fetched_at = entry["fetched_at"]
+        if fetched_at.tzinfo is None:
+            fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - fetched_at < timedelta(seconds=self.ttl)
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Validators for revalidating a stale entry"""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up memory first, then Mongo"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        if self.collection is not None:
+            try:
+                entry = await self.collection.find_one({"_id": key})
+            except Exception as e:
+                print(f"Page cache read error: {e}")
+                entry = None
+            if entry:
+                self._remember(key, entry)
+                return entry
+        return None
+
+    async def lookup(self, key: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """(entry or None, whether it is fresh); a fresh entry counts as a hit"""
+        entry = await self.get(key)
+        fresh = entry is not None and self.is_fresh(entry)
+        if fresh:
+            self.hits += 1
+        return entry, fresh
+
+    async def put(self, key: str, page: FetchedPage, extraction: WebsiteExtraction):
+        """Store a fully fetched and extracted page (counted as a miss)"""
+        self.misses += 1
+        entry = {
+            "_id": key,
+            "url": page.url,
+            "html": page.html,
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+            "extraction": extraction.model_dump(mode="json"),
+            "fetched_at": datetime.now(timezone.utc)
+        }
+        self._remember(key, entry)
+
+        if self.collection is not None:
+            try:
+                await self.collection.replace_one({"_id": key}, entry, upsert=True)
+            except Exception as e:
+                print(f"Page cache write error: {e}")
+
+    async def refresh(self, key: str, entry: Dict[str, Any], page: FetchedPage):
+        """Restart the TTL after a 304, keeping any updated validators"""
+        self.revalidated += 1
+        update = {"fetched_at": datetime.now(timezone.utc)}
+        if page.etag:
+            update["etag"] = page.etag
+        if page.last_modified:
+            update["last_modified"] = page.last_modified
+        entry.update(update)
+        self._remember(key, entry)
+
+        if self.collection is not None:
+            try:
+                await self.collection.update_one({"_id": key}, {"$set": update})
+            except Exception as e:
+                print(f"Page cache write error: {e}")
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        """Insert into the LRU, evicting oldest entries past the limits"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old.get("html") or "")
+        self._entries[key] = entry
+        self._bytes += len(entry.get("html") or "")
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.get("html") or "")
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.revalidated) / lookups, 3) if lookups else 0.0
+        }
+
+
+# Process-wide cache, attached to Mongo at startup
+page_cache = PageCache()
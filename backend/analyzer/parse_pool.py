@@ -0,0 +1,102 @@
+"""
+Process pool for CPU-bound HTML parsing and extraction
+Keeps BeautifulSoup work off the event loop so large pages don't stall other requests
+"""
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Dict, Any, Callable
+
+EXTRACT_POOL_WORKERS = int(os.environ.get('EXTRACT_POOL_WORKERS', str(min(4, os.cpu_count() or 1))))
+EXTRACT_POOL_MAX_PENDING = int(os.environ.get('EXTRACT_POOL_MAX_PENDING', str(EXTRACT_POOL_WORKERS * 4)))
+
+
+class ExtractionPool:
+    """
+    Bounded process pool. At most max_pending jobs are handed to the
+    executor; further callers wait on a semaphore (counted as waiting).
+
+    workers=0 runs jobs on the default thread executor instead.
+    """
+
+    def __init__(self, workers: int = EXTRACT_POOL_WORKERS, max_pending: int = EXTRACT_POOL_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max(1, max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        """Create the executor (workers are spawned on first use)"""
+        if self.workers > 0 and self._executor is None:
+            # spawn: forking a process that runs an event loop and Mongo threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+
+    def shutdown(self):
+        self._discard(self._executor)
+
+    def _discard(self, executor: Optional[ProcessPoolExecutor]):
+        """Shut an executor down without waiting; a broken one still has threads and processes to reap"""
+        if executor is None:
+            return
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable, *args):
+        """
+        Run a picklable top-level function in the pool and await its result
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            self.start()
+            executor = self._executor
+            result = await loop.run_in_executor(executor, fn, *args)
+            self.completed += 1
+            return result
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge page); start fresh next time
+            self.failed += 1
+            self._discard(executor)
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        running = min(self.in_flight, self.workers) if self.workers > 0 else self.in_flight
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "running": running,
+            "queued": self.in_flight - running,
+            "waiting": self.waiting,
+            "queue_depth": self.waiting + self.in_flight - running,
+            "completed": self.completed,
+            "failed": self.failed
+        }
+
+
+# Process-wide pool, started and shut down with the app
+extraction_pool = ExtractionPool()
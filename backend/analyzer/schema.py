@@ -42,6 +42,19 @@ class CTAInfo(BaseModel):
     url: Optional[str] = None
     type: str  # button, link, form_submit
 
+class FetchedPage(BaseModel):
+    """Result of a streamed, size-capped page download"""
+    url: str  # Final URL after redirects
+    status_code: int = 200
+    html: str = ""
+    content_type: str = ""
+    encoding: str = "utf-8"
+    bytes_read: int = 0
+    truncated: bool = False  # Stopped at the byte cap or time budget
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False  # 304 answer to a conditional GET
+
 class WebsiteExtraction(BaseModel):
     url: str
     title: Optional[str] = None
@@ -60,6 +73,13 @@ class WebsiteExtraction(BaseModel):
     social_links: Dict[str, str] = Field(default_factory=dict)
     structured_data: List[Dict[str, Any]] = Field(default_factory=list)
 
+class AnalysisContext(BaseModel):
+    """Homepage fetched once per analysis request and shared by every analyzer"""
+    url: str
+    html: str = ""
+    extraction: WebsiteExtraction
+    links: List[Dict[str, str]] = Field(default_factory=list)  # Absolute nav and CTA links
+
 class WorkflowConfig(BaseModel):
     """Basic workflow configuration hints"""
     trigger_type: str  # webhook, schedule, manual
@@ -0,0 +1,112 @@
+"""
+Single-flight coalescing of duplicate analysis work
+Concurrent callers with the same key share one in-flight task; across
+worker processes a Mongo lock makes other workers wait for the first one
+(whose results then come out of the shared caches)
+"""
+import os
+import uuid
+import socket
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Callable, Awaitable
+from pymongo.errors import DuplicateKeyError
+
+SINGLE_FLIGHT_LOCK_TTL = int(os.environ.get('SINGLE_FLIGHT_LOCK_TTL', '120'))  # Seconds before a dead worker's lock is taken over
+SINGLE_FLIGHT_WAIT = float(os.environ.get('SINGLE_FLIGHT_WAIT', '90.0'))  # Seconds to wait on another worker's lock
+SINGLE_FLIGHT_POLL = float(os.environ.get('SINGLE_FLIGHT_POLL', '0.25'))
+
+
+class SingleFlight:
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.collection = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.lock_waits = 0
+
+    def attach(self, db):
+        """Coordinate with other workers through Mongo (process-local until attached)"""
+        self.collection = db["analysis_locks"]
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once per key at a time; concurrent callers await the same result
+        A cancelled caller does not cancel the shared work
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(self._run_locked(key, fn))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _run_locked(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        locked = await self._acquire(key)
+        try:
+            return await fn()
+        finally:
+            if locked:
+                await self._release(key)
+
+    async def _acquire(self, key: str) -> bool:
+        """
+        Take the cross-worker lock, waiting while another worker holds it
+        Returns False (run unlocked) without Mongo, on errors, or after SINGLE_FLIGHT_WAIT
+        """
+        if self.collection is None:
+            return False
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SINGLE_FLIGHT_WAIT
+        waited = False
+        while True:
+            now = datetime.now(timezone.utc)
+            try:
+                await self.collection.insert_one({
+                    "_id": key,
+                    "owner": self.owner,
+                    "expires_at": now + timedelta(seconds=SINGLE_FLIGHT_LOCK_TTL)
+                })
+                return True
+            except DuplicateKeyError:
+                # Holder died without releasing: take the lock over
+                result = await self.collection.delete_one({"_id": key, "expires_at": {"$lt": now}})
+                if result.deleted_count:
+                    continue
+            except Exception as e:
+                print(f"Single-flight lock error: {e}")
+                return False
+
+            if not waited:
+                waited = True
+                self.lock_waits += 1
+            if loop.time() >= deadline:
+                return False
+            await asyncio.sleep(SINGLE_FLIGHT_POLL)
+
+    async def _release(self, key: str):
+        try:
+            await self.collection.delete_one({"_id": key, "owner": self.owner})
+        except Exception as e:
+            print(f"Single-flight unlock error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "lock_waits": self.lock_waits
+        }
+
+
+# Process-wide coalescer for the analyze pipeline, attached to Mongo at startup
+analysis_flights = SingleFlight()
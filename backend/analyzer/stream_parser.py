@@ -0,0 +1,112 @@
+"""
+Incremental parser for the streamed website-analysis JSON
+Emits each top-level field as soon as its value is complete, and each
+recommendation as soon as its object closes, while the LLM is still writing
+"""
+import json
+from typing import List, Tuple, Any, Optional
+
+# Array whose items are emitted one by one instead of as a whole
+ITEMS_KEY = "recommendations"
+
+
+class AnalysisStreamParser:
+    """
+    Feed text chunks in order; feed() returns the (event, value) pairs that
+    became complete. Events are top-level keys ("summary", "strengths", ...)
+    and "recommendation" for each item of the recommendations array.
+    Text before the first '{' (e.g. a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_value = False
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.text += chunk
+        events: List[Tuple[str, Any]] = []
+        text = self.text
+
+        while self._pos < len(text) and not self.done:
+            i = self._pos
+            ch = text[i]
+            self._pos += 1
+
+            if self._depth == 0:
+                if ch == '{':
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and not self._expect_value:
+                        self._key = self._loads(text[self._key_start:i + 1])
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    if self._expect_value:
+                        self._start_value(i)
+                    else:
+                        self._key_start = i
+            elif ch in '{[':
+                if self._depth == 1:
+                    self._start_value(i)
+                elif self._depth == 2 and ch == '{' and self._key == ITEMS_KEY:
+                    self._item_start = i
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 2 and self._item_start is not None:
+                    item = self._loads(text[self._item_start:i + 1])
+                    self._item_start = None
+                    if isinstance(item, dict):
+                        events.append(("recommendation", item))
+                elif self._depth == 0:
+                    self._finish_value(i, events)
+                    self.done = True
+            elif self._depth == 1:
+                if ch == ':':
+                    self._expect_value = True
+                    self._value_start = None
+                elif ch == ',':
+                    self._finish_value(i, events)
+                elif not ch.isspace():
+                    self._start_value(i)  # number, true, false, null
+
+        return events
+
+    def _start_value(self, i: int):
+        if self._expect_value and self._value_start is None:
+            self._value_start = i
+
+    def _finish_value(self, end: int, events: List[Tuple[str, Any]]):
+        if self._key is not None and self._value_start is not None and self._key != ITEMS_KEY:
+            value = self._loads(self.text[self._value_start:end].strip())
+            if value is not None:
+                events.append((self._key, value))
+        self._key = None
+        self._value_start = None
+        self._expect_value = False
+
+    @staticmethod
+    def _loads(fragment: str) -> Any:
+        try:
+            return json.loads(fragment)
+        except ValueError:
+            return None
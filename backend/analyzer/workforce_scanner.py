@@ -4,12 +4,37 @@ Analyzes job postings and maps them to AI agent replacements
 """
 import os
 import re
+import json
+import asyncio
 from bs4 import BeautifulSoup
-import httpx
-from typing import List, Dict
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from typing import List, Dict, Optional
+from urllib.parse import urlsplit
+from .http_client import fetch_html
+from .parse_pool import extraction_pool
+from .keyword_matcher import KeywordMatcher
+from .schema import AnalysisContext
+from .mapping_cache import JobMappingCache
+from .page_cache import normalize_url
+from .single_flight import analysis_flights
+from services.llm_gateway import llm_gateway, LLMPriority
 
-EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
+# Job-to-agent mapping: one batched LLM call, per-job fan-out as fallback
+JOB_MAPPING_BATCH = os.environ.get('JOB_MAPPING_BATCH', 'true').lower() == 'true'
+JOB_MAPPING_CONCURRENCY = int(os.environ.get('JOB_MAPPING_CONCURRENCY', '5'))
+
+# Bump JOB_MAPPING_PROMPT_VERSION when the mapping prompts change so cached mappings are not reused
+JOB_MAPPING_MODEL = "gpt-4o"
+JOB_MAPPING_PROMPT_VERSION = os.environ.get('JOB_MAPPING_PROMPT_VERSION', '1')
+job_mapping_cache = JobMappingCache(version=f"{JOB_MAPPING_MODEL}/v{JOB_MAPPING_PROMPT_VERSION}")
+
+# Careers page probing
+CAREERS_PROBE_DEADLINE = float(os.environ.get('CAREERS_PROBE_DEADLINE', '10.0'))  # Seconds for all probes together
+CAREERS_PROBE_CONCURRENCY = int(os.environ.get('CAREERS_PROBE_CONCURRENCY', '4'))  # Probes in flight per scan
+
+CAREER_PATHS = [
+    '/careers', '/jobs', '/join-us', '/team', '/about/careers',
+    '/company/careers', '/work-with-us', '/opportunities'
+]
 
 # Average annual salaries by role (US market, 2024)
 ROLE_SALARY_MAP = {
@@ -25,74 +50,162 @@ ROLE_SALARY_MAP = {
     "representative": 42000
 }
 
+# Salary tiers used when no role keyword matches
+SENIORITY_KEYWORDS = {
+    75000: ['manager', 'director'],
+    65000: ['senior', 'lead'],
+}
+
+# Headings containing any of these look like job titles
+JOB_TITLE_KEYWORDS = [
+    'customer', 'sales', 'marketing', 'support', 'service',
+    'manager', 'specialist', 'coordinator', 'representative',
+    'assistant', 'engineer', 'developer', 'analyst', 'designer'
+]
+
+# Homepage links whose text or path contain these are probed as careers pages
+CAREER_LINK_KEYWORDS = [
+    'career', 'job', 'hiring', 'join us', 'join our team', 'work with us',
+    'opportunities', 'openings', 'vacancies', 'open positions'
+]
+
+# Compiled once at import (also in pool workers)
+CAREER_LINK_MATCHER = KeywordMatcher({'careers': CAREER_LINK_KEYWORDS})
+ROLE_MATCHER = KeywordMatcher({**{keyword: [keyword] for keyword in ROLE_SALARY_MAP}, **SENIORITY_KEYWORDS})
+JOB_TITLE_MATCHER = KeywordMatcher({'job': JOB_TITLE_KEYWORDS})
+
 # AI Agent pricing (monthly)
 AI_AGENT_COST = 99  # Pro plan per month = $1188/year
 
-async def extract_job_postings(url: str) -> List[Dict]:
+def parse_job_listings(html: str, source_url: str) -> List[Dict]:
+    """
+    Extract job titles and descriptions from a careers page
+    Runs in the extraction process pool
+    """
+    job_postings = []
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Look for common patterns
+    for heading in soup.find_all(['h2', 'h3', 'h4']):
+        text = heading.get_text().strip()
+        
+        # Check if it looks like a job title
+        if JOB_TITLE_MATCHER.search(text):
+            # Get description from next siblings
+            description = ""
+            next_elem = heading.find_next_sibling()
+            if next_elem:
+                description = next_elem.get_text().strip()[:500]
+            
+            job_postings.append({
+                "title": text,
+                "description": description,
+                "source_url": source_url
+            })
+    
+    return job_postings
+
+
+def parse_hiring_sections(html: str, source_url: str) -> List[Dict]:
+    """
+    Extract headings from "hiring" / "join our team" sections of a page
+    Runs in the extraction process pool
+    """
+    job_postings = []
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    for section in soup.find_all(['div', 'section'], class_=re.compile(r'career|job|hiring|team', re.I)):
+        headings = section.find_all(['h2', 'h3', 'h4'])
+        for h in headings[:5]:  # Limit to 5
+            job_postings.append({
+                "title": h.get_text().strip(),
+                "description": "",
+                "source_url": source_url
+            })
+    
+    return job_postings
+
+
+async def _probe_careers_page(job_url: str, slots: asyncio.Semaphore, deadline: float) -> List[Dict]:
+    """
+    Fetch one candidate careers URL and parse its job listings
+    """
+    async with slots:
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            return []
+        page = await fetch_html(job_url, budget=remaining)
+    
+    if page.status_code != 200:
+        return []
+    return await extraction_pool.run(parse_job_listings, page.html, job_url)
+
+
+def find_careers_links(context: AnalysisContext) -> List[str]:
+    """
+    Careers page candidates among the links already extracted from the homepage
+    """
+    urls = []
+    for link in context.links:
+        href = link['href']
+        if not href.startswith(('http://', 'https://')) or href in urls:
+            continue
+        path = urlsplit(href).path.replace('-', ' ').replace('_', ' ')
+        if CAREER_LINK_MATCHER.search(link['text']) or CAREER_LINK_MATCHER.search(path):
+            urls.append(href)
+    return urls[:len(CAREER_PATHS)]
+
+
+async def extract_job_postings(url: str, context: Optional[AnalysisContext] = None) -> List[Dict]:
     """
     Scan website for job postings on careers/jobs pages
+    With a context, careers links found on the homepage are probed instead
+    of guessed paths, and the homepage itself is not refetched
     """
-    job_pages_found = []
     job_postings = []
     
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            # Try common job page URLs
-            career_paths = [
-                '/careers', '/jobs', '/join-us', '/team', '/about/careers',
-                '/company/careers', '/work-with-us', '/opportunities'
-            ]
-            
-            for path in career_paths:
-                try:
-                    job_url = url.rstrip('/') + path
-                    response = await client.get(job_url)
-                    
-                    if response.status_code == 200:
-                        job_pages_found.append(job_url)
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        
-                        # Extract job titles and descriptions
-                        # Look for common patterns
-                        for heading in soup.find_all(['h2', 'h3', 'h4']):
-                            text = heading.get_text().strip()
-                            
-                            # Check if it looks like a job title
-                            if any(keyword in text.lower() for keyword in [
-                                'customer', 'sales', 'marketing', 'support', 'service',
-                                'manager', 'specialist', 'coordinator', 'representative',
-                                'assistant', 'engineer', 'developer', 'analyst', 'designer'
-                            ]):
-                                # Get description from next siblings
-                                description = ""
-                                next_elem = heading.find_next_sibling()
-                                if next_elem:
-                                    description = next_elem.get_text().strip()[:500]
-                                
-                                job_postings.append({
-                                    "title": text,
-                                    "description": description,
-                                    "source_url": job_url
-                                })
+        job_urls = find_careers_links(context) if context else []
+        if not job_urls:
+            job_urls = [url.rstrip('/') + path for path in CAREER_PATHS]
+        
+        # Probe candidate URLs concurrently; the first page with listings wins
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + CAREERS_PROBE_DEADLINE
+        slots = asyncio.Semaphore(CAREERS_PROBE_CONCURRENCY)
+        probes = [
+            asyncio.create_task(_probe_careers_page(job_url, slots, deadline))
+            for job_url in job_urls
+        ]
+        
+        try:
+            pending = set(probes)
+            while pending and not job_postings:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(0.0, deadline - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break  # Deadline reached
                 
-                except:
-                    continue
+                # Prefer candidate order when several finish together
+                for task in probes:
+                    if task in done and task.exception() is None:
+                        job_postings.extend(task.result())
+        finally:
+            for task in probes:
+                task.cancel()
+            await asyncio.gather(*probes, return_exceptions=True)
         
         # If no structured job pages, scan main page for job-related content
         if not job_postings:
             try:
-                response = await client.get(url)
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Look for "hiring", "join our team" sections
-                for section in soup.find_all(['div', 'section'], class_=re.compile(r'career|job|hiring|team', re.I)):
-                    headings = section.find_all(['h2', 'h3', 'h4'])
-                    for h in headings[:5]:  # Limit to 5
-                        job_postings.append({
-                            "title": h.get_text().strip(),
-                            "description": "",
-                            "source_url": url
-                        })
+                if context and context.html:
+                    html = context.html
+                else:
+                    html = (await fetch_html(url)).html
+                job_postings.extend(await extraction_pool.run(parse_hiring_sections, html, url))
             except:
                 pass
     
@@ -102,23 +215,79 @@ async def extract_job_postings(url: str) -> List[Dict]:
     return job_postings[:10]  # Limit to 10 jobs
 
 
+AVAILABLE_AGENTS = """Available GR8 AI Agents:
+1. AI Chat Support Agent - Handles customer inquiries 24/7
+2. AI Sales Assistant - Qualifies leads, handles basic sales questions
+3. AI Appointment Scheduler - Books meetings automatically
+4. AI Email Assistant - Drafts responses, manages inbox
+5. AI Content Generator - Creates marketing copy, blog posts
+6. AI Lead Capture Agent - Captures and qualifies leads
+7. AI Workflow Automator - Handles repetitive tasks"""
+
+MAPPING_FIELDS = ['ai_agent', 'automation_potential', 'classification', 'automated_tasks', 'explanation']
+
+WORKFORCE_SYSTEM_MESSAGE = "You are a workforce automation expert analyzing job roles."
+
+
+def _parse_json_response(response: str):
+    """Strip optional ```json fences and parse"""
+    response_text = response.strip()
+    if '```json' in response_text:
+        response_text = response_text.split('```json')[1].split('```')[0].strip()
+    elif '```' in response_text:
+        response_text = response_text.split('```')[1].split('```')[0].strip()
+    return json.loads(response_text)
+
+
+def _add_savings(mapping: Dict, job_title: str) -> Dict:
+    """Calculate cost savings against the estimated salary for the role"""
+    estimated_salary = estimate_role_salary(job_title)
+    annual_ai_cost = AI_AGENT_COST * 12
+    annual_savings = estimated_salary - annual_ai_cost
+    monthly_savings = annual_savings / 12
+    
+    mapping['estimated_annual_salary'] = estimated_salary
+    mapping['ai_annual_cost'] = annual_ai_cost
+    mapping['annual_savings'] = annual_savings
+    mapping['monthly_savings'] = int(monthly_savings)
+    return mapping
+
+
+def _default_mapping() -> Dict:
+    return {
+        "ai_agent": "AI Workflow Automator",
+        "secondary_agent": None,
+        "automation_potential": 50,
+        "classification": "Assistant",
+        "automated_tasks": ["Automate repetitive tasks"],
+        "explanation": "General automation can improve efficiency",
+        "estimated_annual_salary": 45000,
+        "ai_annual_cost": AI_AGENT_COST * 12,
+        "annual_savings": 45000 - (AI_AGENT_COST * 12),
+        "monthly_savings": int((45000 - (AI_AGENT_COST * 12)) / 12)
+    }
+
+
 async def map_job_to_ai_agent(job_title: str, job_description: str) -> Dict:
     """
     Use AI to map a job role to GR8 AI agent recommendation
     """
+    cached = await job_mapping_cache.get(job_title)
+    if cached:
+        return _add_savings(cached, job_title)
+    return await _map_single_job(job_title, job_description)
+
+
+async def _map_single_job(job_title: str, job_description: str) -> Dict:
+    """
+    One LLM call for one job; successful mappings are cached
+    """
     prompt = f"""Analyze this job role and recommend which GR8 AI Agent(s) could replace or assist:
 
 Job Title: {job_title}
 Description: {job_description}
 
-Available GR8 AI Agents:
-1. AI Chat Support Agent - Handles customer inquiries 24/7
-2. AI Sales Assistant - Qualifies leads, handles basic sales questions
-3. AI Appointment Scheduler - Books meetings automatically
-4. AI Email Assistant - Drafts responses, manages inbox
-5. AI Content Generator - Creates marketing copy, blog posts
-6. AI Lead Capture Agent - Captures and qualifies leads
-7. AI Workflow Automator - Handles repetitive tasks
+{AVAILABLE_AGENTS}
 
 For this role, provide:
 1. Primary AI Agent recommendation (choose 1-2 from above)
@@ -138,78 +307,150 @@ Respond in JSON:
 }}"""
     
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            system_message="You are a workforce automation expert analyzing job roles."
-        ).with_model("openai", "gpt-4o")
-        
-        response = await chat.send_message(UserMessage(text=prompt))
-        
-        # Parse JSON
-        import json
-        response_text = response.strip()
-        if '```json' in response_text:
-            response_text = response_text.split('```json')[1].split('```')[0].strip()
-        elif '```' in response_text:
-            response_text = response_text.split('```')[1].split('```')[0].strip()
-        
-        mapping = json.loads(response_text)
-        
-        # Calculate cost savings
-        estimated_salary = estimate_role_salary(job_title)
-        annual_ai_cost = AI_AGENT_COST * 12
-        annual_savings = estimated_salary - annual_ai_cost
-        monthly_savings = annual_savings / 12
-        
-        mapping['estimated_annual_salary'] = estimated_salary
-        mapping['ai_annual_cost'] = annual_ai_cost
-        mapping['annual_savings'] = annual_savings
-        mapping['monthly_savings'] = int(monthly_savings)
-        
-        return mapping
+        response = await llm_gateway.complete(
+            JOB_MAPPING_MODEL,
+            prompt,
+            system_message=WORKFORCE_SYSTEM_MESSAGE,
+            priority=LLMPriority.BACKGROUND,
+            feature="job_mapping"
+        )
+        mapping = _parse_json_response(response)
+        await job_mapping_cache.put(job_title, mapping)
+        return _add_savings(mapping, job_title)
         
     except Exception as e:
         print(f"Job mapping error: {e}")
-        return {
-            "ai_agent": "AI Workflow Automator",
-            "secondary_agent": None,
-            "automation_potential": 50,
-            "classification": "Assistant",
-            "automated_tasks": ["Automate repetitive tasks"],
-            "explanation": "General automation can improve efficiency",
-            "estimated_annual_salary": 45000,
-            "ai_annual_cost": AI_AGENT_COST * 12,
-            "annual_savings": 45000 - (AI_AGENT_COST * 12),
-            "monthly_savings": int((45000 - (AI_AGENT_COST * 12)) / 12)
-        }
+        return _default_mapping()
+
+
+async def _map_jobs_in_batch(jobs: List[Dict]) -> Dict[int, Dict]:
+    """
+    Map every job with one LLM call
+    Returns mappings by job index; malformed or missing entries are left out
+    """
+    job_lines = "\n\n".join(
+        f"Job {i}:\nJob Title: {job['title']}\nDescription: {job['description'][:500]}"
+        for i, job in enumerate(jobs)
+    )
+    prompt = f"""Analyze each of these job roles and recommend which GR8 AI Agent(s) could replace or assist:
+
+{job_lines}
+
+{AVAILABLE_AGENTS}
+
+For each role, provide:
+1. Primary AI Agent recommendation (choose 1-2 from above)
+2. Automation potential (0-100%)
+3. Role classification: Full Replacement, Assistant, or Hybrid
+4. Key tasks that can be automated
+5. Brief explanation
+
+Respond with a JSON array containing one object per job, in order:
+[
+  {{
+    "job": 0,
+    "ai_agent": "Primary agent name",
+    "secondary_agent": "Secondary agent or null",
+    "automation_potential": 85,
+    "classification": "Full Replacement|Assistant|Hybrid",
+    "automated_tasks": ["task 1", "task 2", "task 3"],
+    "explanation": "Brief explanation of how AI can help"
+  }}
+]"""
+    
+    try:
+        response = await llm_gateway.complete(
+            JOB_MAPPING_MODEL,
+            prompt,
+            system_message=WORKFORCE_SYSTEM_MESSAGE,
+            priority=LLMPriority.BACKGROUND,
+            feature="job_mapping"
+        )
+        results = _parse_json_response(response)
+        if isinstance(results, dict):
+            results = results.get('jobs') or results.get('results') or []
+    
+    except Exception as e:
+        print(f"Batch job mapping error: {e}")
+        return {}
+    
+    mappings = {}
+    for position, mapping in enumerate(results if isinstance(results, list) else []):
+        if not isinstance(mapping, dict) or any(field not in mapping for field in MAPPING_FIELDS):
+            continue
+        index = mapping.pop('job', position)
+        if isinstance(index, int) and 0 <= index < len(jobs) and index not in mappings:
+            await job_mapping_cache.put(jobs[index]['title'], mapping)
+            mappings[index] = _add_savings(mapping, jobs[index]['title'])
+    return mappings
+
+
+async def map_jobs_to_ai_agents(jobs: List[Dict]) -> List[Dict]:
+    """
+    Map job postings to AI agents, in the same order as jobs
+    Cached titles skip the LLM; the rest go in one batched LLM call, and jobs
+    it failed to cover are mapped individually, concurrently (at most
+    JOB_MAPPING_CONCURRENCY calls at once)
+    """
+    mappings = {}
+    for i, job in enumerate(jobs):
+        cached = await job_mapping_cache.get(job['title'])
+        if cached:
+            mappings[i] = _add_savings(cached, job['title'])
+    
+    uncached = [i for i in range(len(jobs)) if i not in mappings]
+    if JOB_MAPPING_BATCH and len(uncached) > 1:
+        batch = await _map_jobs_in_batch([jobs[i] for i in uncached])
+        for position, mapping in batch.items():
+            mappings[uncached[position]] = mapping
+    
+    missing = [i for i in range(len(jobs)) if i not in mappings]
+    if missing:
+        slots = asyncio.Semaphore(JOB_MAPPING_CONCURRENCY)
+        
+        async def map_one(index: int):
+            async with slots:
+                mappings[index] = await _map_single_job(jobs[index]['title'], jobs[index]['description'])
+        
+        await asyncio.gather(*(map_one(i) for i in missing))
+    
+    return [mappings[i] for i in range(len(jobs))]
 
 
 def estimate_role_salary(job_title: str) -> int:
     """
     Estimate annual salary based on job title keywords
     """
-    title_lower = job_title.lower()
+    found = ROLE_MATCHER.find(job_title)
     
+    # First role in ROLE_SALARY_MAP order wins, as before
     for keyword, salary in ROLE_SALARY_MAP.items():
-        if keyword in title_lower:
+        if keyword in found:
             return salary
     
     # Default if no match
-    if 'manager' in title_lower or 'director' in title_lower:
-        return 75000
-    elif 'senior' in title_lower or 'lead' in title_lower:
-        return 65000
-    else:
-        return 45000  # Default mid-level
+    tiers = ROLE_MATCHER.score(found)
+    for salary in SENIORITY_KEYWORDS:
+        if tiers.get(salary):
+            return salary
+    return 45000  # Default mid-level
 
 
-async def analyze_workforce_opportunities(url: str) -> Dict:
+async def analyze_workforce_opportunities(url: str, context: Optional[AnalysisContext] = None) -> Dict:
     """
     Complete workforce analysis combining job scan and AI mapping
     Always returns recommendations even if no job postings found
+    Concurrent scans of the same URL share one run
     """
+    return await analysis_flights.run(
+        f"workforce:{normalize_url(url)}",
+        lambda: _scan_workforce(url, context)
+    )
+
+
+async def _scan_workforce(url: str, context: Optional[AnalysisContext]) -> Dict:
     # Extract jobs
-    jobs = await extract_job_postings(url)
+    jobs = await extract_job_postings(url, context)
     
     # If no jobs found, provide general workforce recommendations
     if not jobs:
@@ -262,9 +503,9 @@ async def analyze_workforce_opportunities(url: str) -> Dict:
     opportunities = []
     total_savings = 0
     
-    for job in jobs:
-        mapping = await map_job_to_ai_agent(job['title'], job['description'])
-        
+    mappings = await map_jobs_to_ai_agents(jobs)
+    
+    for job, mapping in zip(jobs, mappings):
         opportunities.append({
             "job_title": job['title'],
             "job_description": job['description'][:200],
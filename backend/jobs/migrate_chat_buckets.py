@@ -0,0 +1,95 @@
+"""
+Migrate chatbot_messages into chat_transcripts buckets
+Streams messages in (session_id, timestamp) order, packs each session's turns
+into buckets of CHAT_BUCKET_TURNS and inserts them. Bucket ids derive from
+their first message, so re-running skips buckets already migrated.
+Run with CHAT_STORAGE=buckets already deployed, so new turns land in buckets:
+    python -m jobs.migrate_chat_buckets [--delete] [--dry-run]
+"""
+import os
+import asyncio
+import argparse
+from typing import Dict, Any, List
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+from services.chat_store import CHAT_BUCKET_TURNS, DUPLICATE_KEY
+
+MONGO_URL = os.environ.get('MONGO_URL')
+
+
+def build_buckets(session_id: str, messages: List[Dict[str, Any]], bucket_turns: int = CHAT_BUCKET_TURNS) -> List[Dict[str, Any]]:
+    """Pack a session's messages (oldest first) into bucket documents; a user message starts a turn"""
+    turns: List[List[Dict[str, Any]]] = []
+    for message in messages:
+        if not turns or message.get("role") == "user":
+            turns.append([])
+        turns[-1].append(message)
+
+    buckets = []
+    for start in range(0, len(turns), bucket_turns):
+        chunk = [message for turn in turns[start:start + bucket_turns] for message in turn]
+        buckets.append({
+            "_id": f"{session_id}:{chunk[0]['_id']}",
+            "session_id": session_id,
+            "website_id": chunk[0].get("website_id"),
+            "turns": len(turns[start:start + bucket_turns]),
+            "message_count": len(chunk),
+            "first_at": chunk[0]["timestamp"],
+            "last_at": chunk[-1]["timestamp"],
+            "messages": [
+                {key: value for key, value in message.items() if key not in ("website_id", "session_id")}
+                for message in chunk
+            ]
+        })
+    return buckets
+
+
+async def _migrate_session(db, session_id: str, messages: List[Dict[str, Any]], delete: bool, dry_run: bool) -> int:
+    buckets = build_buckets(session_id, messages)
+    if dry_run:
+        return len(buckets)
+    try:
+        await db["chat_transcripts"].insert_many(buckets, ordered=False)
+    except BulkWriteError as e:
+        if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+            raise
+    if delete:
+        await db["chatbot_messages"].delete_many({"_id": {"$in": [message["_id"] for message in messages]}})
+    return len(buckets)
+
+
+async def migrate_chat_buckets(delete: bool = False, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Migrate every session; with delete, each session's messages are removed
+    once its buckets are stored
+    """
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client["gr8_automation"]
+    totals = {"sessions": 0, "messages": 0, "buckets": 0}
+
+    session_id, messages = None, []
+    cursor = db["chatbot_messages"].find({}).sort([("session_id", 1), ("timestamp", 1)])
+    async for message in cursor:
+        if message["session_id"] != session_id and messages:
+            totals["buckets"] += await _migrate_session(db, session_id, messages, delete, dry_run)
+            totals["sessions"] += 1
+            messages = []
+        session_id = message["session_id"]
+        messages.append(message)
+        totals["messages"] += 1
+    if messages:
+        totals["buckets"] += await _migrate_session(db, session_id, messages, delete, dry_run)
+        totals["sessions"] += 1
+
+    client.close()
+    print(f"{'Would migrate' if dry_run else 'Migrated'} {totals['messages']} messages "
+          f"from {totals['sessions']} sessions into {totals['buckets']} buckets")
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack chatbot_messages into chat_transcripts buckets")
+    parser.add_argument("--delete", action="store_true", help="remove migrated messages from chatbot_messages")
+    parser.add_argument("--dry-run", action="store_true", help="count buckets without writing")
+    args = parser.parse_args()
+    asyncio.run(migrate_chat_buckets(delete=args.delete, dry_run=args.dry_run))
@@ -0,0 +1,31 @@
+"""
+Purge cached job-title -> AI agent mappings from Mongo
+New prompt versions never read older mappings, so this only reclaims space
+before the retention TTL does; run it after a deploy that bumps the version:
+    python -m jobs.purge_job_mappings [--version VERSION]
+"""
+import os
+import asyncio
+import argparse
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+from analyzer.workforce_scanner import job_mapping_cache
+
+MONGO_URL = os.environ.get('MONGO_URL')
+
+
+async def purge_job_mappings(version: Optional[str] = None) -> int:
+    """Delete mappings for one version, or every version but the current one"""
+    client = AsyncIOMotorClient(MONGO_URL)
+    job_mapping_cache.attach(client["gr8_automation"])
+    deleted = await job_mapping_cache.invalidate(version)
+    client.close()
+    print(f"Deleted {deleted} job mappings (current version {job_mapping_cache.version})")
+    return deleted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete cached job mappings from Mongo")
+    parser.add_argument("--version", help="prompt version to delete (default: every outdated version)")
+    args = parser.parse_args()
+    asyncio.run(purge_job_mappings(args.version))
@@ -2,10 +2,12 @@
 GR8 AI Automation - Production Backend (Iteration 1)
 Features: Authentication, AI Chatbot, Stripe Billing
 """
-from fastapi import FastAPI, HTTPException, Request, Response, Depends
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import json
 import uuid
 import httpx
 from datetime import datetime, timedelta, timezone
@@ -26,13 +28,25 @@ load_dotenv()
 from models.schemas import (
     AnalysisRequest, AnalysisResponse, AutomationActivateRequest
 )
-from analyzer.website_fetcher import fetch_and_extract_website
-from analyzer.ai_analyzer import analyze_website_for_automations
-from analyzer.workforce_scanner import analyze_workforce_opportunities
+from analyzer.http_client import start_fetch_client, close_fetch_client
+from analyzer.website_fetcher import fetch_analysis_context
+from analyzer.page_cache import page_cache
+from analyzer.parse_pool import extraction_pool
+from analyzer.llm_cache import llm_cache
+from analyzer.single_flight import analysis_flights
+from analyzer.ai_analyzer import analyze_website_for_automations, stream_website_analysis
+from analyzer.workforce_scanner import analyze_workforce_opportunities, job_mapping_cache
 from services.orchestrator import OrchestratorService
-from services.chatbot_service import process_chatbot_message, get_chatbot_history
+from services.analysis_jobs import AnalysisJobService
+from services.llm_gateway import llm_gateway, LLMPriority
+from services.llm_metrics import llm_metrics, llm_owner
+from services.chatbot_service import process_chatbot_message, stream_chatbot_message, get_chatbot_history
+from services.chatbot_context import chatbot_context_cache
+from services.chat_store import chat_store
+from services.chat_memory import chat_memory
 from services.usage_tracker import PLAN_LIMITS, track_usage, get_usage, check_limit
-from services.lead_service import generate_and_send_lead_autoresponse, score_lead
+from services.lead_service import score_lead_detailed
+from services.lead_pipeline import LeadPipeline
 from services.analytics_service import get_dashboard_analytics
 from services.appointment_service import AppointmentScheduler
 from services.report_generator import generate_automation_report_pdf
@@ -101,6 +115,8 @@ chatbot_sessions = db["chatbot_sessions"]
 
 # Services
 orchestrator = OrchestratorService(db)
+analysis_jobs = AnalysisJobService(db)
+lead_pipeline = LeadPipeline(db)
 appointment_scheduler = AppointmentScheduler(db)
 
 # Stripe
@@ -150,6 +166,46 @@ async def startup():
     await db["appointments"].create_index([("website_id", 1), ("start_time", 1)])
     await db["appointments"].create_index([("website_id", 1), ("status", 1)])
     print("✓ Indexes created")
+    
+    # Shared pooled HTTP client and page cache for website analysis
+    await start_fetch_client()
+    page_cache.attach(db)
+    await page_cache.ensure_indexes()
+    job_mapping_cache.attach(db)
+    await job_mapping_cache.ensure_indexes()
+    llm_cache.attach(db)
+    await llm_cache.ensure_indexes()
+    analysis_flights.attach(db)
+    await analysis_flights.ensure_indexes()
+    llm_metrics.attach(db)
+    await llm_metrics.ensure_indexes()
+    llm_metrics.start()
+    chatbot_context_cache.attach(db)
+    chatbot_context_cache.start()
+    chat_store.attach(db)
+    await chat_store.ensure_indexes()
+    chat_store.start()
+    extraction_pool.start()
+    print("✓ Fetch client, page cache and extraction pool started")
+    
+    # Workers for queued analyses and free reports
+    await analysis_jobs.ensure_indexes()
+    analysis_jobs.start()
+    await lead_pipeline.ensure_indexes()
+    lead_pipeline.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop job workers, release pooled connections and extraction workers"""
+    await analysis_jobs.stop()
+    await lead_pipeline.stop()
+    await llm_metrics.stop()
+    await chatbot_context_cache.stop()
+    await chat_memory.stop()
+    await chat_store.stop()
+    await close_fetch_client()
+    extraction_pool.shutdown()
 
 
 # ========== HEALTH ==========
@@ -517,6 +573,7 @@ async def demo_login(response: Response):
             await orchestrator.add_log(exec_id, "Demo lead capture automation activated")
             await orchestrator.update_execution_state(exec_id, "completed")
         
+        chatbot_context_cache.invalidate(demo_website_id)
     else:
         await users.update_one({"_id": user["_id"]}, {"$set": {"last_login": datetime.now(timezone.utc)}})
     
@@ -551,10 +608,100 @@ async def demo_login(response: Response):
 
 
 # ========== ANALYSIS ==========
-@app.post("/api/analyze")
+async def _run_stage(coro, progress, stage: str):
+    """Await a pipeline step and stamp its stage on the job"""
+    result = await coro
+    await progress(stage)
+    return result
+
+
+async def run_analyze_job(job: dict, progress) -> dict:
+    """Analysis pipeline for /api/analyze, run by the job workers"""
+    url = job["payload"]["url"]
+    user_id = job["owner_id"]
+    
+    context = await fetch_analysis_context(url)
+    extraction = context.extraction
+    await progress("fetched")
+    
+    # Run both analyses in parallel; the workforce scan reuses the fetched homepage
+    with llm_owner(user_id):
+        analysis, workforce = await asyncio.gather(
+            _run_stage(analyze_website_for_automations(extraction), progress, "analyzed"),
+            _run_stage(analyze_workforce_opportunities(url, context), progress, "workforce_mapped")
+        )
+    
+    # Website record is keyed by the job, so a retried job doesn't save or bill twice
+    website_id = job["_id"]
+    await _save_website_analysis(website_id, user_id, url, extraction, analysis, workforce)
+    await progress("saved")
+    
+    return {
+        "analysis_id": website_id,
+        "url": url,
+        "summary": analysis.summary,
+        "business_type": analysis.business_type.value,
+        "strengths": analysis.strengths,
+        "opportunities": analysis.opportunities,
+        "recommendations": [_recommendation_view(r) for r in analysis.recommendations],
+        "confidence_score": analysis.confidence_score,
+        "workforce": workforce
+    }
+
+
+async def _save_website_analysis(website_id: str, user_id: str, url: str, extraction, analysis, workforce: dict):
+    """Upsert the website record; usage is tracked only when it is first inserted"""
+    saved = await websites.replace_one({"_id": website_id}, {
+        "_id": website_id,
+        "owner_id": user_id,
+        "url": url,
+        "title": extraction.title,
+        "business_type": extraction.business_type.value,
+        "fetched_at": datetime.now(timezone.utc),
+        "analysis_summary": analysis.summary,
+        "content_digest": extraction.content_text[:500],
+        "workforce_scan": workforce
+    }, upsert=True)
+    chatbot_context_cache.invalidate(website_id)
+    
+    if saved.upserted_id is not None:
+        await track_usage(db, user_id, ai_interactions=1)
+
+
+def _recommendation_view(r) -> dict:
+    return {
+        "key": r.key,
+        "title": r.title,
+        "description": r.description,
+        "rationale": r.rationale,
+        "expected_impact": r.expected_impact,
+        "category": r.category.value,
+        "priority": r.priority.value,
+        "estimated_value": r.estimated_value
+    }
+
+
+analysis_jobs.register("analyze", run_analyze_job)
+
+
+def _job_accepted(job: dict, created: bool) -> dict:
+    return {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "duplicate": not created,
+        "status_url": f"/api/analysis-jobs/{job['_id']}"
+    }
+
+
+@app.post("/api/analyze", status_code=202)
 @limiter.limit("5/minute")  # 5 website analyses per minute
-async def analyze(req: AnalysisRequest, request: Request, user: dict = Depends(get_current_user)):
-    """Analyze website (AUTH REQUIRED)"""
+async def analyze(
+    req: AnalysisRequest,
+    request: Request,
+    user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Queue a website analysis (AUTH REQUIRED); poll /api/analysis-jobs/{job_id} for the result"""
     user_id = user["user_id"]
     user_doc = await users.find_one({"_id": user_id})
     plan = user_doc.get("plan", "free")
@@ -566,54 +713,113 @@ async def analyze(req: AnalysisRequest, request: Request, user: dict = Depends(g
     if not await check_limit(db, user_id, "ai_interactions", plan):
         raise HTTPException(403, f"AI interaction limit reached. Upgrade your plan.")
     
+    job, created = await analysis_jobs.submit("analyze", {"url": req.url}, owner_id=user_id, idempotency_key=idempotency_key)
+    return _job_accepted(job, created)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/api/analyze/stream")
+@limiter.limit("5/minute")  # Same budget as /api/analyze
+async def analyze_stream(req: AnalysisRequest, request: Request, user: dict = Depends(get_current_user)):
+    """
+    Streaming website analysis (AUTH REQUIRED) as server-sent events:
+    extraction, summary, strengths, opportunities, one recommendation event
+    per automation as the LLM writes it, workforce, then done (or error)
+    """
+    user_id = user["user_id"]
+    user_doc = await users.find_one({"_id": user_id})
+    plan = user_doc.get("plan", "free")
+    
+    if not await check_limit(db, user_id, "websites", plan):
+        raise HTTPException(403, "Website limit reached. Upgrade your plan.")
+    
+    if not await check_limit(db, user_id, "ai_interactions", plan):
+        raise HTTPException(403, "AI interaction limit reached. Upgrade your plan.")
+    
+    return StreamingResponse(
+        _analysis_events(req.url, user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _analysis_events(url: str, user_id: str):
     try:
-        extraction = await fetch_and_extract_website(req.url)
-        
-        # Run both analyses in parallel
-        analysis, workforce = await asyncio.gather(
-            analyze_website_for_automations(extraction),
-            analyze_workforce_opportunities(req.url)
-        )
-        
-        website_id = str(uuid.uuid4())
-        await websites.insert_one({
-            "_id": website_id,
-            "owner_id": user_id,
-            "url": req.url,
-            "title": extraction.title,
-            "business_type": extraction.business_type.value,
-            "fetched_at": datetime.now(timezone.utc),
-            "analysis_summary": analysis.summary,
-            "content_digest": extraction.content_text[:500],
-            "workforce_scan": workforce
-        })
-        
-        await track_usage(db, user_id, ai_interactions=1)
-        
-        recommendations = [{
-            "key": r.key,
-            "title": r.title,
-            "description": r.description,
-            "rationale": r.rationale,
-            "expected_impact": r.expected_impact,
-            "category": r.category.value,
-            "priority": r.priority.value,
-            "estimated_value": r.estimated_value
-        } for r in analysis.recommendations]
-        
-        return {
-            "analysis_id": website_id,
-            "url": req.url,
-            "summary": analysis.summary,
-            "business_type": analysis.business_type.value,
-            "strengths": analysis.strengths,
-            "opportunities": analysis.opportunities,
-            "recommendations": recommendations,
-            "confidence_score": analysis.confidence_score,
-            "workforce": workforce
-        }
+        context = await fetch_analysis_context(url)
     except Exception as e:
-        raise HTTPException(500, f"Analysis failed: {str(e)}")
+        yield _sse("error", {"detail": f"Analysis failed: {e}"})
+        return
+    extraction = context.extraction
+    yield _sse("extraction", {
+        "url": extraction.url,
+        "title": extraction.title,
+        "description": extraction.description,
+        "business_type": extraction.business_type.value
+    })
+    
+    # LLM events and the workforce scan are merged in completion order
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def pump_analysis():
+        try:
+            with llm_owner(user_id):
+                async for event in stream_website_analysis(extraction):
+                    await queue.put(event)
+        except Exception as e:
+            await queue.put(("error", {"detail": f"Analysis failed: {e}"}))
+        finally:
+            await queue.put(None)
+    
+    async def pump_workforce():
+        try:
+            with llm_owner(user_id):
+                result = await analyze_workforce_opportunities(url, context)
+            await queue.put(("workforce", result))
+        except Exception as e:
+            print(f"Workforce scan error: {e}")
+            await queue.put(("workforce", {}))
+        finally:
+            await queue.put(None)
+    
+    tasks = [asyncio.create_task(pump_analysis()), asyncio.create_task(pump_workforce())]
+    analysis, workforce = None, {}
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if item is None:
+                remaining -= 1
+                continue
+            event, data = item
+            if event == "analysis":
+                analysis = data
+                continue
+            if event == "workforce":
+                workforce = data
+            yield _sse(event, data)
+    finally:
+        # Client went away: stop the LLM stream and the scan
+        for task in tasks:
+            task.cancel()
+    
+    if analysis is None:
+        return
+    website_id = str(uuid.uuid4())
+    await _save_website_analysis(website_id, user_id, url, extraction, analysis, workforce)
+    yield _sse("done", {"analysis_id": website_id, "confidence_score": analysis.confidence_score})
+
+
+@app.get("/api/analysis-jobs/{job_id}")
+async def get_analysis_job(job_id: str, user: Optional[dict] = Depends(get_current_user_optional)):
+    """Status, stage progress and (when completed) result of an analysis job"""
+    job = await analysis_jobs.get_job(job_id)
+    # Jobs submitted by a signed-in user are only visible to that user
+    if not job or (job.get("owner_id") and (not user or user["user_id"] != job["owner_id"])):
+        raise HTTPException(404, "Job not found")
+    return analysis_jobs.serialize(job)
 
 
 # ========== AUTOMATIONS ==========
@@ -654,6 +860,7 @@ async def activate(req: AutomationActivateRequest, user: dict = Depends(get_curr
         "created_at": datetime.now(timezone.utc),
         "updated_at": datetime.now(timezone.utc)
     })
+    chatbot_context_cache.invalidate(req.website_id)
     
     workflow_id = str(uuid.uuid4())
     await workflows.insert_one({
@@ -684,6 +891,7 @@ async def update_automation(automation_id: str, updates: dict, user: dict = Depe
         raise HTTPException(404, "Not found")
     
     auto = await automations.find_one({"_id": automation_id})
+    chatbot_context_cache.invalidate(auto["website_id"])
     return serialize_doc(auto)
 
 
@@ -707,27 +915,49 @@ class FormCreateRequest(BaseModel):
 @limiter.limit("30/minute")  # 30 messages per minute per IP
 async def chatbot_message(req: ChatbotMessageRequest, request: Request):
     """Public chatbot endpoint (no auth required)"""
-    website = await websites.find_one({"_id": req.website_id})
-    if not website:
+    context = await chatbot_context_cache.get(db, req.website_id)
+    if not context:
         raise HTTPException(404, "Website not found - please activate chatbot automation first")
     
     # Check if chatbot automation is active
-    chatbot_auto = await automations.find_one({
-        "website_id": req.website_id,
-        "template_id": "ai-chatbot",
-        "status": "active"
-    })
-    if not chatbot_auto:
+    if not context["active"]:
         raise HTTPException(403, "Chatbot not activated for this website")
     
-    # Track usage for website owner
-    await track_usage(db, website.get("owner_id"), chatbot_messages=1)
-    
-    # Process message
-    result = await process_chatbot_message(db, req.website_id, req.session_id, req.message)
+    # Track usage for website owner while the message is processed
+    _, result = await asyncio.gather(
+        track_usage(db, context["owner_id"], chatbot_messages=1),
+        process_chatbot_message(db, req.website_id, req.session_id, req.message)
+    )
     return result
 
 
+@app.post("/api/chatbot/stream")
+@limiter.limit("30/minute")  # Same budget as /api/chatbot/message
+async def chatbot_stream(req: ChatbotMessageRequest, request: Request):
+    """
+    Public streaming chatbot endpoint (no auth required) as server-sent events:
+    token events as the reply is written, then done with the saved message
+    """
+    context = await chatbot_context_cache.get(db, req.website_id)
+    if not context:
+        raise HTTPException(404, "Website not found - please activate chatbot automation first")
+    
+    if not context["active"]:
+        raise HTTPException(403, "Chatbot not activated for this website")
+    
+    await track_usage(db, context["owner_id"], chatbot_messages=1)
+    return StreamingResponse(
+        _chatbot_events(req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _chatbot_events(req: ChatbotMessageRequest):
+    async for event, data in stream_chatbot_message(db, req.website_id, req.session_id, req.message):
+        yield _sse(event, data)
+
+
 @app.get("/api/chatbot/history/{session_id}")
 async def chatbot_history(session_id: str):
     """Get chat history"""
@@ -794,41 +1024,24 @@ async def submit_form(form_id: str, req: FormSubmitRequest, request: Request):
     if not form:
         raise HTTPException(404, "Form not found")
     
-    # Score and store lead
-    score = await score_lead(db, req.data)
+    # Store the lead; workers score it, write and email its auto-response and track usage
     lead_id = str(uuid.uuid4())
-    await db["leads"].insert_one({
+    await lead_pipeline.submit({
         "_id": lead_id,
         "form_id": form_id,
         "website_id": form.get("website_id"),
         "owner_id": form.get("owner_id"),
         "data": req.data,
-        "score": score,
+        "score": None,
+        "scoring": None,
         "status": "new",
+        "autoresponse_content": None,
+        "autoresponse_email_sent": False,
+        "autoresponse_sent_at": None,
         "created_at": datetime.now(timezone.utc)
-    })
-    
-    # AI auto-response with email delivery
-    autoresponse, email_sent = await generate_and_send_lead_autoresponse(
-        db, 
-        req.data, 
-        form.get("website_id"),
-        send_email=True
-    )
-    await db["leads"].update_one(
-        {"_id": lead_id}, 
-        {"$set": {
-            "autoresponse_content": autoresponse,
-            "autoresponse_email_sent": email_sent,
-            "autoresponse_sent_at": datetime.now(timezone.utc) if email_sent else None
-        }}
-    )
+    }, utm={k: v for k, v in req.data.items() if k.startswith("utm_")})
     
-    # Track usage
-    if form.get("owner_id"):
-        await track_usage(db, form["owner_id"], ai_interactions=1)
-    
-    return {"success": True, "lead_id": lead_id, "autoresponse": autoresponse, "email_sent": email_sent}
+    return {"success": True, "lead_id": lead_id, "status": "processing"}
 
 @app.get("/api/leads")
 async def list_leads(user: dict = Depends(get_current_user)):
@@ -940,7 +1153,6 @@ async def get_analytics(user: dict = Depends(get_current_user), days: int = 30):
 
 
 # ========== LEAD MAGNET - FREE REPORTS ==========
-from fastapi.responses import StreamingResponse
 
 class ReportGenerateRequest(BaseModel):
     url: str
@@ -950,139 +1162,157 @@ class ReportGenerateRequest(BaseModel):
     utm_medium: Optional[str] = None
     utm_campaign: Optional[str] = None
 
-@app.post("/api/reports/generate")
-@limiter.limit("3/hour")  # Limit to prevent abuse
-async def generate_free_report(req: ReportGenerateRequest, request: Request):
-    """Generate free automation + workforce reports (PUBLIC endpoint for lead generation)"""
-    try:
-        # Analyze website
-        extraction = await fetch_and_extract_website(req.url)
-        
-        # Run BOTH analyses in parallel
-        analysis, workforce = await asyncio.gather(
-            analyze_website_for_automations(extraction),
-            analyze_workforce_opportunities(req.url)
-        )
-        
-        # Prepare analysis data for PDF
-        analysis_data = {
-            "url": req.url,
-            "summary": analysis.summary,
-            "business_type": analysis.business_type.value,
-            "strengths": analysis.strengths,
-            "opportunities": analysis.opportunities,
-            "recommendations": [{
-                "title": r.title,
-                "description": r.description,
-                "rationale": r.rationale,
-                "expected_impact": r.expected_impact,
-                "priority": r.priority.value,
-                "estimated_value": r.estimated_value or "Significant ROI expected"
-            } for r in analysis.recommendations],
-            "confidence_score": analysis.confidence_score
-        }
-        
-        # Score the lead
-        lead_score = await score_lead(db, {
-            "email": req.email,
-            "name": req.name,
-            "website": req.url,
-            "message": f"Interested in automation for {extraction.business_type.value} business"
-        })
-        
-        # Generate PDF
-        lead_data = {
-            "name": req.name or "Valued Business Owner",
-            "email": req.email,
-            "website": req.url
-        }
-        
-        # Save AUTOMATION report record (no PDF generation for free tier)
-        automation_report_id = str(uuid.uuid4())
-        await db["automation_reports"].insert_one({
-            "_id": automation_report_id,
-            "lead_email": req.email,
-            "lead_name": req.name,
-            "website_url": req.url,
-            "business_type": analysis.business_type.value,
-            "automation_score": lead_score,
-            "opportunities_count": len(analysis.recommendations),
-            "estimated_savings": 5000,
-            "status": "preview_only",
-            "utm_source": req.utm_source,
-            "utm_medium": req.utm_medium,
-            "utm_campaign": req.utm_campaign,
-            "created_at": datetime.now(timezone.utc)
-        })
-        
-        # Save WORKFORCE report record
-        workforce_report_id = str(uuid.uuid4())
-        await db["workforce_reports"].insert_one({
-            "_id": workforce_report_id,
-            "lead_email": req.email,
-            "lead_name": req.name,
-            "website_url": req.url,
-            "jobs_found": workforce.get("jobs_found", 0),
-            "opportunities_count": len(workforce.get("workforce_opportunities", [])),
-            "total_monthly_savings": workforce.get("total_potential_savings_monthly", 0),
-            "total_annual_savings": workforce.get("total_potential_savings_annual", 0),
-            "workforce_data": workforce,
-            "status": "preview_only",
-            "utm_source": req.utm_source,
-            "utm_medium": req.utm_medium,
-            "utm_campaign": req.utm_campaign,
-            "created_at": datetime.now(timezone.utc)
-        })
-        
-        # Save lead in leads collection with special tag
-        lead_id = str(uuid.uuid4())
-        await db["leads"].insert_one({
-            "_id": lead_id,
-            "form_id": "free-report",
-            "website_id": "lead-magnet",
-            "owner_id": "system",  # System-generated lead
-            "data": {
-                "name": req.name,
-                "email": req.email,
-                "website": req.url
-            },
-            "score": lead_score,
-            "status": "new",
-            "source": "free_audit",
-            "automation_report_id": automation_report_id,
-            "workforce_report_id": workforce_report_id,
-            "created_at": datetime.now(timezone.utc)
+async def run_report_job(job: dict, progress) -> dict:
+    """Free report pipeline for /api/reports/generate, run by the job workers"""
+    req = job["payload"]
+    
+    # Analyze website
+    context = await fetch_analysis_context(req["url"])
+    extraction = context.extraction
+    await progress("fetched")
+
+    # Run BOTH analyses in parallel; the workforce scan reuses the fetched homepage
+    analysis, workforce = await asyncio.gather(
+        _run_stage(analyze_website_for_automations(extraction, LLMPriority.BATCH), progress, "analyzed"),
+        _run_stage(analyze_workforce_opportunities(req["url"], context), progress, "workforce_mapped")
+    )
+
+    # Prepare analysis data for PDF
+    analysis_data = {
+        "url": req["url"],
+        "summary": analysis.summary,
+        "business_type": analysis.business_type.value,
+        "strengths": analysis.strengths,
+        "opportunities": analysis.opportunities,
+        "recommendations": [{
+            "title": r.title,
+            "description": r.description,
+            "rationale": r.rationale,
+            "expected_impact": r.expected_impact,
+            "priority": r.priority.value,
+            "estimated_value": r.estimated_value or "Significant ROI expected"
+        } for r in analysis.recommendations],
+        "confidence_score": analysis.confidence_score
+    }
+
+    # Score the lead
+    scoring = await score_lead_detailed(db, {
+        "email": req["email"],
+        "name": req["name"],
+        "website": req["url"],
+        "message": f"Interested in automation for {extraction.business_type.value} business"
+    }, {"utm_source": req["utm_source"], "utm_medium": req["utm_medium"], "utm_campaign": req["utm_campaign"]})
+    lead_score = scoring.pop("score")
+
+    # Generate PDF
+    lead_data = {
+        "name": req["name"] or "Valued Business Owner",
+        "email": req["email"],
+        "website": req["url"]
+    }
+
+    # Record ids derive from the job id, so a retried job overwrites instead of duplicating
+    automation_report_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{job['_id']}:automation_report"))
+    workforce_report_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{job['_id']}:workforce_report"))
+    lead_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{job['_id']}:lead"))
+
+    # Save AUTOMATION report record (no PDF generation for free tier)
+    await db["automation_reports"].replace_one({"_id": automation_report_id}, {
+        "_id": automation_report_id,
+        "lead_email": req["email"],
+        "lead_name": req["name"],
+        "website_url": req["url"],
+        "business_type": analysis.business_type.value,
+        "automation_score": lead_score,
+        "opportunities_count": len(analysis.recommendations),
+        "estimated_savings": 5000,
+        "status": "preview_only",
+        "utm_source": req["utm_source"],
+        "utm_medium": req["utm_medium"],
+        "utm_campaign": req["utm_campaign"],
+        "created_at": datetime.now(timezone.utc)
+    }, upsert=True)
+
+    # Save WORKFORCE report record
+    await db["workforce_reports"].replace_one({"_id": workforce_report_id}, {
+        "_id": workforce_report_id,
+        "lead_email": req["email"],
+        "lead_name": req["name"],
+        "website_url": req["url"],
+        "jobs_found": workforce.get("jobs_found", 0),
+        "opportunities_count": len(workforce.get("workforce_opportunities", [])),
+        "total_monthly_savings": workforce.get("total_potential_savings_monthly", 0),
+        "total_annual_savings": workforce.get("total_potential_savings_annual", 0),
+        "workforce_data": workforce,
+        "status": "preview_only",
+        "utm_source": req["utm_source"],
+        "utm_medium": req["utm_medium"],
+        "utm_campaign": req["utm_campaign"],
+        "created_at": datetime.now(timezone.utc)
+    }, upsert=True)
+
+    # Save lead in leads collection with special tag
+    lead_saved = await db["leads"].replace_one({"_id": lead_id}, {
+        "_id": lead_id,
+        "form_id": "free-report",
+        "website_id": "lead-magnet",
+        "owner_id": "system",  # System-generated lead
+        "data": {
+            "name": req["name"],
+            "email": req["email"],
+            "website": req["url"]
+        },
+        "score": lead_score,
+        "scoring": scoring,
+        "status": "new",
+        "source": "free_audit",
+        "automation_report_id": automation_report_id,
+        "workforce_report_id": workforce_report_id,
+        "created_at": datetime.now(timezone.utc)
+    }, upsert=True)
+
+    # Track UTM if provided (once per lead)
+    if lead_saved.upserted_id is not None and (req["utm_source"] or req["utm_medium"] or req["utm_campaign"]):
+        await track_utm_source(db, lead_id, {
+            "utm_source": req["utm_source"],
+            "utm_medium": req["utm_medium"],
+            "utm_campaign": req["utm_campaign"]
         })
-        
-        # Track UTM if provided
-        if req.utm_source or req.utm_medium or req.utm_campaign:
-            await track_utm_source(db, lead_id, {
-                "utm_source": req.utm_source,
-                "utm_medium": req.utm_medium,
-                "utm_campaign": req.utm_campaign
-            })
-        
-        # NO email or PDF generation - those require subscription
-        # User sees full report on screen, must pay to download/email
-        
-        return {
-            "success": True,
-            "automation_report_id": automation_report_id,
-            "workforce_report_id": workforce_report_id,
-            "score": lead_score,
-            "opportunities_count": len(analysis.recommendations),
-            "workforce_opportunities_count": len(workforce.get("workforce_opportunities", [])),
-            "estimated_savings": 5000,
-            "workforce_savings_monthly": workforce.get("total_potential_savings_monthly", 0),
-            "email_sent": False,  # Never send for free tier
-            "message": "Reports generated! Subscribe to download or email.",
-            "recommendations": analysis_data["recommendations"][:6],
-            "workforce": workforce
-        }
-        
-    except Exception as e:
-        print(f"Report generation error: {e}")
-        raise HTTPException(500, f"Failed to generate report: {str(e)}")
+
+    await progress("saved")
+
+    # NO email or PDF generation - those require subscription
+    # User sees full report on screen, must pay to download/email
+
+    return {
+        "success": True,
+        "automation_report_id": automation_report_id,
+        "workforce_report_id": workforce_report_id,
+        "score": lead_score,
+        "opportunities_count": len(analysis.recommendations),
+        "workforce_opportunities_count": len(workforce.get("workforce_opportunities", [])),
+        "estimated_savings": 5000,
+        "workforce_savings_monthly": workforce.get("total_potential_savings_monthly", 0),
+        "email_sent": False,  # Never send for free tier
+        "message": "Reports generated! Subscribe to download or email.",
+        "recommendations": analysis_data["recommendations"][:6],
+        "workforce": workforce
+    }
+
+
+analysis_jobs.register("report", run_report_job)
+
+
+@app.post("/api/reports/generate", status_code=202)
+@limiter.limit("3/hour")  # Limit to prevent abuse
+async def generate_free_report(
+    req: ReportGenerateRequest,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Queue free automation + workforce reports (PUBLIC endpoint for lead generation); poll /api/analysis-jobs/{job_id}"""
+    job, created = await analysis_jobs.submit("report", req.model_dump(), idempotency_key=idempotency_key)
+    return _job_accepted(job, created)
 
 
 @app.get("/api/reports")
@@ -1598,6 +1828,37 @@ async def orchestrator_status():
     return await orchestrator.get_queue_stats()
 
 
+@app.get("/api/analyzer/stats")
+async def analyzer_stats():
+    """Get website analysis pipeline stats"""
+    return {
+        "page_cache": page_cache.stats(),
+        "job_mapping_cache": job_mapping_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "single_flight": analysis_flights.stats(),
+        "extraction_pool": extraction_pool.stats(),
+        "analysis_jobs": await analysis_jobs.get_queue_stats(),
+        "lead_pipeline": await lead_pipeline.get_queue_stats(),
+        "chatbot_context": chatbot_context_cache.stats(),
+        "chat_store": chat_store.stats(),
+        "chat_memory": chat_memory.stats(),
+        "llm_gateway": llm_gateway.stats()
+    }
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """LLM call metrics in Prometheus text format"""
+    return PlainTextResponse(llm_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/llm-usage")
+async def llm_usage(days: int = 30, user: dict = Depends(get_current_user)):
+    """Daily LLM calls, tokens and estimated cost by feature and model for the current user"""
+    rows = await llm_metrics.get_rollup(user["user_id"], days=min(max(days, 1), 90))
+    return {"days": rows}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -0,0 +1,229 @@
+"""
+Analysis job queue
+DB-backed jobs for website analysis and free reports: the API submits a job
+and returns its id, a pool of workers runs the pipeline and writes stage
+progress and the result to the job document for polling
+"""
+import os
+import uuid
+import socket
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple, List
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+ANALYSIS_JOB_WORKERS = int(os.environ.get('ANALYSIS_JOB_WORKERS', '4'))  # Concurrent jobs per process
+ANALYSIS_JOB_LEASE = int(os.environ.get('ANALYSIS_JOB_LEASE', '300'))  # Seconds without progress before a crashed worker's job is retried
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.environ.get('ANALYSIS_JOB_MAX_ATTEMPTS', '3'))
+ANALYSIS_JOB_RETRY_BACKOFF = float(os.environ.get('ANALYSIS_JOB_RETRY_BACKOFF', '5'))  # Seconds before a failed job is retried, doubled per attempt
+ANALYSIS_JOB_POLL = float(os.environ.get('ANALYSIS_JOB_POLL', '1.0'))  # Seconds between idle queue checks
+ANALYSIS_JOB_RETENTION = int(os.environ.get('ANALYSIS_JOB_RETENTION', str(7 * 24 * 3600)))  # Seconds finished jobs are kept
+
+# Pipeline stages in order; each is stamped on the job when reached
+STAGES = ["fetched", "analyzed", "workforce_mapped", "saved"]
+
+JobHandler = Callable[[Dict[str, Any], Callable[[str], Awaitable[None]]], Awaitable[Dict[str, Any]]]
+
+
+class AnalysisJobService:
+    def __init__(self, db, workers: int = ANALYSIS_JOB_WORKERS):
+        self.db = db
+        self.jobs = db["analysis_jobs"]
+        self.workers = workers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def register(self, kind: str, handler: JobHandler):
+        """Handler receives the job document and a progress(stage) callback, returns the result"""
+        self._handlers[kind] = handler
+
+    async def ensure_indexes(self):
+        await self.jobs.create_index("idempotency_key", unique=True, sparse=True)
+        await self.jobs.create_index([("status", 1), ("created_at", 1)])
+        await self.jobs.create_index("finished_at", expireAfterSeconds=ANALYSIS_JOB_RETENTION)
+
+    async def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        owner_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a job. Returns (job, created); with an idempotency key already
+        used by the same owner for this kind, the existing job is returned
+        """
+        scoped_key = f"{kind}:{owner_id or 'public'}:{idempotency_key}" if idempotency_key else None
+        if scoped_key:
+            existing = await self.jobs.find_one({"idempotency_key": scoped_key})
+            if existing:
+                return existing, False
+
+        now = datetime.now(timezone.utc)
+        job = {
+            "_id": str(uuid.uuid4()),
+            "kind": kind,
+            "owner_id": owner_id,
+            "payload": payload,
+            "status": "pending",
+            "stage": None,
+            "stages": {},
+            "attempts": 0,
+            "next_run_at": now,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None
+        }
+        if scoped_key:
+            job["idempotency_key"] = scoped_key
+
+        try:
+            await self.jobs.insert_one(job)
+        except DuplicateKeyError:
+            # Same key submitted concurrently; the other insert won
+            return await self.jobs.find_one({"idempotency_key": scoped_key}), False
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job, True
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.jobs.find_one({"_id": job_id})
+
+    def start(self):
+        """Start the worker pool"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop workers; jobs they were running are retried after their lease expires"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest pending job, or one whose worker died"""
+        now = datetime.now(timezone.utc)
+        return await self.jobs.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "pending", "next_run_at": {"$not": {"$gt": now}}},
+                    {"status": "running", "lease_until": {"$lt": now}}
+                ],
+                "attempts": {"$lt": ANALYSIS_JOB_MAX_ATTEMPTS}
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "worker": self.owner,
+                    "lease_until": now + timedelta(seconds=ANALYSIS_JOB_LEASE),
+                    "updated_at": now,
+                    # Each attempt starts over, so polling shows only this attempt's stages
+                    "stage": None,
+                    "stages": {}
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _fail_abandoned(self):
+        """Give up on jobs whose workers died on every attempt"""
+        now = datetime.now(timezone.utc)
+        await self.jobs.update_many(
+            {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$gte": ANALYSIS_JOB_MAX_ATTEMPTS}},
+            {"$set": {"status": "failed", "error": "Job abandoned after repeated worker failures", "finished_at": now, "updated_at": now}}
+        )
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self._claim()
+                if job is None:
+                    await self._fail_abandoned()
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=ANALYSIS_JOB_POLL)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self.run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Analysis job worker error: {e}")
+                await asyncio.sleep(ANALYSIS_JOB_POLL)
+
+    async def run_job(self, job: Dict[str, Any]):
+        """
+        Run a claimed job and record its result; a failed attempt is queued
+        again with backoff until ANALYSIS_JOB_MAX_ATTEMPTS, then marked failed
+        """
+        job_id = job["_id"]
+        handler = self._handlers.get(job["kind"])
+        # Only this attempt's claim may write; a worker that lost its lease can't
+        claim = {"_id": job_id, "attempts": job["attempts"]}
+
+        async def progress(stage: str):
+            # Each stage also renews the lease so long analyses aren't re-claimed
+            now = datetime.now(timezone.utc)
+            await self.jobs.update_one(
+                claim,
+                {"$set": {
+                    "stage": stage,
+                    f"stages.{stage}": now,
+                    "lease_until": now + timedelta(seconds=ANALYSIS_JOB_LEASE),
+                    "updated_at": now
+                }}
+            )
+
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job kind '{job['kind']}'")
+            result = await handler(job, progress)
+            now = datetime.now(timezone.utc)
+            update = {"status": "completed", "result": result, "finished_at": now}
+        except Exception as e:
+            print(f"Analysis job {job_id} attempt {job['attempts']} failed: {e}")
+            now = datetime.now(timezone.utc)
+            if handler is not None and job["attempts"] < ANALYSIS_JOB_MAX_ATTEMPTS:
+                backoff = ANALYSIS_JOB_RETRY_BACKOFF * 2 ** (job["attempts"] - 1)
+                update = {"status": "pending", "error": str(e), "next_run_at": now + timedelta(seconds=backoff)}
+            else:
+                update = {"status": "failed", "error": str(e), "finished_at": now}
+
+        update.update({"updated_at": now, "lease_until": None})
+        await self.jobs.update_one(claim, {"$set": update})
+
+    @staticmethod
+    def serialize(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Public view of a job for polling clients"""
+        stages = job.get("stages") or {}
+        return {
+            "job_id": job["_id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "stage": job.get("stage"),
+            "stages": {name: stages[name].isoformat() for name in STAGES if name in stages},
+            "progress": int(100 * len([name for name in STAGES if name in stages]) / len(STAGES)),
+            "result": job.get("result"),
+            "error": job.get("error"),
+            "created_at": job["created_at"].isoformat(),
+            "finished_at": job["finished_at"].isoformat() if job.get("finished_at") else None
+        }
+
+    async def get_queue_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "pending": await self.jobs.count_documents({"status": "pending"}),
+            "running": await self.jobs.count_documents({"status": "running"})
+        }
@@ -3,6 +3,7 @@ Analytics service for generating insights and metrics
 """
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List
+from .chat_store import chat_store
 
 async def get_dashboard_analytics(db, user_id: str, days: int = 30) -> Dict:
     """
@@ -13,7 +14,6 @@ async def get_dashboard_analytics(db, user_id: str, days: int = 30) -> Dict:
     # Collections
     automations = db["active_automations"]
     executions = db["executions"]
-    chatbot_messages = db["chatbot_messages"]
     leads = db["leads"]
     websites = db["websites"]
     
@@ -39,15 +39,9 @@ async def get_dashboard_analytics(db, user_id: str, days: int = 30) -> Dict:
     success_rate = (successful_executions / total_executions * 100) if total_executions > 0 else 0
     
     # Chatbot stats
-    total_messages = await chatbot_messages.count_documents({
-        "website_id": {"$in": website_ids},
-        "timestamp": {"$gte": start_date}
-    })
-    
-    unique_sessions = len(await chatbot_messages.distinct(
-        "session_id",
-        {"website_id": {"$in": website_ids}, "timestamp": {"$gte": start_date}}
-    ))
+    chat_stats = await chat_store.get_message_stats(db, website_ids, start_date)
+    total_messages = chat_stats["total_messages"]
+    unique_sessions = chat_stats["unique_sessions"]
     
     # Lead stats
     total_leads = await leads.count_documents({
@@ -62,20 +56,17 @@ async def get_dashboard_analytics(db, user_id: str, days: int = 30) -> Dict:
     })
     
     # Time series data (last 7 days)
+    first_day = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=6)
+    daily_messages = await chat_store.get_daily_message_counts(db, website_ids, first_day, 7)
     time_series = []
     for i in range(7):
-        day_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=6-i)
+        day_start = first_day + timedelta(days=i)
         day_end = day_start + timedelta(days=1)
         
         day_executions = await executions.count_documents({
             "started_at": {"$gte": day_start, "$lt": day_end}
         })
         
-        day_messages = await chatbot_messages.count_documents({
-            "website_id": {"$in": website_ids},
-            "timestamp": {"$gte": day_start, "$lt": day_end}
-        })
-        
         day_leads = await leads.count_documents({
             "website_id": {"$in": website_ids},
             "created_at": {"$gte": day_start, "$lt": day_end}
@@ -84,7 +75,7 @@ async def get_dashboard_analytics(db, user_id: str, days: int = 30) -> Dict:
         time_series.append({
             "date": day_start.strftime("%Y-%m-%d"),
             "executions": day_executions,
-            "messages": day_messages,
+            "messages": daily_messages.get(day_start.strftime("%Y-%m-%d"), 0),
             "leads": day_leads
         })
     
@@ -0,0 +1,179 @@
+"""
+Chatbot conversation memory
+Each prompt carries the session's rolling summary plus as many recent messages
+as fit in CHAT_MEMORY_TOKENS, so prompt size stays bounded however long the
+conversation runs. Once enough older messages have fallen out of the window,
+the summary is refreshed in the background and stored on the chatbot_sessions
+document
+"""
+import os
+import uuid
+import asyncio
+import itertools
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Set
+from analyzer.llm_cache import estimate_tokens
+from .chat_store import chat_store, as_utc
+from .llm_gateway import llm_gateway, LLMPriority
+
+CHAT_MEMORY_TOKENS = int(os.environ.get('CHAT_MEMORY_TOKENS', '1500'))  # Budget for recent messages in the prompt
+CHAT_MEMORY_FETCH = int(os.environ.get('CHAT_MEMORY_FETCH', '40'))  # Most recent messages loaded per turn
+CHAT_SUMMARY_TRIGGER_TOKENS = int(os.environ.get('CHAT_SUMMARY_TRIGGER_TOKENS', '800'))  # Unsummarized overflow before a refresh
+CHAT_SUMMARY_MAX_WORDS = int(os.environ.get('CHAT_SUMMARY_MAX_WORDS', '150'))
+
+SUMMARY_SYSTEM_MESSAGE = "You summarize customer support conversations so an assistant can continue them."
+
+
+def _transcript(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(
+        f"{'User' if message['role'] == 'user' else 'Assistant'}: {message['content']}"
+        for message in messages
+    )
+
+
+class ChatMemory:
+    def __init__(
+        self,
+        token_budget: int = CHAT_MEMORY_TOKENS,
+        fetch: int = CHAT_MEMORY_FETCH,
+        summary_trigger: int = CHAT_SUMMARY_TRIGGER_TOKENS
+    ):
+        self.token_budget = token_budget
+        self.fetch = fetch
+        self.summary_trigger = summary_trigger
+        self._summarizing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.summaries = 0
+        self.summary_errors = 0
+
+    async def load(self, db, session_id: str) -> Dict[str, Any]:
+        """
+        Summary, the recent messages that fit the token budget, and the oldest
+        messages not yet folded into the summary (at most `fetch` of them, so a
+        long backlog is summarized over several turns, oldest first)
+        """
+        try:
+            session, fetched = await asyncio.gather(
+                db["chatbot_sessions"].find_one({"_id": session_id}, {"summary": 1, "summary_through": 1}),
+                chat_store.get_recent_messages(db, session_id, self.fetch)
+            )
+        except Exception as e:
+            print(f"Chat memory load error for session {session_id}: {e}")
+            session, fetched = None, []
+        summary = (session or {}).get("summary") or ""
+        summary_through = (session or {}).get("summary_through")
+        recent = fetched
+        if summary_through is not None:
+            summary_through = as_utc(summary_through)
+            recent = [message for message in recent if as_utc(message["timestamp"]) > summary_through]
+
+        window: List[Dict[str, Any]] = []
+        used = 0
+        for message in reversed(recent):
+            tokens = estimate_tokens(message["content"])
+            if window and used + tokens > self.token_budget:
+                break
+            window.insert(0, message)
+            used += tokens
+        overflow = recent[:len(recent) - len(window)]
+        if len(fetched) >= self.fetch and len(recent) == len(fetched):
+            # Unsummarized messages may go back further than the recent page
+            overflow = await self._unsummarized(db, session_id, summary_through, window, overflow)
+        return {
+            "summary": summary,
+            "window": window,
+            "overflow": overflow
+        }
+
+    async def _unsummarized(
+        self,
+        db,
+        session_id: str,
+        summary_through: Optional[datetime],
+        window: List[Dict[str, Any]],
+        overflow: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """The oldest messages after summary_through that come before the window"""
+        try:
+            older = await chat_store.get_session_messages(db, session_id, self.fetch, after=summary_through)
+        except Exception as e:
+            print(f"Chat memory load error for session {session_id}: {e}")
+            return overflow
+        in_window = {message["_id"] for message in window}
+        return list(itertools.takewhile(lambda message: message["_id"] not in in_window, older))
+
+    @staticmethod
+    def build_prompt(memory: Dict[str, Any], message: str) -> str:
+        """Prompt for the new message; the system prompt stays the website's so it is reused as-is"""
+        if not memory["summary"] and not memory["window"]:
+            return message
+        parts = []
+        if memory["summary"]:
+            parts.append(f"Conversation summary so far:\n{memory['summary']}")
+        if memory["window"]:
+            parts.append(f"Recent conversation:\n{_transcript(memory['window'])}")
+        parts.append(f"User: {message}")
+        return "\n\n".join(parts)
+
+    def maybe_summarize(self, db, session_id: str, memory: Dict[str, Any], owner_id: Optional[str] = None):
+        """Refresh the summary in the background once enough messages overflow the window"""
+        overflow = memory["overflow"]
+        if not overflow or session_id in self._summarizing:
+            return
+        if estimate_tokens(*(message["content"] for message in overflow)) < self.summary_trigger:
+            return
+        self._summarizing.add(session_id)
+        task = asyncio.create_task(self._summarize(db, session_id, memory["summary"], overflow, owner_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, db, session_id: str, summary: str, overflow: List[Dict[str, Any]], owner_id: Optional[str]):
+        prompt = f"""
+Update the summary of this conversation between a website visitor (User) and a support assistant.
+Keep names, contact details, what the visitor wants, questions still open and anything promised.
+Use at most {CHAT_SUMMARY_MAX_WORDS} words. Respond with the summary only.
+
+Current summary:
+{summary or '(none yet)'}
+
+New messages:
+{_transcript(overflow)}
+"""
+        try:
+            new_summary = await llm_gateway.complete(
+                "gpt-4o-mini",
+                prompt,
+                system_message=SUMMARY_SYSTEM_MESSAGE,
+                session_id=f"chat-summary-{uuid.uuid4()}",
+                priority=LLMPriority.BACKGROUND,
+                feature="chat_summary",
+                owner_id=owner_id
+            )
+            await db["chatbot_sessions"].update_one(
+                {"_id": session_id},
+                {"$set": {
+                    "summary": new_summary.strip(),
+                    "summary_through": overflow[-1]["timestamp"],
+                    "summary_updated_at": datetime.now(timezone.utc)
+                }}
+            )
+            self.summaries += 1
+        except Exception as e:
+            print(f"Chat summary error for session {session_id}: {e}")
+            self.summary_errors += 1
+        finally:
+            self._summarizing.discard(session_id)
+
+    async def stop(self):
+        """Let in-flight summaries finish"""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "summarizing": len(self._summarizing),
+            "summaries": self.summaries,
+            "summary_errors": self.summary_errors
+        }
+
+
+chat_memory = ChatMemory()
@@ -0,0 +1,429 @@
+"""
+Chat persistence
+Each chatbot turn is saved as one bulk_write of its messages, then one session
+upsert. With CHAT_WRITE_BEHIND, turns are queued and a flusher coalesces them
+into one bulk_write per collection per flush (session updates merged per
+session); a full queue falls back to writing the turn directly.
+
+CHAT_STORAGE=buckets packs up to CHAT_BUCKET_TURNS turns of a session into one
+chat_transcripts document instead of one chatbot_messages document per message;
+until jobs/migrate_chat_buckets.py has run, reads merge in chatbot_messages so
+sessions that span the switch keep their earlier history
+"""
+import os
+import uuid
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Union
+from pymongo import InsertOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError
+
+CHAT_STORAGE = os.environ.get('CHAT_STORAGE', 'documents')  # documents or buckets
+CHAT_BUCKET_TURNS = int(os.environ.get('CHAT_BUCKET_TURNS', '25'))  # Turns per transcript bucket
+CHAT_READ_LEGACY = os.environ.get('CHAT_READ_LEGACY', 'true').lower() == 'true'  # Bucket mode also reads chatbot_messages; false once migrated
+CHAT_WRITE_BEHIND = os.environ.get('CHAT_WRITE_BEHIND', 'false').lower() == 'true'
+CHAT_WRITE_QUEUE_MAX = int(os.environ.get('CHAT_WRITE_QUEUE_MAX', '10000'))  # Buffered turns before writes go direct
+CHAT_FLUSH_INTERVAL = float(os.environ.get('CHAT_FLUSH_INTERVAL', '0.5'))  # Seconds between flushes
+CHAT_FLUSH_BATCH = int(os.environ.get('CHAT_FLUSH_BATCH', '500'))  # Turns per flush
+CHAT_FLUSH_MAX_ATTEMPTS = int(os.environ.get('CHAT_FLUSH_MAX_ATTEMPTS', '3'))
+
+DUPLICATE_KEY = 11000
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    """Mongo returns naive UTC datetimes; make them comparable with aware ones"""
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+class ChatStore:
+    def __init__(
+        self,
+        write_behind: bool = CHAT_WRITE_BEHIND,
+        queue_size: int = CHAT_WRITE_QUEUE_MAX,
+        flush_interval: float = CHAT_FLUSH_INTERVAL,
+        batch_size: int = CHAT_FLUSH_BATCH,
+        storage: str = CHAT_STORAGE,
+        bucket_turns: int = CHAT_BUCKET_TURNS
+    ):
+        if storage not in ("documents", "buckets"):
+            raise ValueError(f"Unknown CHAT_STORAGE '{storage}'")
+        self.storage = storage
+        self.bucket_turns = bucket_turns
+        self.write_behind = write_behind
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.db = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._early_flush: Optional[asyncio.Task] = None
+        self._retry: List[Dict[str, Any]] = []
+        self._retry_attempts = 0
+        self._unwritten: Dict[str, List[Dict[str, Any]]] = {}  # Buffered turns per session, for reads
+        self.turns = 0
+        self.buffered = 0
+        self.direct = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    def attach(self, db):
+        """Database written by the write-behind flusher"""
+        self.db = db
+
+    async def ensure_indexes(self):
+        if self.db is not None and self.storage == "buckets":
+            await self.db["chat_transcripts"].create_index([("session_id", 1), ("first_at", 1)])
+            await self.db["chat_transcripts"].create_index([("website_id", 1), ("last_at", -1)])
+
+    def start(self):
+        """Start the write-behind flusher (call from app startup)"""
+        if not self.write_behind or self.db is None or self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flusher and write everything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while self._queue is not None and (not self._queue.empty() or self._retry):
+            if not await self.flush():
+                break
+        self._queue = None
+
+    async def save_turn(
+        self,
+        db,
+        website_id: str,
+        session_id: str,
+        messages: List[Dict[str, Any]],
+        messages_added: int
+    ):
+        """
+        Persist a turn's messages and create or bump its session
+        messages_added is what the session's messages_count grows by
+        """
+        self.turns += 1
+        turn = {
+            "website_id": website_id,
+            "session_id": session_id,
+            "messages": messages,
+            "messages_added": messages_added,
+            "at": messages[-1]["timestamp"]
+        }
+        if self._queue is not None and db is self.db:
+            try:
+                self._queue.put_nowait(turn)
+                self._unwritten.setdefault(session_id, []).append(turn)
+                self.buffered += 1
+                if self._queue.qsize() >= self.batch_size and (self._early_flush is None or self._early_flush.done()):
+                    self._early_flush = asyncio.create_task(self.flush())
+                return
+            except asyncio.QueueFull:
+                pass  # Back-pressure: write this turn ourselves
+        self.direct += 1
+        await self._write(db, [turn])
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> bool:
+        """Write up to one batch of buffered turns; False when the write failed"""
+        if self._queue is None:
+            return True
+        batch, self._retry = self._retry, []
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if not batch:
+            return True
+
+        try:
+            await self._write(self.db, batch)
+        except Exception as e:
+            self._retry_attempts += 1
+            if self._retry_attempts < CHAT_FLUSH_MAX_ATTEMPTS:
+                print(f"Chat write error, retrying {len(batch)} turns: {e}")
+                self._retry = batch
+            else:
+                print(f"Chat write error, dropping {len(batch)} turns: {e}")
+                self.dropped += len(batch)
+                self._retry_attempts = 0
+                self._forget(batch)
+            return False
+        self._retry_attempts = 0
+        self.flushes += 1
+        self._forget(batch)
+        return True
+
+    def _forget(self, turns: List[Dict[str, Any]]):
+        for turn in turns:
+            pending = self._unwritten.get(turn["session_id"], [])
+            if turn in pending:
+                pending.remove(turn)
+            if not pending:
+                self._unwritten.pop(turn["session_id"], None)
+
+    async def _write(self, db, turns: List[Dict[str, Any]]):
+        """
+        One bulk_write of all messages, then one of the sessions (merged per
+        session) once the messages are stored. Retried turns skip whatever an
+        earlier attempt already wrote, so sessions are never bumped twice
+        """
+        pending = [turn for turn in turns if not turn.get("messages_written")]
+        if pending:
+            if self.storage == "buckets":
+                await self._append_buckets(db, pending)
+            else:
+                await _insert_messages(
+                    db["chatbot_messages"],
+                    [InsertOne(message) for turn in pending for message in turn["messages"]]
+                )
+            for turn in pending:
+                turn["messages_written"] = True
+        await self._write_sessions(db, [turn for turn in turns if not turn.get("session_written")])
+
+    async def _write_sessions(self, db, turns: List[Dict[str, Any]]):
+        sessions: Dict[str, Dict[str, Any]] = {}
+        for turn in turns:
+            session = sessions.setdefault(turn["session_id"], {
+                "website_id": turn["website_id"],
+                "started_at": turn["messages"][0]["timestamp"],
+                "last_activity": turn["at"],
+                "messages_added": 0,
+                "turns": []
+            })
+            session["last_activity"] = max(session["last_activity"], turn["at"])
+            session["messages_added"] += turn["messages_added"]
+            session["turns"].append(turn)
+        if not sessions:
+            return
+
+        session_ops = [
+            UpdateOne(
+                {"_id": session_id},
+                {
+                    "$setOnInsert": {"website_id": session["website_id"], "started_at": session["started_at"], "status": "active"},
+                    "$max": {"last_activity": session["last_activity"]},
+                    "$inc": {"messages_count": session["messages_added"]}
+                },
+                upsert=True
+            )
+            for session_id, session in sessions.items()
+        ]
+        failed = None  # Unknown unless the write returns or reports its errors
+        try:
+            await db["chatbot_sessions"].bulk_write(session_ops, ordered=False)
+            failed = set()
+        except BulkWriteError as e:
+            # Unordered: every op without a write error was applied
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            raise
+        finally:
+            if failed is not None:
+                for index, session in enumerate(sessions.values()):
+                    if index not in failed:
+                        for turn in session["turns"]:
+                            turn["session_written"] = True
+
+    async def _append_buckets(self, db, turns: List[Dict[str, Any]]):
+        """
+        Append turns to their sessions' buckets. $push isn't idempotent, so
+        turns being retried are first checked against what is already stored
+        """
+        retried = [turn for turn in turns if turn.get("bucket_attempted")]
+        if retried:
+            stored = await self._bucketed_message_ids(db, retried)
+            turns = [turn for turn in turns if turn["messages"][0]["_id"] not in stored]
+        for turn in turns:
+            turn["bucket_attempted"] = True
+        if turns:
+            await db["chat_transcripts"].bulk_write(self._bucket_ops(turns), ordered=True)
+
+    @staticmethod
+    async def _bucketed_message_ids(db, turns: List[Dict[str, Any]]) -> set:
+        first_ids = [turn["messages"][0]["_id"] for turn in turns]
+        cursor = db["chat_transcripts"].find(
+            {"session_id": {"$in": list({turn["session_id"] for turn in turns})}, "messages._id": {"$in": first_ids}},
+            {"messages._id": 1}
+        )
+        stored = set()
+        async for bucket in cursor:
+            stored.update(message["_id"] for message in bucket.get("messages", []))
+        return stored
+
+    def _bucket_ops(self, turns: List[Dict[str, Any]]) -> List[Union[UpdateMany, UpdateOne]]:
+        """
+        Append each session's turns to its open bucket, the newest one. When it
+        has no room left it is closed first and a new open bucket is upserted,
+        so appends never go back to an older bucket and buckets stay ordered by
+        first_at. Sessions with more turns than a bucket holds are split, in order
+        """
+        by_session: Dict[str, List[Dict[str, Any]]] = {}
+        for turn in turns:
+            by_session.setdefault(turn["session_id"], []).append(turn)
+
+        operations = []
+        for session_id, session_turns in by_session.items():
+            for start in range(0, len(session_turns), self.bucket_turns):
+                chunk = session_turns[start:start + self.bucket_turns]
+                messages = [
+                    {key: value for key, value in message.items() if key not in ("website_id", "session_id")}
+                    for turn in chunk for message in turn["messages"]
+                ]
+                operations.append(UpdateMany(
+                    {"session_id": session_id, "open": True, "turns": {"$gt": self.bucket_turns - len(chunk)}},
+                    {"$set": {"open": False}}
+                ))
+                operations.append(UpdateOne(
+                    {"session_id": session_id, "open": True},
+                    {
+                        "$setOnInsert": {"_id": str(uuid.uuid4()), "website_id": chunk[0]["website_id"]},
+                        "$push": {"messages": {"$each": messages}},
+                        "$inc": {"turns": len(chunk), "message_count": len(messages)},
+                        "$min": {"first_at": messages[0]["timestamp"]},
+                        "$max": {"last_at": messages[-1]["timestamp"]}
+                    },
+                    upsert=True
+                ))
+        return operations
+
+    async def get_session_messages(
+        self,
+        db,
+        session_id: str,
+        limit: int = 50,
+        after: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """A session's first `limit` messages, oldest first; only those newer than `after` when given"""
+        await self.flush()  # Include turns still buffered by write-behind
+        if self.storage != "buckets":
+            return await self._first_documents(db, session_id, limit, after)
+
+        messages = []
+        query: Dict[str, Any] = {"session_id": session_id}
+        if after is not None:
+            query["last_at"] = {"$gt": after}
+        cursor = db["chat_transcripts"].find(query).sort("first_at", 1)
+        async for bucket in cursor:
+            messages.extend(
+                {**message, "session_id": session_id, "website_id": bucket.get("website_id")}
+                for message in bucket.get("messages", [])
+                if after is None or as_utc(message["timestamp"]) > after
+            )
+            if len(messages) >= limit:
+                break
+        if CHAT_READ_LEGACY:
+            messages = _merge(messages, await self._first_documents(db, session_id, limit, after))
+        messages.sort(key=lambda message: as_utc(message["timestamp"]))
+        return messages[:limit]
+
+    async def get_recent_messages(self, db, session_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """A session's last `limit` messages, oldest first, including turns not yet flushed"""
+        if self.storage == "buckets":
+            messages = []
+            cursor = db["chat_transcripts"].find({"session_id": session_id}).sort("first_at", -1)
+            async for bucket in cursor:
+                messages.extend(bucket.get("messages", []))
+                if len(messages) >= limit:
+                    break
+            if CHAT_READ_LEGACY:
+                messages = _merge(messages, await self._recent_documents(db, session_id, limit))
+        else:
+            messages = await self._recent_documents(db, session_id, limit)
+
+        messages = _merge(messages, [message for turn in self._unwritten.get(session_id, []) for message in turn["messages"]])
+        messages.sort(key=lambda message: as_utc(message["timestamp"]))
+        return messages[-limit:]
+
+    @staticmethod
+    async def _first_documents(db, session_id: str, limit: int, after: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        query: Dict[str, Any] = {"session_id": session_id}
+        if after is not None:
+            query["timestamp"] = {"$gt": after}
+        return await db["chatbot_messages"].find(query).sort("timestamp", 1).limit(limit).to_list(length=limit)
+
+    @staticmethod
+    async def _recent_documents(db, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        newest_first = await db["chatbot_messages"].find(
+            {"session_id": session_id}
+        ).sort("timestamp", -1).limit(limit).to_list(length=limit)
+        return newest_first[::-1]
+
+    async def get_message_stats(self, db, website_ids: List[str], start: datetime) -> Dict[str, int]:
+        """Messages and distinct sessions for the websites since start"""
+        if self.storage == "buckets":
+            rows = await db["chat_transcripts"].aggregate([
+                {"$match": {"website_id": {"$in": website_ids}, "last_at": {"$gte": start}}},
+                {"$unwind": "$messages"},
+                {"$match": {"messages.timestamp": {"$gte": start}}},
+                {"$group": {"_id": "$session_id", "messages": {"$sum": 1}}},
+                {"$group": {"_id": None, "messages": {"$sum": "$messages"}, "sessions": {"$sum": 1}}}
+            ]).to_list(1)
+            return {
+                "total_messages": rows[0]["messages"] if rows else 0,
+                "unique_sessions": rows[0]["sessions"] if rows else 0
+            }
+
+        query = {"website_id": {"$in": website_ids}, "timestamp": {"$gte": start}}
+        return {
+            "total_messages": await db["chatbot_messages"].count_documents(query),
+            "unique_sessions": len(await db["chatbot_messages"].distinct("session_id", query))
+        }
+
+    async def get_daily_message_counts(self, db, website_ids: List[str], first_day: datetime, days: int) -> Dict[str, int]:
+        """Messages per day ("YYYY-MM-DD") for the websites, from first_day (UTC midnight)"""
+        end = first_day + timedelta(days=days)
+        if self.storage == "buckets":
+            rows = await db["chat_transcripts"].aggregate([
+                {"$match": {"website_id": {"$in": website_ids}, "last_at": {"$gte": first_day}, "first_at": {"$lt": end}}},
+                {"$unwind": "$messages"},
+                {"$match": {"messages.timestamp": {"$gte": first_day, "$lt": end}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$messages.timestamp"}},
+                    "messages": {"$sum": 1}
+                }}
+            ]).to_list(None)
+            return {row["_id"]: row["messages"] for row in rows}
+
+        counts = {}
+        for i in range(days):
+            day_start = first_day + timedelta(days=i)
+            counts[day_start.strftime("%Y-%m-%d")] = await db["chatbot_messages"].count_documents({
+                "website_id": {"$in": website_ids},
+                "timestamp": {"$gte": day_start, "$lt": day_start + timedelta(days=1)}
+            })
+        return counts
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "storage": self.storage,
+            "write_behind": self._queue is not None,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "turns": self.turns,
+            "buffered": self.buffered,
+            "direct": self.direct,
+            "flushes": self.flushes,
+            "dropped": self.dropped
+        }
+
+
+def _merge(messages: List[Dict[str, Any]], others: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """messages plus those of others not already among them, by _id"""
+    seen = {message["_id"] for message in messages}
+    return messages + [message for message in others if message["_id"] not in seen]
+
+
+async def _insert_messages(collection, operations: List[InsertOne]):
+    """Insert messages; ones already written by an earlier attempt are skipped"""
+    try:
+        await collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+            raise
+
+
+chat_store = ChatStore()
@@ -0,0 +1,156 @@
+"""
+Per-website chatbot context cache
+Keeps the system prompt, owner and whether the chatbot automation is active
+in an in-process TTL + LRU cache so the public chatbot skips the website and
+automation lookups on every message. Entries are dropped by explicit hooks
+where websites and automations are written, and by Mongo change streams
+when the deployment supports them
+"""
+import os
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List
+
+CHATBOT_CONTEXT_TTL = float(os.environ.get('CHATBOT_CONTEXT_TTL', '300'))  # Seconds; bounds staleness if an invalidation is missed
+CHATBOT_CONTEXT_MAX_ENTRIES = int(os.environ.get('CHATBOT_CONTEXT_MAX_ENTRIES', '2048'))
+CHATBOT_CONTEXT_WATCH = os.environ.get('CHATBOT_CONTEXT_WATCH', 'true').lower() == 'true'  # Needs a replica set
+
+
+def build_system_prompt(website: Dict[str, Any]) -> str:
+    return f"""
+You are a helpful customer support agent for {website.get('title', 'this website')}.
+Website: {website.get('url')}
+Business Type: {website.get('business_type')}
+Context: {website.get('content_digest', '')}
+
+Be helpful, professional, and provide accurate information based on the website content.
+"""
+
+
+class ChatbotContextCache:
+    def __init__(self, ttl: float = CHATBOT_CONTEXT_TTL, max_entries: int = CHATBOT_CONTEXT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db = None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._generation: Dict[str, int] = {}
+        self._watchers: List[asyncio.Task] = []
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def attach(self, db):
+        """Database used by change-stream invalidation"""
+        self.db = db
+
+    async def get(self, db, website_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Context for a website: {"website_id", "owner_id", "system_prompt", "active"},
+        or None when the website doesn't exist
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._entries.get(website_id)
+        if entry is not None and entry["expires_at"] > loop.time():
+            self._entries.move_to_end(website_id)
+            self.hits += 1
+            return entry["context"]
+
+        self.misses += 1
+        pending = self._loading.get(website_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = loop.create_future()
+        self._loading[website_id] = future
+        generation = self._generation.get(website_id, 0)
+        try:
+            context = await self._load(db, website_id)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Waiters get the error; don't warn if there are none
+            raise
+        finally:
+            self._loading.pop(website_id, None)
+
+        # Skip caching if the website was invalidated while it was loading
+        if self._generation.get(website_id, 0) == generation:
+            self._entries[website_id] = {"context": context, "expires_at": loop.time() + self.ttl}
+            self._entries.move_to_end(website_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        future.set_result(context)
+        return context
+
+    @staticmethod
+    async def _load(db, website_id: str) -> Optional[Dict[str, Any]]:
+        website, chatbot_auto = await asyncio.gather(
+            db["websites"].find_one({"_id": website_id}),
+            db["active_automations"].find_one(
+                {"website_id": website_id, "template_id": "ai-chatbot", "status": "active"},
+                {"_id": 1}
+            )
+        )
+        if not website:
+            return None
+        return {
+            "website_id": website_id,
+            "owner_id": website.get("owner_id"),
+            "system_prompt": build_system_prompt(website),
+            "active": chatbot_auto is not None
+        }
+
+    def invalidate(self, website_id: str):
+        """Drop a website's context after its website or automations change"""
+        self._generation[website_id] = self._generation.get(website_id, 0) + 1
+        if self._entries.pop(website_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        for website_id in list(self._entries):
+            self.invalidate(website_id)
+        for website_id in list(self._loading):
+            self.invalidate(website_id)
+
+    def start(self):
+        """Watch websites and automations for changes made outside this process"""
+        if self.db is None or not CHATBOT_CONTEXT_WATCH or self._watchers:
+            return
+        self._watchers = [
+            asyncio.create_task(self._watch("websites", lambda change: change["documentKey"]["_id"])),
+            asyncio.create_task(self._watch("active_automations", lambda change: (change.get("fullDocument") or {}).get("website_id")))
+        ]
+
+    async def stop(self):
+        for task in self._watchers:
+            task.cancel()
+        await asyncio.gather(*self._watchers, return_exceptions=True)
+        self._watchers = []
+
+    async def _watch(self, collection_name: str, website_id_of):
+        try:
+            async with self.db[collection_name].watch(full_document="updateLookup") as stream:
+                async for change in stream:
+                    website_id = website_id_of(change)
+                    if website_id:
+                        self.invalidate(website_id)
+                    else:
+                        self.clear()  # e.g. a deleted automation; its website is unknown
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Chatbot context change stream on {collection_name} unavailable, relying on TTL and hooks: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "watching": any(not task.done() for task in self._watchers)
+        }
+
+
+chatbot_context_cache = ChatbotContextCache()
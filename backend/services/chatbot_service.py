@@ -1,138 +1,198 @@
 """
 AI Chatbot service for processing chat messages
 """
-import os
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from services.llm_gateway import llm_gateway, LLMPriority
+from services.llm_metrics import llm_metrics
+from services.chatbot_context import chatbot_context_cache
+from services.chat_store import chat_store
+from services.chat_memory import chat_memory
+from analyzer.llm_cache import estimate_tokens
+from analyzer.llm_stream import streaming_enabled, stream_chat_completion
 from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+import asyncio
+import os
+import time
 import uuid
 
-EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
+CHATBOT_MODEL = "gpt-4o-mini"  # Using mini for cost efficiency
+CHATBOT_STREAM_QUEUE_TIMEOUT = float(os.environ.get('CHATBOT_STREAM_QUEUE_TIMEOUT', '15'))  # Max seconds a stream waits for a model slot
+FALLBACK_RESPONSE = "I'm sorry, I'm having trouble processing your request right now. Please try again in a moment."
+
+_saving: Set[asyncio.Task] = set()  # Stream turns being saved, kept referenced until done
+
+
+def _chat_message(website_id: str, session_id: str, role: str, content: str) -> Dict[str, Any]:
+    return {
+        "_id": str(uuid.uuid4()),
+        "website_id": website_id,
+        "session_id": session_id,
+        "role": role,
+        "content": content,
+        "timestamp": datetime.now(timezone.utc)
+    }
+
 
 async def process_chatbot_message(db, website_id: str, session_id: str, message: str, user_message_only: bool = False) -> dict:
     """
     Process chatbot message and return AI response
     """
-    messages_collection = db["chatbot_messages"]
-    sessions_collection = db["chatbot_sessions"]
-    websites_collection = db["websites"]
-    
-    # Get website context
-    website = await websites_collection.find_one({"_id": website_id})
-    if not website:
+    # Get website context (cached per website)
+    context = await chatbot_context_cache.get(db, website_id)
+    if not context:
         return {"error": "Website not found"}
     
-    website_context = f"""
-You are a helpful customer support agent for {website.get('title', 'this website')}.
-Website: {website.get('url')}
-Business Type: {website.get('business_type')}
-Context: {website.get('content_digest', '')}
-
-Be helpful, professional, and provide accurate information based on the website content.
-"""
-    
-    # Get or create session
-    session = await sessions_collection.find_one({"_id": session_id})
-    if not session:
-        session = {
-            "_id": session_id,
-            "website_id": website_id,
-            "started_at": datetime.now(timezone.utc),
-            "last_activity": datetime.now(timezone.utc),
-            "messages_count": 0,
-            "status": "active"
-        }
-        await sessions_collection.insert_one(session)
-    
-    # Store user message
-    user_msg_id = str(uuid.uuid4())
-    user_msg = {
-        "_id": user_msg_id,
-        "website_id": website_id,
-        "session_id": session_id,
-        "role": "user",
-        "content": message,
-        "timestamp": datetime.now(timezone.utc)
-    }
-    await messages_collection.insert_one(user_msg)
+    # User message is saved with the reply as one turn
+    user_msg = _chat_message(website_id, session_id, "user", message)
     
     if user_message_only:
-        return {"message_id": user_msg_id}
+        await chat_store.save_turn(db, website_id, session_id, [user_msg], messages_added=0)
+        return {"message_id": user_msg["_id"]}
     
-    # Get conversation history (last 10 messages)
-    history = await messages_collection.find(
-        {"session_id": session_id}
-    ).sort("timestamp", -1).limit(10).to_list(length=10)
-    history.reverse()  # Oldest first
+    # Summary plus the recent messages that fit the memory budget
+    memory = await chat_memory.load(db, session_id)
     
     # Generate AI response
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"chatbot-{session_id}",
-            system_message=website_context
-        ).with_model("openai", "gpt-4o-mini")  # Using mini for cost efficiency
-        
-        user_message_obj = UserMessage(text=message)
-        response = await chat.send_message(user_message_obj)
-        
-        # Store AI response
-        ai_msg_id = str(uuid.uuid4())
-        ai_msg = {
-            "_id": ai_msg_id,
-            "website_id": website_id,
-            "session_id": session_id,
-            "role": "assistant",
-            "content": response,
-            "timestamp": datetime.now(timezone.utc)
-        }
-        await messages_collection.insert_one(ai_msg)
-        
-        # Update session
-        await sessions_collection.update_one(
-            {"_id": session_id},
-            {
-                "$set": {"last_activity": datetime.now(timezone.utc)},
-                "$inc": {"messages_count": 2}
-            }
+        response = await llm_gateway.complete(
+            CHATBOT_MODEL,
+            chat_memory.build_prompt(memory, message),
+            system_message=context["system_prompt"],
+            session_id=f"chatbot-{uuid.uuid4()}",  # chat_memory is the only conversation context
+            priority=LLMPriority.INTERACTIVE,
+            feature="chatbot",
+            owner_id=context["owner_id"]
         )
-        
-        return {
-            "response": response,
-            "message_id": ai_msg_id,
-            "session_id": session_id
-        }
-        
     except Exception as e:
         print(f"Chatbot error: {e}")
-        # Return fallback response
-        fallback = "I'm sorry, I'm having trouble processing your request right now. Please try again in a moment."
-        ai_msg_id = str(uuid.uuid4())
-        ai_msg = {
-            "_id": ai_msg_id,
-            "website_id": website_id,
-            "session_id": session_id,
-            "role": "assistant",
-            "content": fallback,
-            "timestamp": datetime.now(timezone.utc)
-        }
-        await messages_collection.insert_one(ai_msg)
-        
-        return {
-            "response": fallback,
-            "message_id": ai_msg_id,
-            "session_id": session_id,
-            "error": str(e)
-        }
+        return await _save_fallback(db, website_id, session_id, user_msg, e)
+    
+    return await _save_reply(db, website_id, session_id, user_msg, response, memory, context["owner_id"])
 
 
-async def get_chatbot_history(db, session_id: str, limit: int = 50):
+async def stream_chatbot_message(db, website_id: str, session_id: str, message: str) -> AsyncIterator[Tuple[str, Any]]:
     """
-    Get chat history for a session
+    Streaming variant of process_chatbot_message
+    Yields ("token", text) as the reply is written, then ("done", result)
+    once the turn is saved, with result shaped like process_chatbot_message's.
+    If the model fails mid-stream, done carries the fallback reply instead.
+    The turn is saved however the stream ends, including a client disconnect
     """
-    messages_collection = db["chatbot_messages"]
+    context = await chatbot_context_cache.get(db, website_id)
+    if not context:
+        yield ("error", {"detail": "Website not found"})
+        return
     
-    messages = await messages_collection.find(
-        {"session_id": session_id}
-    ).sort("timestamp", 1).limit(limit).to_list(length=limit)
+    user_msg = _chat_message(website_id, session_id, "user", message)
+    memory, reply = None, None
+    chunks, error, finished = [], None, False
+    try:
+        memory = await chat_memory.load(db, session_id)
+        reply = _stream_reply(context, session_id, chat_memory.build_prompt(memory, message))
+        async for delta in reply:
+            chunks.append(delta)
+            yield ("token", delta)
+        finished = True
+    except Exception as e:
+        print(f"Chatbot stream error: {e}")
+        error = e
+    finally:
+        if reply is not None:
+            await reply.aclose()  # Release the model slot if the client left mid-stream
+        # A disconnect closes this generator, so the save runs as a task that outlives it
+        save = asyncio.create_task(
+            _save_stream_turn(db, website_id, session_id, user_msg, chunks, error, finished, memory, context["owner_id"])
+        )
+        _saving.add(save)
+        save.add_done_callback(_saved)
+    
+    yield ("done", await asyncio.shield(save))
+
+
+def _saved(task: asyncio.Task):
+    _saving.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Chatbot stream save error: {task.exception()}")
+
+
+async def _save_stream_turn(db, website_id: str, session_id: str, user_msg: Dict[str, Any], chunks: List[str],
+                            error: Optional[Exception], finished: bool, memory: Optional[Dict[str, Any]], owner_id: str) -> Dict[str, Any]:
+    if error is not None:
+        return await _save_fallback(db, website_id, session_id, user_msg, error)
+    if finished or chunks:
+        # An interrupted reply is stored as far as the visitor saw it
+        return await _save_reply(db, website_id, session_id, user_msg, "".join(chunks), memory, owner_id)
+    await chat_store.save_turn(db, website_id, session_id, [user_msg], messages_added=0)
+    return {"message_id": user_msg["_id"], "session_id": session_id}
+
+
+async def _stream_reply(context: Dict[str, Any], session_id: str, prompt: str) -> AsyncIterator[str]:
+    """
+    Token stream when an OpenAI-compatible streaming endpoint is configured,
+    otherwise the whole gateway response as a single chunk
+    """
+    if streaming_enabled():
+        async with llm_gateway.slot(CHATBOT_MODEL, LLMPriority.INTERACTIVE, timeout=CHATBOT_STREAM_QUEUE_TIMEOUT):
+            started = time.monotonic()
+            completion = []
+            error = "cancelled"
+            try:
+                async for delta in stream_chat_completion(CHATBOT_MODEL, context["system_prompt"], prompt):
+                    completion.append(delta)
+                    yield delta
+                error = None
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                llm_metrics.observe(
+                    CHATBOT_MODEL,
+                    "chatbot_stream",
+                    estimate_tokens(context["system_prompt"], prompt),
+                    estimate_tokens("".join(completion)),
+                    time.monotonic() - started,
+                    error,
+                    context["owner_id"]
+                )
+        return
     
-    return messages
+    yield await llm_gateway.complete(
+        CHATBOT_MODEL,
+        prompt,
+        system_message=context["system_prompt"],
+        session_id=f"chatbot-{uuid.uuid4()}",
+        priority=LLMPriority.INTERACTIVE,
+        feature="chatbot",
+        owner_id=context["owner_id"]
+    )
+
+
+async def _save_reply(db, website_id: str, session_id: str, user_msg: Dict[str, Any], response: str,
+                      memory: Dict[str, Any], owner_id: str) -> Dict[str, Any]:
+    # Store both messages and create or update the session
+    ai_msg = _chat_message(website_id, session_id, "assistant", response)
+    await chat_store.save_turn(db, website_id, session_id, [user_msg, ai_msg], messages_added=2)
+    chat_memory.maybe_summarize(db, session_id, memory, owner_id)
+    return {
+        "response": response,
+        "message_id": ai_msg["_id"],
+        "session_id": session_id
+    }
+
+
+async def _save_fallback(db, website_id: str, session_id: str, user_msg: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    ai_msg = _chat_message(website_id, session_id, "assistant", FALLBACK_RESPONSE)
+    await chat_store.save_turn(db, website_id, session_id, [user_msg, ai_msg], messages_added=0)
+    return {
+        "response": FALLBACK_RESPONSE,
+        "message_id": ai_msg["_id"],
+        "session_id": session_id,
+        "error": str(error)
+    }
+
+
+async def get_chatbot_history(db, session_id: str, limit: int = 50):
+    """
+    Get chat history for a session
+    """
+    return await chat_store.get_session_messages(db, session_id, limit)
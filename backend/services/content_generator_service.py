@@ -2,12 +2,9 @@
 AI Content Generator Service
 Generates blog posts, product descriptions, marketing copy, social media posts
 """
-import os
 import uuid
 from datetime import datetime, timezone
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-
-EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
+from services.llm_gateway import llm_gateway, LLMPriority
 
 CONTENT_TEMPLATES = {
     "blog_post": {
@@ -115,13 +112,15 @@ async def generate_content(db, content_type: str, inputs: dict, user_id: str = N
     
     # Generate with AI
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
+        response = await llm_gateway.complete(
+            "gpt-4o",
+            prompt,
+            system_message="You are a professional content writer and marketing expert. Generate high-quality, engaging content based on the user's requirements.",
             session_id=f"content-{uuid.uuid4()}",
-            system_message="You are a professional content writer and marketing expert. Generate high-quality, engaging content based on the user's requirements."
-        ).with_model("openai", "gpt-4o")
-        
-        response = await chat.send_message(UserMessage(text=prompt))
+            priority=LLMPriority.BACKGROUND,
+            feature="content",
+            owner_id=user_id
+        )
         
         # Save to database
         content_id = str(uuid.uuid4())
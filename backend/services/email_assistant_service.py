@@ -2,12 +2,9 @@
 AI Email Assistant Service
 Drafts email responses, creates campaigns, suggests improvements
 """
-import os
 import uuid
 from datetime import datetime, timezone
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-
-EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
+from services.llm_gateway import llm_gateway, LLMPriority
 
 async def draft_email_response(db, context: dict, user_id: str = None) -> dict:
     """
@@ -36,13 +33,15 @@ Write a clear, well-structured response that:
 Do not include subject line."""
     
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
+        response = await llm_gateway.complete(
+            "gpt-4o-mini",
+            prompt,
+            system_message="You are a professional email writing assistant. Draft clear, effective, and appropriately-toned email responses.",
             session_id=f"email-draft-{uuid.uuid4()}",
-            system_message="You are a professional email writing assistant. Draft clear, effective, and appropriately-toned email responses."
-        ).with_model("openai", "gpt-4o-mini")
-        
-        response = await chat.send_message(UserMessage(text=prompt))
+            priority=LLMPriority.INTERACTIVE,
+            feature="email_draft",
+            owner_id=user_id
+        )
         
         # Save draft
         draft_id = str(uuid.uuid4())
@@ -91,13 +90,15 @@ Format each email clearly with headers: Subject, Preheader, Body, CTA
 Make them conversion-optimized and engaging."""
     
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
+        response = await llm_gateway.complete(
+            "gpt-4o",
+            prompt,
+            system_message="You are an expert email marketing copywriter. Create compelling, conversion-focused email campaigns.",
             session_id=f"email-campaign-{uuid.uuid4()}",
-            system_message="You are an expert email marketing copywriter. Create compelling, conversion-focused email campaigns."
-        ).with_model("openai", "gpt-4o")
-        
-        response = await chat.send_message(UserMessage(text=prompt))
+            priority=LLMPriority.BATCH,
+            feature="email_campaign",
+            owner_id=user_id
+        )
         
         # Save campaign
         campaign_id = str(uuid.uuid4())
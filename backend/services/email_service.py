@@ -2,6 +2,7 @@
 Email delivery service using SendGrid
 """
 import os
+import asyncio
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail, Email, To, Content
 from typing import Optional
@@ -69,8 +70,9 @@ async def send_email(
             ]
         
         # Send email
+        # The SendGrid client is blocking; keep it off the event loop
         sg = SendGridAPIClient(SENDGRID_API_KEY)
-        response = sg.send(mail)
+        response = await asyncio.to_thread(sg.send, mail)
         
         # SendGrid returns 202 on success
         if response.status_code == 202:
@@ -0,0 +1,230 @@
+"""
+Lead processing pipeline
+Form submissions store the lead and return; workers then run each step
+(score -> autoresponse -> email -> usage) against the lead document, retrying
+steps on their own and recording every step's state on the lead
+"""
+import os
+import socket
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, List
+from pymongo import ReturnDocument
+from .lead_service import (
+    NO_WEBSITE_AUTORESPONSE,
+    decide_lead_score,
+    default_lead_scoring,
+    fallback_autoresponse,
+    request_autoresponse,
+    send_autoresponse
+)
+from .llm_metrics import llm_owner
+from .usage_tracker import track_usage
+
+LEAD_PIPELINE_WORKERS = int(os.environ.get('LEAD_PIPELINE_WORKERS', '4'))  # Concurrent leads per process
+LEAD_PIPELINE_LEASE = int(os.environ.get('LEAD_PIPELINE_LEASE', '120'))  # Seconds before a crashed worker's lead is retried
+LEAD_STEP_MAX_ATTEMPTS = int(os.environ.get('LEAD_STEP_MAX_ATTEMPTS', '3'))  # Per step, then its fallback is used
+LEAD_STEP_RETRY_BACKOFF = float(os.environ.get('LEAD_STEP_RETRY_BACKOFF', '5'))  # Seconds, doubled per attempt
+LEAD_PIPELINE_POLL = float(os.environ.get('LEAD_PIPELINE_POLL', '1.0'))  # Seconds between idle queue checks
+
+# Steps in order; each has its own state under pipeline.steps
+STEPS = ["score", "autoresponse", "email", "usage"]
+
+
+class StepSkipped(Exception):
+    """Raised by a step with nothing to do"""
+    pass
+
+
+class LeadPipeline:
+    def __init__(self, db, workers: int = LEAD_PIPELINE_WORKERS):
+        self.db = db
+        self.leads = db["leads"]
+        self.workers = workers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def ensure_indexes(self):
+        await self.leads.create_index([("pipeline.status", 1), ("pipeline.next_run_at", 1)])
+
+    @staticmethod
+    def initial_state(now: datetime) -> Dict[str, Any]:
+        return {
+            "status": "pending",
+            "step": None,
+            "steps": {step: {"status": "pending", "attempts": 0, "error": None} for step in STEPS},
+            "next_run_at": now,
+            "lease_until": None,
+            "worker": None,
+            "finished_at": None
+        }
+
+    async def submit(self, lead: Dict[str, Any], utm: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Store a new lead with a pending pipeline and wake a worker"""
+        lead["pipeline"] = self.initial_state(lead["created_at"])
+        lead["pipeline"]["utm"] = utm or {}
+        await self.leads.insert_one(lead)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return lead
+
+    def start(self):
+        """Start the worker pool"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop workers; leads they were processing are resumed after their lease expires"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the next due lead, or one whose worker died"""
+        now = datetime.now(timezone.utc)
+        return await self.leads.find_one_and_update(
+            {
+                "$or": [
+                    {"pipeline.status": "pending", "pipeline.next_run_at": {"$lte": now}},
+                    {"pipeline.status": "running", "pipeline.lease_until": {"$lt": now}}
+                ]
+            },
+            {"$set": {
+                "pipeline.status": "running",
+                "pipeline.worker": self.owner,
+                "pipeline.lease_until": now + timedelta(seconds=LEAD_PIPELINE_LEASE)
+            }},
+            sort=[("pipeline.next_run_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _worker(self):
+        while True:
+            try:
+                lead = await self._claim()
+                if lead is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=LEAD_PIPELINE_POLL)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self.run_lead(lead)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Lead pipeline worker error: {e}")
+                await asyncio.sleep(LEAD_PIPELINE_POLL)
+
+    async def run_lead(self, lead: Dict[str, Any]):
+        """
+        Run the lead's unfinished steps in order. A failing step is rescheduled
+        with backoff; after its last attempt its fallback is stored and later
+        steps still run
+        """
+        lead_id = lead["_id"]
+        website = await self.db["websites"].find_one({"_id": lead.get("website_id")}) if lead.get("website_id") else None
+
+        with llm_owner(lead.get("owner_id")):
+            for step in STEPS:
+                state = lead["pipeline"]["steps"][step]
+                if state["status"] in ("done", "skipped", "failed"):
+                    continue
+
+                attempts = state["attempts"] + 1
+                now = datetime.now(timezone.utc)
+                await self.leads.update_one({"_id": lead_id}, {"$set": {
+                    "pipeline.step": step,
+                    f"pipeline.steps.{step}.status": "running",
+                    f"pipeline.steps.{step}.attempts": attempts,
+                    f"pipeline.steps.{step}.started_at": now
+                }})
+
+                status, error = "done", None
+                try:
+                    fields = await getattr(self, f"_step_{step}")(lead, website)
+                except StepSkipped:
+                    status, fields = "skipped", {}
+                except Exception as e:
+                    error = str(e) or e.__class__.__name__
+                    print(f"Lead {lead_id} step {step} failed (attempt {attempts}): {error}")
+                    if attempts < LEAD_STEP_MAX_ATTEMPTS:
+                        await self.leads.update_one({"_id": lead_id}, {"$set": {
+                            "pipeline.status": "pending",
+                            "pipeline.next_run_at": now + timedelta(seconds=LEAD_STEP_RETRY_BACKOFF * 2 ** (attempts - 1)),
+                            "pipeline.lease_until": None,
+                            f"pipeline.steps.{step}.status": "retrying",
+                            f"pipeline.steps.{step}.error": error
+                        }})
+                        return
+                    status, fields = "failed", self._fallback(step, lead, website)
+
+                lead.update(fields)
+                state.update({"status": status, "attempts": attempts, "error": error})
+                await self.leads.update_one({"_id": lead_id}, {"$set": {
+                    **fields,
+                    f"pipeline.steps.{step}.status": status,
+                    f"pipeline.steps.{step}.error": error,
+                    f"pipeline.steps.{step}.finished_at": datetime.now(timezone.utc)
+                }})
+
+        failed = any(state["status"] == "failed" for state in lead["pipeline"]["steps"].values())
+        await self.leads.update_one({"_id": lead_id}, {"$set": {
+            "pipeline.status": "failed" if failed else "completed",
+            "pipeline.step": None,
+            "pipeline.lease_until": None,
+            "pipeline.finished_at": datetime.now(timezone.utc)
+        }})
+
+    async def _step_score(self, lead: Dict[str, Any], website: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Rules when confident, otherwise one AI call that also writes the auto-response"""
+        decision = await decide_lead_score(lead["data"], website, lead["pipeline"].get("utm"))
+        fields = {"score": decision["score"], "scoring": decision["scoring"]}
+        if decision["autoresponse"]:
+            fields["autoresponse_content"] = decision["autoresponse"]
+        return fields
+
+    async def _step_autoresponse(self, lead: Dict[str, Any], website: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if lead.get("autoresponse_content"):
+            raise StepSkipped()  # Written together with the score
+        if not website:
+            return {"autoresponse_content": NO_WEBSITE_AUTORESPONSE}
+        return {"autoresponse_content": await request_autoresponse(website, lead["data"])}
+
+    async def _step_email(self, lead: Dict[str, Any], website: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if not lead["data"].get("email"):
+            raise StepSkipped()
+        sent = await send_autoresponse(website, lead["data"], lead["autoresponse_content"])
+        return {
+            "autoresponse_email_sent": sent,
+            "autoresponse_sent_at": datetime.now(timezone.utc) if sent else None
+        }
+
+    async def _step_usage(self, lead: Dict[str, Any], website: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if not lead.get("owner_id"):
+            raise StepSkipped()
+        await track_usage(self.db, lead["owner_id"], ai_interactions=1)
+        return {}
+
+    @staticmethod
+    def _fallback(step: str, lead: Dict[str, Any], website: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Fields stored when a step gives up, so later steps can still run"""
+        if step == "score":
+            return {"score": "warm", "scoring": default_lead_scoring(lead["data"], lead["pipeline"].get("utm"))}
+        if step == "autoresponse":
+            return {"autoresponse_content": fallback_autoresponse(website) if website else NO_WEBSITE_AUTORESPONSE}
+        if step == "email":
+            return {"autoresponse_email_sent": False}
+        return {}
+
+    async def get_queue_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "pending": await self.leads.count_documents({"pipeline.status": "pending"}),
+            "running": await self.leads.count_documents({"pipeline.status": "running"}),
+            "failed": await self.leads.count_documents({"pipeline.status": "failed"})
+        }
@@ -0,0 +1,134 @@
+"""
+Rule-based lead pre-scoring
+Scores a lead from signals already on the submission (phone, email domain,
+company, message length and intent keywords, UTM source) so clear-cut leads
+are settled without an LLM call and only ambiguous ones go to the model
+"""
+import os
+import re
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit
+from analyzer.keyword_matcher import KeywordMatcher
+
+LEAD_PRESCORE_ENABLED = os.environ.get('LEAD_PRESCORE_ENABLED', 'true').lower() == 'true'
+LEAD_PRESCORE_MIN_CONFIDENCE = float(os.environ.get('LEAD_PRESCORE_MIN_CONFIDENCE', '0.8'))  # Below this the LLM decides
+
+# Points at or beyond these thresholds make a lead hot / cold
+HOT_POINTS = 5.0
+COLD_POINTS = 0.0
+
+FREE_EMAIL_DOMAINS = {
+    "gmail.com", "googlemail.com", "yahoo.com", "hotmail.com", "outlook.com", "live.com", "msn.com",
+    "aol.com", "icloud.com", "me.com", "mail.com", "gmx.com", "gmx.net", "proton.me", "protonmail.com",
+    "yandex.com", "zoho.com"
+}
+DISPOSABLE_EMAIL_DOMAINS = {
+    "mailinator.com", "10minutemail.com", "guerrillamail.com", "tempmail.com", "temp-mail.org",
+    "trashmail.com", "yopmail.com", "sharklasers.com", "getnada.com", "dispostable.com"
+}
+
+INTENT_MATCHER = KeywordMatcher({
+    "buying": [
+        "pricing", "price", "quote", "buy", "purchase", "demo", "trial", "budget", "contract",
+        "proposal", "sign up", "subscribe", "hire", "ready to", "book a call", "schedule a call",
+        "get started", "how much", "cost"
+    ],
+    "urgent": ["asap", "urgent", "immediately", "this week", "today", "tomorrow", "deadline"],
+    "junk": [
+        "seo services", "backlinks", "guest post", "link building", "crypto", "casino", "loan",
+        "job application", "resume", "internship", "unsubscribe", "just browsing", "student project",
+        "test test"
+    ]
+})
+
+PAID_UTM_MEDIUMS = {"cpc", "ppc", "paid", "paid_search", "paidsearch", "paid_social"}
+REFERRAL_UTM_SOURCES = {"partner", "referral", "affiliate"}
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@([^@\s]+\.[^@\s]+)$')
+
+
+def _text(value: Any) -> str:
+    """Form fields come from public posts; anything but a string counts as empty"""
+    return value.strip() if isinstance(value, str) else ''
+
+
+def _email_domain(email: Any) -> Optional[str]:
+    match = EMAIL_PATTERN.match(_text(email).lower())
+    return match.group(1) if match else None
+
+
+def _site_domain(website: Any) -> Optional[str]:
+    website = _text(website)
+    if not website:
+        return None
+    host = urlsplit(website if '://' in website else f"http://{website}").hostname or ''
+    return host[4:] if host.startswith('www.') else host or None
+
+
+def prescore_lead(lead_data: Dict[str, Any], utm: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Score a lead locally
+    Returns {"score": hot|warm|cold, "confidence": 0-1, "points", "signals"};
+    warm is always low confidence (ambiguous leads go to the LLM)
+    """
+    points = 0.0
+    signals: List[Tuple[str, float]] = []
+
+    def signal(name: str, value: float):
+        nonlocal points
+        points += value
+        signals.append((name, value))
+
+    digits = re.sub(r'\D', '', str(lead_data.get('phone') or ''))
+    if len(digits) >= 7:
+        signal("phone", 2.0)
+
+    domain = _email_domain(lead_data.get('email'))
+    if domain is None:
+        signal("invalid_email", -3.0)
+    elif domain in DISPOSABLE_EMAIL_DOMAINS:
+        signal("disposable_email", -4.0)
+    elif domain in FREE_EMAIL_DOMAINS:
+        signal("free_email", 0.0)
+    else:
+        signal("corporate_email", 2.0)
+        site = _site_domain(lead_data.get('website'))
+        if site and (domain == site or domain.endswith(f".{site}")):
+            signal("email_matches_website", 1.0)
+
+    if _text(lead_data.get('company')) or _text(lead_data.get('website')):
+        signal("company", 1.5)
+
+    message = _text(lead_data.get('message'))
+    if len(message) < 15:
+        signal("short_message", -1.5)
+    elif len(message) >= 200:
+        signal("detailed_message", 1.0)
+
+    intent = INTENT_MATCHER.score(INTENT_MATCHER.find(message))
+    if intent.get("buying"):
+        signal("buying_intent", min(3.0, 1.5 * intent["buying"]))
+    if intent.get("urgent"):
+        signal("urgency", 1.0)
+    if intent.get("junk"):
+        signal("junk", max(-4.0, -2.0 * intent["junk"]))
+
+    utm = utm or {}
+    if _text(utm.get('utm_medium')).lower() in PAID_UTM_MEDIUMS:
+        signal("paid_traffic", 1.0)
+    if _text(utm.get('utm_source')).lower() in REFERRAL_UTM_SOURCES:
+        signal("referral", 1.0)
+
+    if points >= HOT_POINTS:
+        score, confidence = "hot", 0.6 + 0.1 * (points - HOT_POINTS + 1)
+    elif points <= COLD_POINTS:
+        score, confidence = "cold", 0.6 + 0.1 * (COLD_POINTS - points + 1)
+    else:
+        score, confidence = "warm", 0.5
+
+    return {
+        "score": score,
+        "confidence": round(min(confidence, 0.99), 2),
+        "points": points,
+        "signals": [name for name, _ in signals]
+    }
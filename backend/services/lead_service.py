@@ -1,27 +1,19 @@
 """
 Lead Capture service for processing form submissions and AI auto-responses
 """
-import os
+import json
 import uuid
 from datetime import datetime, timezone
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from typing import Optional
 from .email_service import send_lead_autoresponse_email, EmailDeliveryError
+from .llm_gateway import llm_gateway, LLMPriority
+from .lead_prescorer import prescore_lead, LEAD_PRESCORE_ENABLED, LEAD_PRESCORE_MIN_CONFIDENCE
 
-EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
+NO_WEBSITE_AUTORESPONSE = "Thank you for your interest! We'll get back to you soon."
 
-async def generate_lead_autoresponse(db, lead_data: dict, website_id: str) -> str:
-    """
-    Generate AI-powered personalized auto-response for lead
-    """
-    websites_collection = db["websites"]
-    
-    # Get website context
-    website = await websites_collection.find_one({"_id": website_id})
-    if not website:
-        return "Thank you for your interest! We'll get back to you soon."
-    
-    # Build context for AI
-    context = f"""
+
+def _lead_context(website: dict, lead_data: dict) -> str:
+    return f"""
 You are responding to a lead/inquiry for {website.get('title', 'our company')}.
 
 Website: {website.get('url')}
@@ -31,7 +23,10 @@ Lead Information:
 Name: {lead_data.get('name', 'Not provided')}
 Email: {lead_data.get('email')}
 Message: {lead_data.get('message', 'No message provided')}
+"""
 
+
+AUTORESPONSE_INSTRUCTIONS = """
 Write a warm, professional, personalized auto-response email that:
 1. Thanks them for their interest
 2. Acknowledges their specific question/message
@@ -41,23 +36,17 @@ Write a warm, professional, personalized auto-response email that:
 
 Keep it concise (3-4 short paragraphs). Do not include subject line or email signature.
 """
-    
-    try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"lead-{uuid.uuid4()}",
-            system_message="You are a helpful business assistant writing professional auto-response emails."
-        ).with_model("openai", "gpt-4o-mini")
-        
-        user_message = UserMessage(text=context)
-        response = await chat.send_message(user_message)
-        
-        return response
-        
-    except Exception as e:
-        print(f"Auto-response generation error: {e}")
-        # Fallback response
-        return f"""Thank you for reaching out to us!
+
+SCORING_CRITERIA = """
+Criteria:
+- HOT: Clear buying intent, specific requirements, contact info provided, urgent need
+- WARM: Interested, some details provided, not urgent
+- COLD: Generic inquiry, minimal info, unclear intent
+"""
+
+
+def fallback_autoresponse(website: dict) -> str:
+    return f"""Thank you for reaching out to us!
 
 We've received your message and appreciate your interest. One of our team members will review your inquiry and get back to you within 24 hours.
 
@@ -67,6 +56,102 @@ Best regards,
 The Team"""
 
 
+async def request_autoresponse(website: dict, lead_data: dict) -> str:
+    """
+    Write the lead's auto-response with AI; raises when the call fails
+    """
+    return await llm_gateway.complete(
+        "gpt-4o-mini",
+        _lead_context(website, lead_data) + AUTORESPONSE_INSTRUCTIONS,
+        system_message="You are a helpful business assistant writing professional auto-response emails.",
+        session_id=f"lead-{uuid.uuid4()}",
+        priority=LLMPriority.BACKGROUND,
+        feature="autoresponse",
+        owner_id=website.get("owner_id")
+    )
+
+
+async def _write_autoresponse(website: dict, lead_data: dict) -> str:
+    try:
+        return await request_autoresponse(website, lead_data)
+    except Exception as e:
+        print(f"Auto-response generation error: {e}")
+        return fallback_autoresponse(website)
+
+
+async def request_lead_processing(website: dict, lead_data: dict):
+    """
+    Score the lead and write its auto-response in one AI call; raises when the
+    call fails or the response isn't JSON
+    Returns (score or None, autoresponse or None) for whichever part came back usable
+    """
+    prompt = _lead_context(website, lead_data) + f"""
+Phone: {lead_data.get('phone', 'Not provided')}
+Company: {lead_data.get('company', 'Not provided')}
+
+Do two things:
+
+1. Score this lead as HOT, WARM, or COLD.
+{SCORING_CRITERIA}
+2. {AUTORESPONSE_INSTRUCTIONS.strip()}
+
+Respond with ONLY valid JSON (no markdown, no extra text):
+{{"score": "HOT|WARM|COLD", "autoresponse": "the email body"}}
+"""
+    response_text = (await llm_gateway.complete(
+        "gpt-4o-mini",
+        prompt,
+        system_message="You are a lead qualification expert and business assistant writing professional auto-response emails.",
+        session_id=f"lead-{uuid.uuid4()}",
+        priority=LLMPriority.BACKGROUND,
+        feature="lead_process",
+        owner_id=website.get("owner_id")
+    )).strip()
+    if '```json' in response_text:
+        response_text = response_text.split('```json')[1].split('```')[0].strip()
+    elif '```' in response_text:
+        response_text = response_text.split('```')[1].split('```')[0].strip()
+    data = json.loads(response_text)
+
+    score = str(data.get('score', '')).strip().upper()
+    autoresponse = data.get('autoresponse')
+    return (
+        score.lower() if score in ['HOT', 'WARM', 'COLD'] else None,
+        autoresponse.strip() if isinstance(autoresponse, str) and autoresponse.strip() else None
+    )
+
+
+async def send_autoresponse(website: Optional[dict], lead_data: dict, autoresponse_content: str) -> bool:
+    """
+    Email the auto-response to the lead; raises EmailDeliveryError when delivery fails
+    """
+    company_name = website.get('title', 'Our Company') if website else 'Our Company'
+    return await send_lead_autoresponse_email(
+        to_email=lead_data['email'],
+        lead_name=lead_data.get('name', 'there'),
+        company_name=company_name,
+        autoresponse_content=autoresponse_content
+    )
+
+
+async def _send_autoresponse(website: Optional[dict], lead_data: dict, autoresponse_content: str) -> bool:
+    try:
+        return await send_autoresponse(website, lead_data, autoresponse_content)
+    except EmailDeliveryError as e:
+        print(f"Email delivery failed: {e}")
+        return False
+
+
+async def generate_lead_autoresponse(db, lead_data: dict, website_id: str) -> str:
+    """
+    Generate AI-powered personalized auto-response for lead
+    """
+    website = await db["websites"].find_one({"_id": website_id})
+    if not website:
+        return NO_WEBSITE_AUTORESPONSE
+    return await _write_autoresponse(website, lead_data)
+
+
 async def generate_and_send_lead_autoresponse(
     db, 
     lead_data: dict, 
@@ -79,36 +164,85 @@ async def generate_and_send_lead_autoresponse(
     Returns:
         tuple: (autoresponse_content, email_sent_successfully)
     """
-    # Generate the auto-response
-    autoresponse_content = await generate_lead_autoresponse(db, lead_data, website_id)
+    website = await db["websites"].find_one({"_id": website_id})
+    autoresponse_content = await _write_autoresponse(website, lead_data) if website else NO_WEBSITE_AUTORESPONSE
     
     email_sent = False
     if send_email and lead_data.get('email'):
-        # Get website info for company name
-        websites_collection = db["websites"]
-        website = await websites_collection.find_one({"_id": website_id})
-        company_name = website.get('title', 'Our Company') if website else 'Our Company'
-        
-        try:
-            email_sent = await send_lead_autoresponse_email(
-                to_email=lead_data['email'],
-                lead_name=lead_data.get('name', 'there'),
-                company_name=company_name,
-                autoresponse_content=autoresponse_content
-            )
-        except EmailDeliveryError as e:
-            print(f"Email delivery failed: {e}")
-            email_sent = False
+        email_sent = await _send_autoresponse(website, lead_data, autoresponse_content)
     
     return autoresponse_content, email_sent
 
 
 async def score_lead(db, lead_data: dict) -> str:
     """
-    Use AI to score lead as hot/warm/cold
+    Score lead as hot/warm/cold
+    """
+    return (await score_lead_detailed(db, lead_data))["score"]
+
+
+async def score_lead_detailed(db, lead_data: dict, utm: dict = None) -> dict:
+    """
+    Score lead with local rules, falling back to AI for ambiguous leads
+    Returns {"score", "path": rules|llm|default, "prescore", "confidence", "points", "signals"}
     """
     try:
-        prompt = f"""
+        decision = await decide_lead_score(lead_data, utm=utm)
+    except Exception as e:
+        print(f"Lead scoring error: {e}")
+        return {"score": "warm", **default_lead_scoring(lead_data, utm)}
+    return {"score": decision["score"], **decision["scoring"]}
+
+
+async def decide_lead_score(lead_data: dict, website: dict = None, utm: dict = None) -> dict:
+    """
+    Score a lead with local rules when they are confident, otherwise with AI;
+    given the website, the same AI call also writes the auto-response
+    Returns {"score", "scoring", "autoresponse" (None unless written)};
+    raises when the AI call fails or gives no valid score
+    """
+    prescore = prescore_lead(lead_data, utm)
+    if prescore_decides(prescore):
+        return {"score": prescore["score"], "scoring": {"path": "rules", **prescore_details(prescore)}, "autoresponse": None}
+
+    if website:
+        score, autoresponse = await request_lead_processing(website, lead_data)
+    else:
+        score, autoresponse = await request_lead_score(lead_data), None
+    if score is None:
+        raise ValueError("AI response had no valid score")
+    return {"score": score, "scoring": {"path": "llm", **prescore_details(prescore)}, "autoresponse": autoresponse}
+
+
+def default_lead_scoring(lead_data: dict, utm: dict = None) -> dict:
+    """
+    Scoring details stored with the default warm score when AI scoring fails
+    """
+    return {"path": "default", **prescore_details(prescore_lead(lead_data, utm))}
+
+
+def prescore_decides(prescore: dict) -> bool:
+    """
+    Whether the rule-based pre-score is confident enough to skip AI scoring
+    """
+    return LEAD_PRESCORE_ENABLED and prescore["confidence"] >= LEAD_PRESCORE_MIN_CONFIDENCE
+
+
+def prescore_details(prescore: dict) -> dict:
+    return {
+        "prescore": prescore["score"],
+        "confidence": prescore["confidence"],
+        "points": prescore["points"],
+        "signals": prescore["signals"]
+    }
+
+
+async def request_lead_score(lead_data: dict):
+    """
+    Use AI to score lead as hot/warm/cold; None when the answer isn't a score,
+    raises when the call fails
+    """
+    prompt = f"""
 Score this lead as HOT, WARM, or COLD based on the provided information.
 
 Lead Data:
@@ -118,27 +252,20 @@ Lead Data:
 - Company: {lead_data.get('company', 'Not provided')}
 - Message: {lead_data.get('message', 'No message')}
 
-Criteria:
-- HOT: Clear buying intent, specific requirements, contact info provided, urgent need
-- WARM: Interested, some details provided, not urgent
-- COLD: Generic inquiry, minimal info, unclear intent
-
+{SCORING_CRITERIA}
 Respond with ONLY one word: HOT, WARM, or COLD
 """
-        
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"lead-score-{uuid.uuid4()}",
-            system_message="You are a lead qualification expert. Analyze lead data and provide accurate scoring."
-        ).with_model("openai", "gpt-4o-mini")
-        
-        response = await chat.send_message(UserMessage(text=prompt))
-        score = response.strip().upper()
-        
-        if score in ['HOT', 'WARM', 'COLD']:
-            return score.lower()
-        return 'warm'  # Default
-        
-    except Exception as e:
-        print(f"Lead scoring error: {e}")
-        return 'warm'
+    
+    response = await llm_gateway.complete(
+        "gpt-4o-mini",
+        prompt,
+        system_message="You are a lead qualification expert. Analyze lead data and provide accurate scoring.",
+        session_id=f"lead-score-{uuid.uuid4()}",
+        priority=LLMPriority.BACKGROUND,
+        feature="lead_score"
+    )
+    score = response.strip().upper()
+    
+    if score in ['HOT', 'WARM', 'COLD']:
+        return score.lower()
+    return None
@@ -0,0 +1,325 @@
+"""
+LLM gateway
+Every LLM call goes through one gateway: per-model token-bucket rate limits
+and concurrency caps, priority queues (interactive chat before background
+scoring before batch reports), per-call deadlines and hedged retries
+"""
+import os
+import json
+import time
+import uuid
+import heapq
+import asyncio
+import itertools
+from enum import IntEnum
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, List
+from emergentintegrations.llm.chat import LlmChat, UserMessage
+from analyzer.llm_cache import estimate_tokens
+from .llm_metrics import llm_metrics
+from .llm_standin import build_provider
+
+EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
+
+# Per-model limits; LLM_MODEL_LIMITS overrides them per model, e.g.
+# {"gpt-4o": {"rpm": 60, "burst": 10, "concurrency": 8}}
+LLM_DEFAULT_RPM = float(os.environ.get('LLM_DEFAULT_RPM', '300'))  # Sustained requests per minute
+LLM_DEFAULT_BURST = int(os.environ.get('LLM_DEFAULT_BURST', '20'))  # Requests allowed at once after an idle period
+LLM_DEFAULT_CONCURRENCY = int(os.environ.get('LLM_DEFAULT_CONCURRENCY', '16'))  # In-flight calls
+LLM_MODEL_LIMITS = json.loads(os.environ.get('LLM_MODEL_LIMITS', '{}'))
+
+LLM_MAX_ATTEMPTS = int(os.environ.get('LLM_MAX_ATTEMPTS', '2'))  # Tries per call while the deadline allows
+LLM_RETRY_BACKOFF = float(os.environ.get('LLM_RETRY_BACKOFF', '0.5'))  # Seconds, doubled per retry
+LLM_WAIT_SAMPLES = 500  # Recent queue waits kept per priority for percentiles
+
+
+class LLMPriority(IntEnum):
+    """Lower values are served first when a model is saturated"""
+    INTERACTIVE = 0  # Someone is waiting on the reply (chatbot, drafts)
+    BACKGROUND = 1   # Lead scoring, auto-responses, website analyses
+    BATCH = 2        # Reports, campaigns, bulk generation
+
+
+# Seconds per priority: (deadline, start a hedged duplicate after; 0 = never)
+PRIORITY_DEFAULTS = {
+    LLMPriority.INTERACTIVE: (
+        float(os.environ.get('LLM_INTERACTIVE_DEADLINE', '30')),
+        float(os.environ.get('LLM_INTERACTIVE_HEDGE', '8'))
+    ),
+    LLMPriority.BACKGROUND: (
+        float(os.environ.get('LLM_BACKGROUND_DEADLINE', '90')),
+        float(os.environ.get('LLM_BACKGROUND_HEDGE', '0'))
+    ),
+    LLMPriority.BATCH: (
+        float(os.environ.get('LLM_BATCH_DEADLINE', '180')),
+        float(os.environ.get('LLM_BATCH_HEDGE', '0'))
+    )
+}
+
+
+class LLMGatewayError(Exception):
+    pass
+
+
+class LLMDeadlineExceeded(LLMGatewayError):
+    pass
+
+
+class _ModelLane:
+    """Token bucket plus concurrency cap for one model, granting waiters by priority"""
+
+    def __init__(self, rpm: float, burst: int, concurrency: int):
+        self.rate = rpm / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.concurrency = max(1, concurrency)
+        self.in_flight = 0
+        self._updated = time.monotonic()
+        self._waiters: List = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def queued(self) -> int:
+        return len([w for w in self._waiters if not w[2].done()])
+
+    async def acquire(self, priority: LLMPriority):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just before the caller gave up: hand the slot back
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _dispatch(self):
+        while self._waiters and self.in_flight < self.concurrency:
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)  # Caller timed out or was cancelled
+                continue
+            self._refill()
+            if self.tokens < 1:
+                if self._timer is None and self.rate > 0:
+                    delay = (1 - self.tokens) / self.rate
+                    self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+                return
+            _, _, future = heapq.heappop(self._waiters)
+            self.tokens -= 1
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+
+class LLMGateway:
+    def __init__(self):
+        self._lanes: Dict[str, _ModelLane] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._waits = {priority: deque(maxlen=LLM_WAIT_SAMPLES) for priority in LLMPriority}
+        self._wait_totals = {priority: [0, 0.0, 0.0] for priority in LLMPriority}  # count, sum, max
+        # Local stand-in (LLM_PROVIDER=record/replay/synthetic) or None for live calls
+        self.provider = build_provider(self._send_live)
+
+    def set_provider(self, provider):
+        """Swap in a stand-in provider (None restores live calls)"""
+        self.provider = provider
+
+    def _lane(self, model: str) -> _ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            limits = LLM_MODEL_LIMITS.get(model, {})
+            lane = _ModelLane(
+                rpm=float(limits.get('rpm', LLM_DEFAULT_RPM)),
+                burst=int(limits.get('burst', LLM_DEFAULT_BURST)),
+                concurrency=int(limits.get('concurrency', LLM_DEFAULT_CONCURRENCY))
+            )
+            self._lanes[model] = lane
+        return lane
+
+    def _count(self, model: str, name: str):
+        counters = self._counters.setdefault(model, {
+            "calls": 0, "errors": 0, "retries": 0, "deadline_exceeded": 0, "hedges": 0, "hedge_wins": 0
+        })
+        counters[name] += 1
+
+    def _record_wait(self, priority: LLMPriority, seconds: float):
+        self._waits[priority].append(seconds)
+        totals = self._wait_totals[priority]
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: LLMPriority = LLMPriority.BACKGROUND, timeout: Optional[float] = None):
+        """
+        Hold one rate-limited slot for model (for callers that talk to the
+        provider themselves, e.g. token streaming)
+        """
+        lane = self._lane(model)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(lane.acquire(priority), timeout)
+        except asyncio.TimeoutError:
+            self._count(model, "deadline_exceeded")
+            raise LLMDeadlineExceeded(f"{model} call waited more than {timeout:.1f}s for a slot")
+        waited = time.monotonic() - started
+        self._record_wait(priority, waited)
+        llm_metrics.observe_queue_wait(priority.name.lower(), waited)
+        try:
+            yield
+        finally:
+            lane.release()
+
+    async def complete(
+        self,
+        model: str,
+        prompt: str,
+        system_message: str,
+        priority: LLMPriority = LLMPriority.BACKGROUND,
+        feature: str = "other",
+        owner_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+        hedge_after: Optional[float] = None,
+        provider: str = "openai",
+        api_key: Optional[str] = None
+    ) -> str:
+        """
+        Send one prompt and return the response text
+        feature and owner_id label the call in llm_metrics (owner defaults
+        to the enclosing llm_owner block). deadline (seconds) covers queueing,
+        retries and hedges; raises LLMDeadlineExceeded when it passes, or the
+        provider's last error
+        """
+        default_deadline, default_hedge = PRIORITY_DEFAULTS[priority]
+        expires = time.monotonic() + (deadline or default_deadline)
+        hedge_after = default_hedge if hedge_after is None else hedge_after
+        session_id = session_id or f"{model}-{uuid.uuid4()}"
+        call = dict(provider=provider, model=model, system_message=system_message, prompt=prompt,
+                    priority=priority, api_key=api_key or EMERGENT_LLM_KEY,
+                    feature=feature, owner_id=owner_id, expires=expires)
+
+        attempt = 0
+        while True:
+            remaining = expires - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                # Fresh provider session per attempt so a retry never replays the failed message
+                attempt_session = f"{session_id}-retry{attempt}" if attempt else session_id
+                return await asyncio.wait_for(self._hedged(attempt_session, hedge_after, call), remaining)
+            except asyncio.TimeoutError:
+                self._count(model, "deadline_exceeded")
+                raise LLMDeadlineExceeded(f"{model} call exceeded its {deadline or default_deadline:.0f}s deadline")
+            except Exception:
+                self._count(model, "errors")
+                attempt += 1
+                backoff = LLM_RETRY_BACKOFF * 2 ** (attempt - 1)
+                if attempt >= LLM_MAX_ATTEMPTS or time.monotonic() + backoff >= expires:
+                    raise
+                self._count(model, "retries")
+                await asyncio.sleep(backoff)
+
+    async def _hedged(self, session_id: str, hedge_after: float, call: Dict[str, Any]) -> str:
+        """Run the call; if it is slow, race a duplicate and keep whichever answers first"""
+        first = asyncio.create_task(self._send(session_id, **call))
+        tasks = {first}
+        try:
+            if not hedge_after:
+                return await first
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                self._count(call["model"], "hedges")
+                tasks.add(asyncio.create_task(self._send(f"{session_id}-hedge", **call)))
+
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self._count(call["model"], "hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _send(self, session_id: str, provider: str, model: str, system_message: str, prompt: str,
+                    priority: LLMPriority, api_key: Optional[str], feature: str, owner_id: Optional[str],
+                    expires: float) -> str:
+        async with self.slot(model, priority):
+            self._count(model, "calls")
+            prompt_tokens = estimate_tokens(system_message, prompt)
+            started = time.monotonic()
+            try:
+                if self.provider is not None:
+                    response = await self.provider.complete(
+                        feature=feature, model=model, system_message=system_message, prompt=prompt,
+                        session_id=session_id, provider=provider, api_key=api_key
+                    )
+                else:
+                    response = await self._send_live(model, system_message, prompt, session_id, provider, api_key)
+            except asyncio.CancelledError:
+                # Deadline passed, or this was the losing side of a hedge
+                reason = "timeout" if time.monotonic() >= expires else "cancelled"
+                llm_metrics.observe(model, feature, prompt_tokens, 0, time.monotonic() - started, reason, owner_id)
+                raise
+            except Exception as e:
+                llm_metrics.observe(model, feature, prompt_tokens, 0, time.monotonic() - started, type(e).__name__, owner_id)
+                raise
+            llm_metrics.observe(model, feature, prompt_tokens, estimate_tokens(response), time.monotonic() - started, None, owner_id)
+            return response
+
+    async def _send_live(self, model: str, system_message: str, prompt: str, session_id: str,
+                         provider: str, api_key: Optional[str]) -> str:
+        chat = LlmChat(
+            api_key=api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model(provider, model)
+        return await chat.send_message(UserMessage(text=prompt))
+
+    def stats(self) -> Dict[str, Any]:
+        models = {}
+        for model, lane in self._lanes.items():
+            lane._refill()
+            models[model] = {
+                "in_flight": lane.in_flight,
+                "queued": lane.queued,
+                "tokens": round(lane.tokens, 2),
+                **self._counters.get(model, {})
+            }
+
+        queue_wait = {}
+        for priority in LLMPriority:
+            count, total, worst = self._wait_totals[priority]
+            recent = sorted(self._waits[priority])
+            queue_wait[priority.name.lower()] = {
+                "count": count,
+                "avg_ms": round(1000 * total / count, 1) if count else 0.0,
+                "p95_ms": round(1000 * recent[int(0.95 * (len(recent) - 1))], 1) if recent else 0.0,
+                "max_ms": round(1000 * worst, 1)
+            }
+        provider = type(self.provider).__name__ if self.provider is not None else "live"
+        return {"provider": provider, "models": models, "queue_wait": queue_wait}
+
+
+# Process-wide gateway shared by every service that calls an LLM
+llm_gateway = LLMGateway()
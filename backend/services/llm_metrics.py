@@ -0,0 +1,220 @@
+"""
+LLM call instrumentation
+Every provider call made by the gateway is recorded with its model, calling
+feature, token estimates, cost, latency and outcome. Totals are exposed as
+Prometheus text metrics and rolled up per owner per day in Mongo
+"""
+import os
+import json
+import asyncio
+import contextvars
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Tuple
+from pymongo import UpdateOne
+
+LLM_USAGE_FLUSH_INTERVAL = float(os.environ.get('LLM_USAGE_FLUSH_INTERVAL', '30'))  # Seconds between rollup writes
+
+# USD per 1M tokens (prompt, completion); LLM_PRICES overrides, e.g. {"gpt-4o": [2.5, 10]}
+DEFAULT_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60)
+}
+LLM_PRICES = {**DEFAULT_PRICES, **{model: tuple(price) for model, price in json.loads(os.environ.get('LLM_PRICES', '{}')).items()}}
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_owner: contextvars.ContextVar = contextvars.ContextVar("llm_owner", default=None)
+
+
+@contextmanager
+def llm_owner(owner_id: Optional[str]):
+    """Attribute LLM calls made inside the block (and tasks started in it) to owner_id"""
+    token = _owner.set(owner_id)
+    try:
+        yield
+    finally:
+        _owner.reset(token)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = LLM_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class _Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class LLMMetrics:
+    def __init__(self):
+        self.collection = None
+        self._counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+        self._histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+        self._pending: Dict[Tuple[str, str, str, str], Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._task: Optional[asyncio.Task] = None
+
+    def attach(self, db):
+        """Persist the daily rollup in Mongo (metrics stay process-local until attached)"""
+        self.collection = db["llm_usage_daily"]
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index([("owner_id", 1), ("day", -1)])
+
+    def observe(
+        self,
+        model: str,
+        feature: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: float,
+        error: Optional[str] = None,
+        owner_id: Optional[str] = None
+    ):
+        """Record one provider call; error is the failure reason (None on success)"""
+        labels = (("model", model), ("feature", feature))
+        self._counters[("llm_calls_total", labels + (("outcome", error or "ok"),))] += 1
+        self._histogram("llm_call_latency_seconds", labels).observe(latency)
+
+        cost = 0.0
+        if error is None:
+            cost = estimate_cost(model, prompt_tokens, completion_tokens)
+            self._counters[("llm_prompt_tokens_total", labels)] += prompt_tokens
+            self._counters[("llm_completion_tokens_total", labels)] += completion_tokens
+            self._counters[("llm_cost_usd_total", labels)] += cost
+
+        day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        row = self._pending[(owner_id or _owner.get() or "system", day, feature, model)]
+        row["calls"] += 1
+        row["latency_seconds"] += latency
+        if error is None:
+            row["prompt_tokens"] += prompt_tokens
+            row["completion_tokens"] += completion_tokens
+            row["cost_usd"] += cost
+        else:
+            row["errors"] += 1
+
+    def observe_queue_wait(self, priority: str, seconds: float):
+        self._histogram("llm_queue_wait_seconds", (("priority", priority),)).observe(seconds)
+
+    def _histogram(self, name: str, labels: Labels) -> _Histogram:
+        histogram = self._histograms.get((name, labels))
+        if histogram is None:
+            histogram = self._histograms[(name, labels)] = _Histogram()
+        return histogram
+
+    def start(self):
+        """Flush the rollup periodically (call from app startup)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(LLM_USAGE_FLUSH_INTERVAL)
+            await self.flush()
+
+    async def flush(self):
+        """Add pending per-owner totals to the daily rollup documents"""
+        if self.collection is None or not self._pending:
+            return
+        pending, self._pending = self._pending, defaultdict(lambda: defaultdict(float))
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"_id": f"{owner_id}:{day}:{feature}:{model}"},
+                {
+                    "$inc": dict(row),
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {"owner_id": owner_id, "day": day, "feature": feature, "model": model}
+                },
+                upsert=True
+            )
+            for (owner_id, day, feature, model), row in pending.items()
+        ]
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"LLM usage rollup error: {e}")
+            # Keep the totals for the next flush
+            for key, row in pending.items():
+                for field, value in row.items():
+                    self._pending[key][field] += value
+
+    async def get_rollup(self, owner_id: str, days: int = 30) -> List[Dict[str, Any]]:
+        """Daily usage rows for an owner, newest first"""
+        if self.collection is None:
+            return []
+        await self.flush()
+        since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        rows = await self.collection.find(
+            {"owner_id": owner_id, "day": {"$gte": since}},
+            {"_id": 0}
+        ).sort("day", -1).to_list(None)
+        return rows
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines: List[str] = []
+        described = set()
+
+        def describe(name: str, kind: str, help_text: str):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        helps = {
+            "llm_calls_total": "LLM provider calls by model, feature and outcome",
+            "llm_prompt_tokens_total": "Estimated prompt tokens sent",
+            "llm_completion_tokens_total": "Estimated completion tokens received",
+            "llm_cost_usd_total": "Estimated spend in USD",
+            "llm_call_latency_seconds": "LLM provider call latency",
+            "llm_queue_wait_seconds": "Time LLM calls waited in the gateway queue"
+        }
+        for (name, labels), value in sorted(self._counters.items()):
+            describe(name, "counter", helps[name])
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+            describe(name, "histogram", helps[name])
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:g}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+# Process-wide metrics for the LLM gateway, attached to Mongo at startup
+llm_metrics = LLMMetrics()
@@ -0,0 +1,227 @@
+"""
+Local LLM stand-ins for load tests and benchmarks
+Plugged into the gateway with LLM_PROVIDER:
+- record: call the real provider and save each response as a cassette
+- replay: answer from cassettes (keyed by model, system prompt and prompt hash)
+- synthetic: generate schema-valid responses per feature, no cassettes needed
+Stand-ins sleep for a configurable latency so throughput numbers stay realistic
+"""
+import os
+import re
+import json
+import math
+import random
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional, Callable, Awaitable
+from analyzer.llm_cache import make_key, prompt_version
+
+LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'live')  # live, record, replay or synthetic
+LLM_CASSETTE_DIR = os.environ.get('LLM_CASSETTE_DIR', str(Path(__file__).parent.parent / 'cassettes'))
+LLM_REPLAY_MISS = os.environ.get('LLM_REPLAY_MISS', 'synthetic')  # synthetic or error when no cassette matches
+LLM_REPLAY_SPEED = float(os.environ.get('LLM_REPLAY_SPEED', '1.0'))  # Scales recorded latency; 0 = instant
+
+# Latency specs: "fixed:0.8", "uniform:0.5:2", "normal:1.5:0.3", "lognormal:1.5:0.5" (median, sigma)
+LLM_STANDIN_LATENCY = os.environ.get('LLM_STANDIN_LATENCY', 'lognormal:1.0:0.5')
+# Per-feature overrides, e.g. {"analysis": "lognormal:12:0.4", "chatbot": "lognormal:1.2:0.3"}
+LLM_STANDIN_LATENCY_BY_FEATURE = json.loads(os.environ.get('LLM_STANDIN_LATENCY_BY_FEATURE', '{}'))
+
+# Live call: send(model=, system_message=, prompt=, session_id=, provider=, api_key=) -> response text
+SendFn = Callable[..., Awaitable[str]]
+
+
+def cassette_key(model: str, system_message: str, prompt: str) -> str:
+    return make_key(model, prompt_version(system_message), prompt)
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Sampler for a latency spec; raises ValueError on an unknown distribution"""
+    kind, *params = spec.split(':')
+    values = [float(p) for p in params]
+    if kind == 'fixed':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'normal':
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == 'lognormal':
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency distribution '{kind}'")
+
+
+def _rng(*parts: str) -> random.Random:
+    """Deterministic RNG per prompt so repeated runs synthesize the same output"""
+    seed = hashlib.sha256("\n".join(parts).encode('utf-8')).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+class CassetteStore:
+    """One JSON file per recorded call"""
+
+    def __init__(self, directory: str = LLM_CASSETTE_DIR):
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def load(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def save(self, key: str, cassette: Dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._path(key).write_text(json.dumps(cassette, indent=2), encoding='utf-8')
+
+
+class SyntheticProvider:
+    """Schema-valid responses for each feature, after a sampled latency"""
+
+    def __init__(self, latency: str = LLM_STANDIN_LATENCY, latency_by_feature: Optional[Dict[str, str]] = None):
+        self.default_latency = parse_latency(latency)
+        self.latency_by_feature = {
+            feature: parse_latency(spec)
+            for feature, spec in (latency_by_feature if latency_by_feature is not None else LLM_STANDIN_LATENCY_BY_FEATURE).items()
+        }
+
+    def latency(self, feature: str, rng: random.Random) -> float:
+        return self.latency_by_feature.get(feature, self.default_latency)(rng)
+
+    async def complete(self, feature: str, model: str, system_message: str, prompt: str, **call) -> str:
+        rng = _rng(model, system_message, prompt)
+        await asyncio.sleep(self.latency(feature, rng))
+        return self.respond(feature, prompt, rng)
+
+    def respond(self, feature: str, prompt: str, rng: random.Random) -> str:
+        if feature in ("analysis", "analysis_stream"):
+            return json.dumps(_synthetic_analysis(rng))
+        if feature == "job_mapping":
+            job_indexes = [int(n) for n in re.findall(r'^Job (\d+):', prompt, re.MULTILINE)]
+            if job_indexes:
+                return json.dumps([dict(_synthetic_mapping(rng), job=i) for i in job_indexes])
+            return json.dumps(_synthetic_mapping(rng))
+        if feature == "lead_score":
+            return rng.choice(["HOT", "WARM", "COLD"])
+        if feature == "lead_process":
+            return json.dumps({"score": rng.choice(["HOT", "WARM", "COLD"]), "autoresponse": _synthetic_text(rng)})
+        return _synthetic_text(rng)
+
+
+class ReplayProvider:
+    """Answer from recorded cassettes; unmatched prompts are synthesized or rejected"""
+
+    def __init__(self, store: Optional[CassetteStore] = None, on_miss: str = LLM_REPLAY_MISS,
+                 speed: float = LLM_REPLAY_SPEED, synthetic: Optional[SyntheticProvider] = None):
+        self.store = store or CassetteStore()
+        self.on_miss = on_miss
+        self.speed = speed
+        self.synthetic = synthetic or SyntheticProvider()
+        self.hits = 0
+        self.misses = 0
+
+    async def complete(self, feature: str, model: str, system_message: str, prompt: str, **call) -> str:
+        cassette = self.store.load(cassette_key(model, system_message, prompt))
+        if cassette is None:
+            self.misses += 1
+            if self.on_miss == 'error':
+                raise LookupError(f"No cassette for {feature} call to {model}")
+            return await self.synthetic.complete(feature, model, system_message, prompt)
+        self.hits += 1
+        await asyncio.sleep(cassette.get("latency", 0.0) * self.speed)
+        return cassette["response"]
+
+
+class RecordingProvider:
+    """Pass calls to the real provider and save each response as a cassette"""
+
+    def __init__(self, send: SendFn, store: Optional[CassetteStore] = None):
+        self.send = send
+        self.store = store or CassetteStore()
+
+    async def complete(self, feature: str, model: str, system_message: str, prompt: str, **call) -> str:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        response = await self.send(model=model, system_message=system_message, prompt=prompt, **call)
+        self.store.save(cassette_key(model, system_message, prompt), {
+            "feature": feature,
+            "model": model,
+            "prompt_sha256": hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+            "latency": round(loop.time() - started, 3),
+            "response": response
+        })
+        return response
+
+
+def _synthetic_analysis(rng: random.Random) -> Dict:
+    options = [
+        ("ai-chatbot", "24/7 AI Customer Support Agent", "agent"),
+        ("lead-capture", "Smart Lead Capture Forms", "lead_generation"),
+        ("appointment-scheduler", "Automated Appointment Booking", "booking"),
+        ("email-sequences", "Automated Email Marketing Sequences", "marketing"),
+        ("content-scheduler", "Social Media Content Scheduler", "social_media"),
+        ("analytics-dashboard", "Website Analytics & Insights", "analytics"),
+        ("webhook-automation", "Workflow Webhook Automation", "automation")
+    ]
+    picked = rng.sample(options, rng.randint(5, len(options)))
+    return {
+        "summary": "Synthetic analysis for load testing. The site has clear offers but few automated touchpoints.",
+        "strengths": ["Clear value proposition", "Simple navigation"],
+        "opportunities": ["Instant replies to visitors", "Automated follow-up"],
+        "recommendations": [
+            {
+                "key": key,
+                "title": title,
+                "description": f"{title} tailored to this website.",
+                "rationale": "Visitors currently have no automated way to get this done.",
+                "expected_impact": f"Save {rng.randint(3, 15)} hours per week.",
+                "category": category,
+                "priority": rng.choice(["high", "medium", "low"]),
+                "workflow_config": {
+                    "trigger_type": rng.choice(["webhook", "schedule", "manual"]),
+                    "actions": ["receive_input", "ai_generate_response", "notify_owner"],
+                    "estimated_setup_time": f"{rng.randint(5, 20)} minutes"
+                },
+                "estimated_value": f"${rng.randint(5, 50) * 100}/month"
+            }
+            for key, title, category in picked
+        ]
+    }
+
+
+def _synthetic_mapping(rng: random.Random) -> Dict:
+    agent, secondary = rng.sample(["AI Support Agent", "Lead Qualifier", "Booking Assistant", "Content Writer", "Data Analyst"], 2)
+    return {
+        "ai_agent": agent,
+        "secondary_agent": secondary,
+        "automation_potential": rng.randint(40, 95),
+        "classification": rng.choice(["Full Replacement", "Assistant", "Hybrid"]),
+        "automated_tasks": ["Answer routine requests", "Update records", "Schedule follow-ups"],
+        "explanation": "Synthetic mapping for load testing."
+    }
+
+
+def _synthetic_text(rng: random.Random) -> str:
+    sentences = [
+        "Thanks for reaching out to us.",
+        "We'd be happy to help with that.",
+        "Our team usually replies within one business day.",
+        "Here are a few details that should answer your question.",
+        "Let us know if there is anything else you need."
+    ]
+    return " ".join(rng.sample(sentences, rng.randint(2, len(sentences))))
+
+
+def build_provider(send: SendFn, mode: str = LLM_PROVIDER):
+    """Stand-in for LLM_PROVIDER, or None to call the live provider directly"""
+    if mode == 'record':
+        return RecordingProvider(send)
+    if mode == 'replay':
+        return ReplayProvider()
+    if mode == 'synthetic':
+        return SyntheticProvider()
+    if mode != 'live':
+        raise ValueError(f"Unknown LLM_PROVIDER '{mode}'")
+    return None
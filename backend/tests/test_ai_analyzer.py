@@ -0,0 +1,129 @@
+"""
+Unit tests for the AI website analyzer
+"""
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from analyzer import ai_analyzer
+from analyzer.llm_cache import LLMResultCache
+from analyzer.schema import WebsiteExtraction, BusinessType
+
+ANALYSIS_RESPONSE = json.dumps({
+    "summary": "A local bakery",
+    "strengths": ["Clear menu"],
+    "opportunities": ["Online orders"],
+    "recommendations": [{
+        "key": "ai-chatbot",
+        "title": "AI Support Agent",
+        "description": "Answers questions",
+        "rationale": "No live chat",
+        "expected_impact": "More orders",
+        "category": "agent",
+        "priority": "high"
+    }]
+})
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Fresh memory-only LLM cache"""
+    cache = LLMResultCache()
+    monkeypatch.setattr(ai_analyzer, "llm_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def extraction():
+    return WebsiteExtraction(url="https://bakery.com", title="Bakery", business_type=BusinessType.ECOMMERCE)
+
+
+@pytest.mark.asyncio
+async def test_identical_summary_served_from_cache(cache, extraction):
+    """Test a repeated analysis of identical content skips the LLM"""
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        send = mock_chat.return_value.with_model.return_value.send_message = AsyncMock(return_value=ANALYSIS_RESPONSE)
+        first = await ai_analyzer.analyze_website_for_automations(extraction)
+        second = await ai_analyzer.analyze_website_for_automations(extraction.model_copy())
+
+    assert send.await_count == 1
+    assert second == first
+    assert second.recommendations[0].key == "ai-chatbot"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["saved_tokens"] > 0
+
+
+@pytest.mark.asyncio
+async def test_changed_content_misses(cache, extraction):
+    """Test different website content is analyzed again"""
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        send = mock_chat.return_value.with_model.return_value.send_message = AsyncMock(return_value=ANALYSIS_RESPONSE)
+        await ai_analyzer.analyze_website_for_automations(extraction)
+        await ai_analyzer.analyze_website_for_automations(extraction.model_copy(update={"title": "Bakery & Cafe"}))
+
+    assert send.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_fallback_is_not_cached(cache, extraction):
+    """Test fallback recommendations from a failed call are not cached"""
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        mock_chat.return_value.with_model.return_value.send_message = AsyncMock(side_effect=Exception("API Error"))
+        result = await ai_analyzer.analyze_website_for_automations(extraction)
+
+    assert result.confidence_score == 0.7
+    assert cache.stats()["entries"] == 0
+
+
+async def collect(stream):
+    return [event async for event in stream]
+
+
+@pytest.mark.asyncio
+async def test_stream_emits_recommendations_as_they_complete(cache, extraction, monkeypatch):
+    """Test each recommendation is yielded before the LLM has finished writing"""
+    chunks = [ANALYSIS_RESPONSE[i:i + 7] for i in range(0, len(ANALYSIS_RESPONSE), 7)]
+    seen = []
+
+    async def fake_stream(model, system_message, prompt):
+        for chunk in chunks:
+            seen.append(chunk)
+            yield chunk
+
+    monkeypatch.setattr(ai_analyzer, "streaming_enabled", lambda: True)
+    monkeypatch.setattr(ai_analyzer, "stream_chat_completion", fake_stream)
+
+    received = []
+    async for event, data in ai_analyzer.stream_website_analysis(extraction):
+        received.append((event, len(seen)))
+        if event == "analysis":
+            analysis = data
+
+    names = [event for event, _ in received]
+    assert names == ["summary", "strengths", "opportunities", "recommendation", "analysis"]
+    assert received[0][1] < len(chunks)
+    assert analysis.recommendations[0].key == "ai-chatbot"
+    assert cache.stats()["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_replays_cached_analysis(cache, extraction):
+    """Test a cached analysis is streamed without calling the LLM"""
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        send = mock_chat.return_value.with_model.return_value.send_message = AsyncMock(return_value=ANALYSIS_RESPONSE)
+        await ai_analyzer.analyze_website_for_automations(extraction)
+        events = await collect(ai_analyzer.stream_website_analysis(extraction))
+
+    assert send.await_count == 1
+    assert [event for event, _ in events][-2:] == ["recommendation", "analysis"]
+
+
+@pytest.mark.asyncio
+async def test_stream_falls_back_on_llm_error(cache, extraction):
+    """Test an LLM failure streams the fallback recommendations"""
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        mock_chat.return_value.with_model.return_value.send_message = AsyncMock(side_effect=RuntimeError("down"))
+        events = await collect(ai_analyzer.stream_website_analysis(extraction))
+
+    analysis = events[-1][1]
+    assert analysis.confidence_score == 0.7
+    assert len([e for e, _ in events if e == "recommendation"]) == len(analysis.recommendations)
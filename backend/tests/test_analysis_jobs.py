@@ -0,0 +1,193 @@
+"""
+Unit tests for the analysis job queue
+"""
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import DuplicateKeyError
+from services.analysis_jobs import AnalysisJobService, ANALYSIS_JOB_MAX_ATTEMPTS
+
+
+@pytest.fixture
+def mock_db():
+    """Mock database with an analysis_jobs collection"""
+    collection = MagicMock()
+    collection.find_one = AsyncMock(return_value=None)
+    collection.insert_one = AsyncMock()
+    collection.update_one = AsyncMock()
+    collection.update_many = AsyncMock()
+    collection.find_one_and_update = AsyncMock(return_value=None)
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    return db
+
+
+def make_job(**fields):
+    job = {
+        "_id": "job-1",
+        "kind": "analyze",
+        "owner_id": "user-1",
+        "payload": {"url": "https://test.com"},
+        "status": "running",
+        "stage": None,
+        "stages": {},
+        "attempts": 1,
+        "result": None,
+        "error": None,
+        "created_at": datetime.now(timezone.utc),
+        "finished_at": None
+    }
+    job.update(fields)
+    return job
+
+
+@pytest.mark.asyncio
+async def test_submit_creates_pending_job(mock_db):
+    """Test a submitted job is stored as pending"""
+    service = AnalysisJobService(mock_db)
+
+    job, created = await service.submit("analyze", {"url": "https://test.com"}, owner_id="user-1")
+
+    assert created is True
+    assert job["status"] == "pending"
+    assert "idempotency_key" not in job
+    mock_db["analysis_jobs"].insert_one.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_returns_existing_job(mock_db):
+    """Test a repeated idempotency key returns the original job"""
+    existing = make_job(status="completed")
+    mock_db["analysis_jobs"].find_one = AsyncMock(return_value=existing)
+    service = AnalysisJobService(mock_db)
+
+    job, created = await service.submit("analyze", {"url": "https://test.com"}, owner_id="user-1", idempotency_key="abc")
+
+    assert created is False
+    assert job is existing
+    mock_db["analysis_jobs"].find_one.assert_awaited_with({"idempotency_key": "analyze:user-1:abc"})
+    mock_db["analysis_jobs"].insert_one.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_submit_returns_winner(mock_db):
+    """Test losing an insert race on the idempotency key returns the winner's job"""
+    winner = make_job(status="pending")
+    mock_db["analysis_jobs"].find_one = AsyncMock(side_effect=[None, winner])
+    mock_db["analysis_jobs"].insert_one = AsyncMock(side_effect=DuplicateKeyError("dup"))
+    service = AnalysisJobService(mock_db)
+
+    job, created = await service.submit("report", {"url": "https://test.com"}, idempotency_key="abc")
+
+    assert created is False
+    assert job is winner
+
+
+@pytest.mark.asyncio
+async def test_run_job_records_stages_and_result(mock_db):
+    """Test stages are stamped as the handler reports them and the result is saved"""
+    service = AnalysisJobService(mock_db)
+
+    async def handler(job, progress):
+        await progress("fetched")
+        await progress("analyzed")
+        return {"summary": "done"}
+    service.register("analyze", handler)
+
+    await service.run_job(make_job())
+
+    updates = [call.args[1]["$set"] for call in mock_db["analysis_jobs"].update_one.await_args_list]
+    assert updates[0]["stage"] == "fetched" and "stages.fetched" in updates[0]
+    assert updates[1]["stage"] == "analyzed"
+    assert updates[2]["status"] == "completed"
+    assert updates[2]["result"] == {"summary": "done"}
+
+
+@pytest.mark.asyncio
+async def test_run_job_records_failure(mock_db):
+    """Test a handler error on the last attempt marks the job failed with the message"""
+    service = AnalysisJobService(mock_db)
+
+    async def handler(job, progress):
+        raise RuntimeError("fetch failed")
+    service.register("analyze", handler)
+
+    await service.run_job(make_job(attempts=ANALYSIS_JOB_MAX_ATTEMPTS))
+
+    final = mock_db["analysis_jobs"].update_one.await_args.args[1]["$set"]
+    assert final["status"] == "failed"
+    assert final["error"] == "fetch failed"
+
+
+@pytest.mark.asyncio
+async def test_run_job_requeues_failed_attempt(mock_db):
+    """Test a handler error before the last attempt queues the job again with backoff"""
+    service = AnalysisJobService(mock_db)
+
+    async def handler(job, progress):
+        raise RuntimeError("connection reset")
+    service.register("analyze", handler)
+
+    await service.run_job(make_job(attempts=1))
+
+    claim, update = mock_db["analysis_jobs"].update_one.await_args.args
+    assert claim == {"_id": "job-1", "attempts": 1}
+    assert update["$set"]["status"] == "pending"
+    assert update["$set"]["next_run_at"] > datetime.now(timezone.utc)
+    assert "finished_at" not in update["$set"]
+
+
+@pytest.mark.asyncio
+async def test_progress_extends_lease(mock_db):
+    """Test each stage renews the job's lease"""
+    service = AnalysisJobService(mock_db)
+
+    async def handler(job, progress):
+        await progress("fetched")
+        return {}
+    service.register("analyze", handler)
+
+    await service.run_job(make_job())
+
+    stage_update = mock_db["analysis_jobs"].update_one.await_args_list[0].args[1]["$set"]
+    assert stage_update["lease_until"] > datetime.now(timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_workers_pick_up_submitted_jobs(mock_db):
+    """Test a started worker claims and runs a queued job"""
+    claimed = make_job()
+    mock_db["analysis_jobs"].find_one_and_update = AsyncMock(side_effect=[claimed] + [None] * 100)
+    service = AnalysisJobService(mock_db, workers=1)
+    done = asyncio.Event()
+
+    async def handler(job, progress):
+        done.set()
+        return {}
+    service.register("analyze", handler)
+
+    service.start()
+    try:
+        await asyncio.wait_for(done.wait(), timeout=1)
+    finally:
+        await service.stop()
+
+    claim_filter = mock_db["analysis_jobs"].find_one_and_update.await_args_list[0].args[0]
+    pending = next(clause for clause in claim_filter["$or"] if clause["status"] == "pending")
+    assert "$gt" in pending["next_run_at"]["$not"]  # Only jobs whose retry backoff has passed
+    claim_update = mock_db["analysis_jobs"].find_one_and_update.await_args_list[0].args[1]["$set"]
+    assert claim_update["stages"] == {} and claim_update["stage"] is None
+
+
+def test_serialize_reports_progress():
+    """Test the polling view shows completed stages and percent progress"""
+    now = datetime.now(timezone.utc)
+    job = make_job(stage="analyzed", stages={"fetched": now, "analyzed": now})
+
+    view = AnalysisJobService.serialize(job)
+
+    assert view["job_id"] == "job-1"
+    assert list(view["stages"]) == ["fetched", "analyzed"]
+    assert view["progress"] == 50
+    assert view["finished_at"] is None
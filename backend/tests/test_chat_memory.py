@@ -0,0 +1,151 @@
+"""
+Unit tests for chatbot conversation memory
+"""
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from services.chat_memory import ChatMemory
+
+START = datetime(2026, 1, 1, 10, 0, tzinfo=timezone.utc)
+
+
+def make_messages(count, words=10):
+    return [
+        {
+            "_id": f"m{i}",
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"message {i} " + "word " * words,
+            "timestamp": START + timedelta(minutes=i)
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def mock_db():
+    """Mock database with a session and its messages"""
+    collections = {"chatbot_sessions": MagicMock(), "chatbot_messages": MagicMock()}
+    collections["chatbot_sessions"].find_one = AsyncMock(return_value=None)
+    collections["chatbot_sessions"].update_one = AsyncMock()
+    db = MagicMock()
+    db.__getitem__.side_effect = lambda name: collections[name]
+    return db
+
+
+def set_messages(db, messages):
+    db["chatbot_messages"].find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(
+        return_value=list(reversed(messages))
+    )
+
+
+@pytest.mark.asyncio
+async def test_window_respects_token_budget(mock_db):
+    """Test only the newest messages that fit the budget are kept, the rest overflow"""
+    set_messages(mock_db, make_messages(10))
+    memory = await ChatMemory(token_budget=45).load(mock_db, "s1")
+
+    assert [message["_id"] for message in memory["window"]] == ["m7", "m8", "m9"]
+    assert [message["_id"] for message in memory["overflow"]] == [f"m{i}" for i in range(7)]
+
+
+class MessageCursor:
+    """chatbot_messages cursor honouring the timestamp filter, sort and limit"""
+
+    def __init__(self, messages, query):
+        after = query.get("timestamp", {}).get("$gt")
+        self.messages = [m for m in messages if after is None or m["timestamp"] > after]
+
+    def sort(self, field, direction):
+        self.messages = sorted(self.messages, key=lambda m: m[field], reverse=direction == -1)
+        return self
+
+    def limit(self, count):
+        self.messages = self.messages[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return self.messages
+
+
+@pytest.mark.asyncio
+async def test_messages_beyond_the_fetch_are_overflow(mock_db):
+    """Test unsummarized messages older than the recent page still overflow, oldest first"""
+    messages = make_messages(50)
+    mock_db["chatbot_messages"].find = MagicMock(side_effect=lambda query: MessageCursor(messages, query))
+    memory = await ChatMemory(token_budget=1000, fetch=40).load(mock_db, "s1")
+
+    assert [message["_id"] for message in memory["window"]] == [f"m{i}" for i in range(10, 50)]
+    assert [message["_id"] for message in memory["overflow"]] == [f"m{i}" for i in range(10)]
+
+    mock_db["chatbot_sessions"].find_one = AsyncMock(return_value={
+        "_id": "s1", "summary": "Earlier chat.", "summary_through": (START + timedelta(minutes=4)).replace(tzinfo=None)
+    })
+    memory = await ChatMemory(token_budget=1000, fetch=40).load(mock_db, "s1")
+
+    assert [message["_id"] for message in memory["overflow"]] == [f"m{i}" for i in range(5, 10)]
+
+
+@pytest.mark.asyncio
+async def test_summarized_messages_are_skipped(mock_db):
+    """Test messages already folded into the summary are not repeated"""
+    set_messages(mock_db, make_messages(6))
+    mock_db["chatbot_sessions"].find_one = AsyncMock(return_value={
+        "_id": "s1", "summary": "Visitor asked about pricing.", "summary_through": (START + timedelta(minutes=3)).replace(tzinfo=None)
+    })
+    memory = await ChatMemory(token_budget=1000).load(mock_db, "s1")
+
+    assert memory["summary"] == "Visitor asked about pricing."
+    assert [message["_id"] for message in memory["window"]] == ["m4", "m5"]
+    assert memory["overflow"] == []
+
+
+def test_build_prompt():
+    """Test the prompt is the bare message without memory, and summary then transcript with it"""
+    assert ChatMemory.build_prompt({"summary": "", "window": [], "overflow": []}, "Hello") == "Hello"
+
+    prompt = ChatMemory.build_prompt({
+        "summary": "Visitor is Ana.",
+        "window": [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello Ana"}],
+        "overflow": []
+    }, "Pricing?")
+    assert prompt == (
+        "Conversation summary so far:\nVisitor is Ana.\n\n"
+        "Recent conversation:\nUser: Hi\nAssistant: Hello Ana\n\n"
+        "User: Pricing?"
+    )
+
+
+@pytest.mark.asyncio
+async def test_overflow_is_summarized(mock_db):
+    """Test enough overflow refreshes the stored summary in the background"""
+    set_messages(mock_db, make_messages(10))
+    memory_service = ChatMemory(token_budget=45, summary_trigger=20)
+    memory = await memory_service.load(mock_db, "s1")
+
+    with patch('services.chat_memory.llm_gateway.complete', new=AsyncMock(return_value=" Visitor wants a demo. ")) as complete:
+        memory_service.maybe_summarize(mock_db, "s1", memory, "owner-1")
+        memory_service.maybe_summarize(mock_db, "s1", memory, "owner-1")
+        await memory_service.stop()
+
+    assert complete.await_count == 1
+    assert complete.await_args.kwargs["feature"] == "chat_summary"
+    update = mock_db["chatbot_sessions"].update_one.await_args.args[1]["$set"]
+    assert update["summary"] == "Visitor wants a demo."
+    assert update["summary_through"] == memory["overflow"][-1]["timestamp"]
+    assert memory_service.stats()["summaries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_small_overflow_is_not_summarized(mock_db):
+    """Test overflow under the trigger leaves the summary alone"""
+    set_messages(mock_db, make_messages(10))
+    memory_service = ChatMemory(token_budget=45, summary_trigger=10000)
+    memory = await memory_service.load(mock_db, "s1")
+
+    with patch('services.chat_memory.llm_gateway.complete', new=AsyncMock()) as complete:
+        memory_service.maybe_summarize(mock_db, "s1", memory, "owner-1")
+        await asyncio.sleep(0)
+
+    complete.assert_not_awaited()
+    mock_db["chatbot_sessions"].update_one.assert_not_awaited()
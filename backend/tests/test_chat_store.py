@@ -0,0 +1,360 @@
+"""
+Unit tests for chat persistence
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import BulkWriteError
+from services.chat_store import ChatStore
+
+
+@pytest.fixture
+def mock_db():
+    """Mock database with chat collections"""
+    collections = {"chatbot_messages": MagicMock(), "chatbot_sessions": MagicMock()}
+    for collection in collections.values():
+        collection.bulk_write = AsyncMock()
+    db = MagicMock()
+    db.__getitem__.side_effect = lambda name: collections[name]
+    return db
+
+
+def make_turn(session_id, offset=0):
+    at = datetime.now(timezone.utc) + timedelta(seconds=offset)
+    return [
+        {"_id": f"{session_id}-u{offset}", "session_id": session_id, "role": "user", "content": "Hi", "timestamp": at},
+        {"_id": f"{session_id}-a{offset}", "session_id": session_id, "role": "assistant", "content": "Hello", "timestamp": at}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_turn_is_written_directly(mock_db):
+    """Test a turn without write-behind is one messages bulk_write and one session upsert"""
+    store = ChatStore(write_behind=False)
+
+    await store.save_turn(mock_db, "site-1", "s1", make_turn("s1"), messages_added=2)
+
+    assert len(mock_db["chatbot_messages"].bulk_write.await_args.args[0]) == 2
+    (session_op,) = mock_db["chatbot_sessions"].bulk_write.await_args.args[0]
+    assert session_op._upsert is True
+    assert session_op._doc["$inc"] == {"messages_count": 2}
+    assert session_op._doc["$setOnInsert"]["website_id"] == "site-1"
+
+
+@pytest.mark.asyncio
+async def test_write_behind_coalesces_turns(mock_db):
+    """Test buffered turns flush as one write per collection with sessions merged"""
+    store = ChatStore(write_behind=True, flush_interval=60)
+    store.attach(mock_db)
+    store.start()
+
+    await store.save_turn(mock_db, "site-1", "s1", make_turn("s1", 0), messages_added=2)
+    await store.save_turn(mock_db, "site-1", "s1", make_turn("s1", 1), messages_added=2)
+    await store.save_turn(mock_db, "site-1", "s2", make_turn("s2", 2), messages_added=2)
+    mock_db["chatbot_messages"].bulk_write.assert_not_awaited()
+
+    await store.stop()
+
+    assert mock_db["chatbot_messages"].bulk_write.await_count == 1
+    assert len(mock_db["chatbot_messages"].bulk_write.await_args.args[0]) == 6
+    session_ops = {op._filter["_id"]: op._doc for op in mock_db["chatbot_sessions"].bulk_write.await_args.args[0]}
+    assert session_ops["s1"]["$inc"] == {"messages_count": 4}
+    assert session_ops["s2"]["$inc"] == {"messages_count": 2}
+
+
+@pytest.mark.asyncio
+async def test_full_queue_writes_directly(mock_db):
+    """Test a full buffer applies back-pressure by writing the turn directly"""
+    store = ChatStore(write_behind=True, queue_size=1, flush_interval=60)
+    store.attach(mock_db)
+    store.start()
+
+    await store.save_turn(mock_db, "site-1", "s1", make_turn("s1", 0), messages_added=2)
+    await store.save_turn(mock_db, "site-1", "s1", make_turn("s1", 1), messages_added=2)
+
+    assert store.stats()["direct"] == 1
+    assert mock_db["chatbot_messages"].bulk_write.await_count == 1
+    await store.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_retried(mock_db):
+    """Test a failed flush keeps its turns for the next one"""
+    store = ChatStore(write_behind=True, flush_interval=60)
+    store.attach(mock_db)
+    store.start()
+    mock_db["chatbot_sessions"].bulk_write = AsyncMock(side_effect=[RuntimeError("down"), None])
+
+    await store.save_turn(mock_db, "site-1", "s1", make_turn("s1"), messages_added=2)
+
+    assert await store.flush() is False
+    assert await store.flush() is True
+    assert store.stats()["dropped"] == 0
+    await store.stop()
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_written_after_messages(mock_db):
+    """Test a failed messages write leaves sessions alone, and a retry bumps them once"""
+    store = ChatStore(write_behind=True, flush_interval=60)
+    store.attach(mock_db)
+    store.start()
+    mock_db["chatbot_messages"].bulk_write = AsyncMock(side_effect=[RuntimeError("down"), None])
+
+    await store.save_turn(mock_db, "site-1", "s1", make_turn("s1"), messages_added=2)
+
+    assert await store.flush() is False
+    mock_db["chatbot_sessions"].bulk_write.assert_not_awaited()
+    assert await store.flush() is True
+    mock_db["chatbot_sessions"].bulk_write.assert_awaited_once()
+    await store.stop()
+
+
+@pytest.mark.asyncio
+async def test_retry_skips_parts_already_written(mock_db):
+    """Test a retry after a partial session failure only redoes the failed session"""
+    store = ChatStore(write_behind=True, flush_interval=60)
+    store.attach(mock_db)
+    store.start()
+    mock_db["chatbot_sessions"].bulk_write = AsyncMock(side_effect=[
+        BulkWriteError({"writeErrors": [{"index": 1, "code": 1, "errmsg": "timeout"}]}),
+        None
+    ])
+
+    await store.save_turn(mock_db, "site-1", "s1", make_turn("s1", 0), messages_added=2)
+    await store.save_turn(mock_db, "site-1", "s2", make_turn("s2", 1), messages_added=2)
+
+    assert await store.flush() is False
+    assert await store.flush() is True
+    assert mock_db["chatbot_messages"].bulk_write.await_count == 1
+    (retried,) = mock_db["chatbot_sessions"].bulk_write.await_args.args[0]
+    assert retried._filter == {"_id": "s2"}
+    await store.stop()
+
+
+@pytest.mark.asyncio
+async def test_duplicate_messages_are_ignored(mock_db):
+    """Test messages already inserted by an earlier attempt don't fail the write"""
+    store = ChatStore(write_behind=False)
+    mock_db["chatbot_messages"].bulk_write = AsyncMock(
+        side_effect=BulkWriteError({"writeErrors": [{"code": 11000, "errmsg": "duplicate key"}]})
+    )
+
+    await store.save_turn(mock_db, "site-1", "s1", make_turn("s1"), messages_added=2)
+
+    mock_db["chatbot_sessions"].bulk_write.assert_awaited_once()
+
+
+class AsyncCursor:
+    """Minimal async-iterable cursor"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.mark.asyncio
+async def test_bucket_storage_appends_turns(mock_db):
+    """Test bucket mode appends a turn to a session bucket with room for it"""
+    transcripts = MagicMock()
+    transcripts.bulk_write = AsyncMock()
+    collections = {"chat_transcripts": transcripts, "chatbot_sessions": mock_db["chatbot_sessions"]}
+    mock_db.__getitem__.side_effect = lambda name: collections[name]
+    store = ChatStore(write_behind=False, storage="buckets", bucket_turns=25)
+
+    await store.save_turn(mock_db, "site-1", "s1", make_turn("s1"), messages_added=2)
+
+    close_op, bucket_op = transcripts.bulk_write.await_args.args[0]
+    assert close_op._filter == {"session_id": "s1", "open": True, "turns": {"$gt": 24}}
+    assert close_op._doc == {"$set": {"open": False}}
+    assert bucket_op._filter == {"session_id": "s1", "open": True}
+    assert bucket_op._upsert is True
+    assert bucket_op._doc["$inc"] == {"turns": 1, "message_count": 2}
+    assert [m["role"] for m in bucket_op._doc["$push"]["messages"]["$each"]] == ["user", "assistant"]
+    assert "session_id" not in bucket_op._doc["$push"]["messages"]["$each"][0]
+
+
+@pytest.mark.asyncio
+async def test_bucket_retry_does_not_append_twice(mock_db):
+    """Test turns already pushed by a failed attempt are not appended again"""
+    turns = {"s1": make_turn("s1", 0), "s2": make_turn("s2", 1)}
+    transcripts = MagicMock()
+    transcripts.bulk_write = AsyncMock(side_effect=[RuntimeError("down"), None])
+    transcripts.find = MagicMock(return_value=AsyncCursor([{"messages": [{"_id": m["_id"]} for m in turns["s1"]]}]))
+    collections = {"chat_transcripts": transcripts, "chatbot_sessions": mock_db["chatbot_sessions"]}
+    mock_db.__getitem__.side_effect = lambda name: collections[name]
+    store = ChatStore(write_behind=True, flush_interval=60, storage="buckets")
+    store.attach(mock_db)
+    store.start()
+
+    for session_id, turn in turns.items():
+        await store.save_turn(mock_db, "site-1", session_id, turn, messages_added=2)
+
+    assert await store.flush() is False
+    assert await store.flush() is True
+    retried = transcripts.bulk_write.await_args.args[0]
+    assert {op._filter["session_id"] for op in retried} == {"s2"}
+    assert transcripts.find.call_args.args[0]["messages._id"] == {"$in": ["s1-u0", "s2-u1"]}
+    await store.stop()
+
+
+def test_bucket_ops_split_large_batches():
+    """Test more buffered turns than a bucket holds are split into ordered appends"""
+    store = ChatStore(write_behind=False, storage="buckets", bucket_turns=2)
+    turns = [
+        {"website_id": "site-1", "session_id": "s1", "messages": make_turn("s1", i), "messages_added": 2, "at": None}
+        for i in range(5)
+    ]
+
+    operations = store._bucket_ops(turns)
+
+    appends = operations[1::2]
+    assert [op._doc["$inc"]["turns"] for op in appends] == [2, 2, 1]
+    assert operations[4]._filter["turns"] == {"$gt": 1}
+
+
+class FakeTranscripts:
+    """In-memory chat_transcripts applying the bucket append operations"""
+
+    def __init__(self):
+        self.buckets = []
+
+    def _matches(self, bucket, query):
+        for key, condition in query.items():
+            value = bucket.get(key)
+            if isinstance(condition, dict):
+                if "$gt" in condition and not (value is not None and value > condition["$gt"]):
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    async def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            matched = [bucket for bucket in self.buckets if self._matches(bucket, op._filter)]
+            if not op._doc.get("$push"):  # Closing full buckets
+                for bucket in matched:
+                    bucket.update(op._doc["$set"])
+                continue
+            if matched:
+                bucket = matched[0]
+            else:
+                bucket = {**op._filter, **op._doc["$setOnInsert"], "messages": [], "turns": 0, "message_count": 0}
+                self.buckets.append(bucket)
+            bucket["messages"].extend(op._doc["$push"]["messages"]["$each"])
+            for key, amount in op._doc["$inc"].items():
+                bucket[key] += amount
+            bucket["first_at"] = min(bucket.get("first_at", op._doc["$min"]["first_at"]), op._doc["$min"]["first_at"])
+            bucket["last_at"] = max(bucket.get("last_at", op._doc["$max"]["last_at"]), op._doc["$max"]["last_at"])
+
+    def find(self, query):
+        matched = [bucket for bucket in self.buckets if self._matches(bucket, query)]
+        return AsyncCursor(sorted(matched, key=lambda bucket: bucket["first_at"], reverse=True))
+
+
+@pytest.mark.asyncio
+async def test_buckets_fill_in_order_across_flushes(mock_db, monkeypatch):
+    """Test later turns never go back to an older bucket, so recent reads see the newest messages"""
+    monkeypatch.setattr("services.chat_store.CHAT_READ_LEGACY", False)
+    transcripts = FakeTranscripts()
+    collections = {"chat_transcripts": transcripts, "chatbot_sessions": mock_db["chatbot_sessions"]}
+    mock_db.__getitem__.side_effect = lambda name: collections[name]
+    store = ChatStore(write_behind=True, flush_interval=60, storage="buckets", bucket_turns=3)
+    store.attach(mock_db)
+    store.start()
+
+    offset = 0
+    for flush_size in (2, 2, 1, 3, 1):  # The 1-turn flushes would fit an older, non-full bucket
+        for _ in range(flush_size):
+            await store.save_turn(mock_db, "site-1", "s1", make_turn("s1", offset), messages_added=2)
+            offset += 1
+        assert await store.flush() is True
+    await store.stop()
+
+    first_offsets = [int(bucket["messages"][0]["_id"][len("s1-u"):]) for bucket in transcripts.buckets]
+    assert first_offsets == sorted(first_offsets)
+    assert [bucket["open"] for bucket in transcripts.buckets] == [False] * (len(transcripts.buckets) - 1) + [True]
+    recent = await store.get_recent_messages(mock_db, "s1", limit=4)
+    assert [m["_id"] for m in recent] == ["s1-u7", "s1-a7", "s1-u8", "s1-a8"]
+
+
+@pytest.mark.asyncio
+async def test_bucket_history_merges_unmigrated_messages():
+    """Test history merges buckets with unmigrated messages, without duplicates, oldest first"""
+    store = ChatStore(write_behind=False, storage="buckets")
+    bucketed = make_turn("s1", 10)
+    legacy = make_turn("s1", 0) + [{**bucketed[0], "website_id": "site-1"}]
+    transcripts = MagicMock()
+    transcripts.find = MagicMock(return_value=AsyncCursor([{"website_id": "site-1", "messages": bucketed}]))
+    messages = MagicMock()
+    messages.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=legacy)
+    db = MagicMock()
+    db.__getitem__.side_effect = lambda name: {"chat_transcripts": transcripts, "chatbot_messages": messages}[name]
+
+    history = await store.get_session_messages(db, "s1", limit=50)
+    assert [m["_id"] for m in history] == ["s1-u0", "s1-a0", "s1-u10", "s1-a10"]
+    assert history[2]["session_id"] == "s1"
+
+    transcripts.find = MagicMock(return_value=AsyncCursor([]))
+    assert [m["_id"] for m in await store.get_session_messages(db, "s1", limit=50)] == ["s1-u0", "s1-a0", "s1-u10"]
+
+
+@pytest.mark.asyncio
+async def test_bucket_recent_messages_include_unmigrated_messages():
+    """Test memory for a session spanning the storage switch sees its earlier messages"""
+    store = ChatStore(write_behind=False, storage="buckets")
+    transcripts = MagicMock()
+    transcripts.find = MagicMock(return_value=AsyncCursor([{"website_id": "site-1", "messages": make_turn("s1", 10)}]))
+    messages = MagicMock()
+    messages.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=make_turn("s1", 0)[::-1])
+    db = MagicMock()
+    db.__getitem__.side_effect = lambda name: {"chat_transcripts": transcripts, "chatbot_messages": messages}[name]
+
+    recent = await store.get_recent_messages(db, "s1", limit=3)
+
+    assert [m["_id"] for m in recent] == ["s1-a0", "s1-u10", "s1-a10"]
+
+
+def test_migration_packs_turns_into_buckets():
+    """Test the migration groups messages into turns and turns into buckets"""
+    from jobs.migrate_chat_buckets import build_buckets
+    messages = [dict(m, website_id="site-1") for i in range(3) for m in make_turn("s1", i)]
+
+    buckets = build_buckets("s1", messages, bucket_turns=2)
+
+    assert [b["turns"] for b in buckets] == [2, 1]
+    assert [b["message_count"] for b in buckets] == [4, 2]
+    assert buckets[0]["_id"] == "s1:s1-u0"
+    assert buckets[0]["website_id"] == "site-1"
+    assert "website_id" not in buckets[0]["messages"][0]
+
+
+@pytest.mark.asyncio
+async def test_recent_messages_include_buffered_turns(mock_db):
+    """Test recent messages merge stored messages with turns still waiting to flush"""
+    store = ChatStore(write_behind=True, flush_interval=60)
+    store.attach(mock_db)
+    store.start()
+    stored = make_turn("s1", 0)
+    mock_db["chatbot_messages"].find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(
+        return_value=list(reversed(stored))
+    )
+
+    await store.save_turn(mock_db, "site-1", "s1", make_turn("s1", 5), messages_added=2)
+    recent = await store.get_recent_messages(mock_db, "s1", limit=3)
+
+    assert [message["_id"] for message in recent] == ["s1-a0", "s1-u5", "s1-a5"]
+    await store.stop()
+    assert "s1" not in store._unwritten
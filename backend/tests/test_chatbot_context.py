@@ -0,0 +1,100 @@
+"""
+Unit tests for the chatbot context cache
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from services.chatbot_context import ChatbotContextCache
+
+
+@pytest.fixture
+def mock_db():
+    """Mock database with websites and active_automations collections"""
+    collections = {"websites": MagicMock(), "active_automations": MagicMock()}
+    collections["websites"].find_one = AsyncMock(return_value={
+        "_id": "test-website-1", "title": "Test Company", "url": "https://test.com", "owner_id": "user-1"
+    })
+    collections["active_automations"].find_one = AsyncMock(return_value={"_id": "auto-1"})
+    db = MagicMock()
+    db.__getitem__.side_effect = lambda name: collections[name]
+    return db
+
+
+@pytest.mark.asyncio
+async def test_context_is_cached(mock_db):
+    """Test repeated lookups for a website hit Mongo once"""
+    cache = ChatbotContextCache()
+
+    first = await cache.get(mock_db, "test-website-1")
+    second = await cache.get(mock_db, "test-website-1")
+
+    assert first is second
+    assert first["owner_id"] == "user-1"
+    assert first["active"] is True
+    assert "Test Company" in first["system_prompt"]
+    assert mock_db["websites"].find_one.await_count == 1
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_inactive_and_missing_websites(mock_db):
+    """Test an inactive chatbot is flagged and a missing website returns None"""
+    mock_db["active_automations"].find_one = AsyncMock(return_value=None)
+    cache = ChatbotContextCache()
+
+    assert (await cache.get(mock_db, "test-website-1"))["active"] is False
+
+    mock_db["websites"].find_one = AsyncMock(return_value=None)
+    assert await cache.get(mock_db, "missing") is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_reloads(mock_db):
+    """Test invalidating a website makes the next lookup reload it"""
+    cache = ChatbotContextCache()
+    await cache.get(mock_db, "test-website-1")
+
+    mock_db["active_automations"].find_one = AsyncMock(return_value=None)
+    cache.invalidate("test-website-1")
+
+    assert (await cache.get(mock_db, "test-website-1"))["active"] is False
+    assert cache.stats()["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_and_are_bounded(mock_db):
+    """Test entries expire after the TTL and the oldest is evicted past the limit"""
+    cache = ChatbotContextCache(ttl=0.05, max_entries=2)
+    for website_id in ("a", "b", "c"):
+        await cache.get(mock_db, website_id)
+    assert cache.stats()["entries"] == 2
+
+    await asyncio.sleep(0.06)
+    await cache.get(mock_db, "c")
+    assert mock_db["websites"].find_one.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once(mock_db):
+    """Test simultaneous lookups for an uncached website share one load"""
+    cache = ChatbotContextCache()
+
+    results = await asyncio.gather(*[cache.get(mock_db, "test-website-1") for _ in range(5)])
+
+    assert all(result is results[0] for result in results)
+    assert mock_db["websites"].find_one.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_is_not_cached(mock_db):
+    """Test a context loaded across an invalidation isn't kept"""
+    cache = ChatbotContextCache()
+
+    async def slow_find(*args):
+        cache.invalidate("test-website-1")
+        return {"_id": "test-website-1", "owner_id": "user-1"}
+    mock_db["websites"].find_one = AsyncMock(side_effect=slow_find)
+
+    await cache.get(mock_db, "test-website-1")
+
+    assert cache.stats()["entries"] == 0
@@ -1,22 +1,38 @@
 """
 Unit tests for chatbot service
 """
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime, timezone
-from services.chatbot_service import process_chatbot_message, get_chatbot_history
+from services import chatbot_service
+from services.chatbot_service import process_chatbot_message, stream_chatbot_message, get_chatbot_history
+from services.chatbot_context import chatbot_context_cache
 
 
 @pytest.fixture
 def mock_db():
     """Mock database"""
+    collections = {
+        "chatbot_messages": AsyncMock(),
+        "chatbot_sessions": AsyncMock(),
+        "websites": AsyncMock(),
+        "active_automations": AsyncMock()
+    }
+    collections["chatbot_sessions"].find_one = AsyncMock(return_value=None)
+    collections["chatbot_messages"].find = MagicMock()
+    collections["chatbot_messages"].find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=[])
     db = MagicMock()
-    db["chatbot_messages"] = AsyncMock()
-    db["chatbot_sessions"] = AsyncMock()
-    db["websites"] = AsyncMock()
+    db.__getitem__.side_effect = lambda name: collections[name]
     return db
 
 
+@pytest.fixture(autouse=True)
+def clear_context_cache():
+    """Start each test with no cached website context"""
+    chatbot_context_cache.clear()
+
+
 @pytest.fixture
 def sample_website():
     """Sample website data"""
@@ -44,7 +60,7 @@ async def test_process_chatbot_message_success(mock_db, sample_website):
     mock_db["chatbot_sessions"].update_one = AsyncMock()
     
     # Mock AI response
-    with patch('services.chatbot_service.LlmChat') as mock_chat:
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
         mock_chat_instance = AsyncMock()
         mock_chat_instance.send_message = AsyncMock(return_value="Hello! How can I help you?")
         mock_chat.return_value.with_model.return_value = mock_chat_instance
@@ -91,7 +107,7 @@ async def test_process_chatbot_message_ai_error(mock_db, sample_website):
     mock_db["chatbot_messages"].find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=[])
     
     # Mock AI failure
-    with patch('services.chatbot_service.LlmChat') as mock_chat:
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
         mock_chat.return_value.with_model.return_value.send_message = AsyncMock(side_effect=Exception("API Error"))
         
         result = await process_chatbot_message(
@@ -144,3 +160,119 @@ async def test_process_chatbot_message_user_only(mock_db, sample_website):
     
     assert "message_id" in result
     assert "response" not in result
+
+
+@pytest.mark.asyncio
+async def test_process_chatbot_message_reuses_context(mock_db, sample_website):
+    """Test later messages skip the website lookup and each turn is one write per collection"""
+    mock_db["websites"].find_one = AsyncMock(return_value=sample_website)
+
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        mock_chat.return_value.with_model.return_value.send_message = AsyncMock(return_value="Hi!")
+        for _ in range(2):
+            await process_chatbot_message(db=mock_db, website_id="test-website-1", session_id="s1", message="Hello")
+
+    assert mock_db["websites"].find_one.await_count == 1
+    assert mock_db["chatbot_messages"].bulk_write.await_count == 2
+    assert mock_db["chatbot_sessions"].bulk_write.await_count == 2
+    mock_db["chatbot_messages"].insert_one.assert_not_awaited()
+    messages = mock_db["chatbot_messages"].bulk_write.await_args.args[0]
+    assert [op._doc["role"] for op in messages] == ["user", "assistant"]
+    sessions = [call.kwargs["session_id"] for call in mock_chat.call_args_list]
+    assert len(set(sessions)) == 2  # No provider-side history; memory comes from chat_memory
+
+
+@pytest.mark.asyncio
+async def test_process_chatbot_message_includes_memory(mock_db, sample_website):
+    """Test the prompt carries the session summary and recent messages"""
+    mock_db["websites"].find_one = AsyncMock(return_value=sample_website)
+    mock_db["chatbot_sessions"].find_one = AsyncMock(return_value={"_id": "s1", "summary": "Visitor Ana wants a quote."})
+    mock_db["chatbot_messages"].find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=[
+        {"_id": "m2", "role": "assistant", "content": "Sure, for how many users?", "timestamp": datetime(2026, 1, 1, 10, 1)},
+        {"_id": "m1", "role": "user", "content": "Can I get pricing?", "timestamp": datetime(2026, 1, 1, 10, 0)}
+    ])
+
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        send = mock_chat.return_value.with_model.return_value.send_message = AsyncMock(return_value="Great!")
+        await process_chatbot_message(db=mock_db, website_id="test-website-1", session_id="s1", message="About 20")
+
+    prompt = send.await_args.args[0].text
+    assert "Visitor Ana wants a quote." in prompt
+    assert prompt.index("User: Can I get pricing?") < prompt.index("Assistant: Sure, for how many users?")
+    assert prompt.endswith("User: About 20")
+
+
+@pytest.mark.asyncio
+async def test_stream_chatbot_message_yields_tokens_then_saves(mock_db, sample_website, monkeypatch):
+    """Test streamed tokens arrive before the turn is saved with the joined reply"""
+    mock_db["websites"].find_one = AsyncMock(return_value=sample_website)
+
+    async def fake_stream(model, system_message, prompt):
+        for delta in ["Hi", " there", "!"]:
+            yield delta
+
+    monkeypatch.setattr(chatbot_service, "streaming_enabled", lambda: True)
+    monkeypatch.setattr(chatbot_service, "stream_chat_completion", fake_stream)
+
+    events = [event async for event in stream_chatbot_message(mock_db, "test-website-1", "s1", "Hello")]
+
+    assert events[:3] == [("token", "Hi"), ("token", " there"), ("token", "!")]
+    event, result = events[3]
+    assert event == "done"
+    assert result["response"] == "Hi there!"
+    message_ops = mock_db["chatbot_messages"].bulk_write.await_args.args[0]
+    assert [op._doc["content"] for op in message_ops] == ["Hello", "Hi there!"]
+    assert message_ops[1]._doc["_id"] == result["message_id"]
+
+
+@pytest.mark.asyncio
+async def test_stream_chatbot_message_falls_back_on_error(mock_db, sample_website, monkeypatch):
+    """Test a stream that fails mid-reply ends with the fallback reply"""
+    mock_db["websites"].find_one = AsyncMock(return_value=sample_website)
+
+    async def failing_stream(model, system_message, prompt):
+        yield "Hi"
+        raise ConnectionError("stream dropped")
+
+    monkeypatch.setattr(chatbot_service, "streaming_enabled", lambda: True)
+    monkeypatch.setattr(chatbot_service, "stream_chat_completion", failing_stream)
+
+    events = [event async for event in stream_chatbot_message(mock_db, "test-website-1", "s1", "Hello")]
+
+    assert events[0] == ("token", "Hi")
+    event, result = events[-1]
+    assert event == "done"
+    assert result["response"] == chatbot_service.FALLBACK_RESPONSE
+    assert result["error"] == "stream dropped"
+
+
+@pytest.mark.asyncio
+async def test_stream_chatbot_message_website_not_found(mock_db):
+    """Test streaming for an unknown website yields a single error event"""
+    mock_db["websites"].find_one = AsyncMock(return_value=None)
+
+    events = [event async for event in stream_chatbot_message(mock_db, "missing", "s1", "Hello")]
+
+    assert events == [("error", {"detail": "Website not found"})]
+
+
+@pytest.mark.asyncio
+async def test_stream_chatbot_message_saves_partial_reply_on_disconnect(mock_db, sample_website, monkeypatch):
+    """Test a client leaving mid-stream still saves the user message and the reply so far"""
+    mock_db["websites"].find_one = AsyncMock(return_value=sample_website)
+
+    async def endless_stream(model, system_message, prompt):
+        yield "Hi"
+        while True:
+            yield " and"
+
+    monkeypatch.setattr(chatbot_service, "streaming_enabled", lambda: True)
+    monkeypatch.setattr(chatbot_service, "stream_chat_completion", endless_stream)
+
+    events = stream_chatbot_message(mock_db, "test-website-1", "s1", "Hello")
+    assert await events.__anext__() == ("token", "Hi")
+    await events.aclose()
+    await asyncio.gather(*chatbot_service._saving)
+
+    message_ops = mock_db["chatbot_messages"].bulk_write.await_args.args[0]
+    assert [op._doc["content"] for op in message_ops] == ["Hello", "Hi"]
@@ -0,0 +1,50 @@
+"""
+Unit tests for the single-pass HTML extractor
+Each fixture page is checked against its golden extraction on every installed backend
+"""
+import json
+import pytest
+from pathlib import Path
+from analyzer import html_extractor
+from analyzer.html_extractor import extract_website_data, available_backends, get_backend
+from analyzer.schema import BusinessType
+
+FIXTURES = Path(__file__).parent / "fixtures" / "pages"
+PAGES = sorted(path.stem for path in FIXTURES.glob("*.html"))
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("page", PAGES)
+def test_matches_golden_extraction(page, backend):
+    """Test every backend reproduces the golden extraction"""
+    html = (FIXTURES / f"{page}.html").read_text(encoding="utf-8")
+    golden = json.loads((FIXTURES / f"{page}.json").read_text(encoding="utf-8"))
+
+    result = extract_website_data(html, golden["url"], backend=backend)
+
+    assert result.model_dump(mode="json") == golden["extraction"]
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_empty_document(backend):
+    """Test an empty page yields an empty extraction"""
+    result = extract_website_data("", "https://empty.example.com/", backend=backend)
+
+    assert result.title is None
+    assert result.h1_tags == []
+    assert result.forms == []
+    assert result.business_type == BusinessType.OTHER
+
+
+def test_auto_picks_fastest_installed_backend():
+    """Test auto resolves to the first available backend"""
+    assert get_backend("auto").name == available_backends()[0]
+
+
+def test_missing_backend_falls_back_to_html_parser(monkeypatch):
+    """Test an unavailable backend falls back to html.parser"""
+    monkeypatch.setitem(html_extractor._BACKENDS, "selectolax", None)
+
+    assert get_backend("selectolax").name == "html.parser"
+    assert get_backend("no-such-parser").name == "html.parser"
+    assert "html.parser" in available_backends()
@@ -0,0 +1,112 @@
+"""
+Unit tests for the shared fetch client
+"""
+import asyncio
+import pytest
+import httpx
+from analyzer import http_client
+from analyzer.http_client import fetch_html
+
+
+@pytest.fixture
+def mock_transport():
+    """Install a client backed by a mock transport; handler is set per test"""
+    state = {"handler": None, "requests": []}
+
+    async def dispatch(request):
+        state["requests"].append(request)
+        return await state["handler"](request)
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(dispatch))
+    yield state
+    http_client._client = None
+    http_client._host_slots.clear()
+
+
+@pytest.mark.asyncio
+async def test_fetch_html_success(mock_transport):
+    """Test a normal HTML page is returned whole"""
+    async def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=b"<html><title>Hi</title></html>")
+    mock_transport["handler"] = handler
+
+    page = await fetch_html("https://test.com")
+
+    assert page.html == "<html><title>Hi</title></html>"
+    assert page.status_code == 200
+    assert page.truncated is False
+
+
+@pytest.mark.asyncio
+async def test_fetch_html_stops_at_byte_cap(mock_transport):
+    """Test download stops reading at max_bytes"""
+    async def body():
+        for _ in range(100):
+            yield b"x" * 1000
+
+    async def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=body())
+    mock_transport["handler"] = handler
+
+    page = await fetch_html("https://test.com", max_bytes=2500)
+
+    assert page.bytes_read == 2500
+    assert len(page.html) == 2500
+    assert page.truncated is True
+
+
+@pytest.mark.asyncio
+async def test_fetch_html_stops_at_time_budget(mock_transport):
+    """Test a slow body is cut off at the wall-clock budget"""
+    async def body():
+        yield b"<html>"
+        await asyncio.sleep(5)
+        yield b"never"
+
+    async def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=body())
+    mock_transport["handler"] = handler
+
+    page = await fetch_html("https://test.com", budget=0.1)
+
+    assert page.html == "<html>"
+    assert page.truncated is True
+
+
+@pytest.mark.asyncio
+async def test_fetch_html_rejects_non_html(mock_transport):
+    """Test non-HTML content types are rejected before reading the body"""
+    async def handler(request):
+        return httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF")
+    mock_transport["handler"] = handler
+
+    with pytest.raises(ValueError, match="Not an HTML page"):
+        await fetch_html("https://test.com/file.pdf")
+
+
+@pytest.mark.asyncio
+async def test_fetch_html_uses_declared_charset(mock_transport):
+    """Test body is decoded with the charset from Content-Type"""
+    async def handler(request):
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/html; charset=iso-8859-1"},
+            content="<p>Café</p>".encode("iso-8859-1")
+        )
+    mock_transport["handler"] = handler
+
+    page = await fetch_html("https://test.com")
+
+    assert page.html == "<p>Café</p>"
+    assert page.encoding == "iso8859-1"
+
+
+@pytest.mark.asyncio
+async def test_fetch_html_raises_on_error_status(mock_transport):
+    """Test HTTP errors propagate"""
+    async def handler(request):
+        return httpx.Response(404, headers={"content-type": "text/html"}, content=b"Not found")
+    mock_transport["handler"] = handler
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await fetch_html("https://test.com/missing")
@@ -0,0 +1,48 @@
+"""
+Unit tests for the compiled keyword matcher
+"""
+from analyzer.keyword_matcher import KeywordMatcher
+from analyzer.html_extractor import BUSINESS_MATCHER
+from analyzer.schema import BusinessType
+
+
+def test_counts_per_category_in_one_scan():
+    """Test distinct keywords are counted per category"""
+    matcher = KeywordMatcher({"shop": ["cart", "buy", "price"], "blog": ["blog", "post"]})
+
+    found = matcher.find("Buy now! Add to CART. Buy twice. Read our blog.")
+
+    assert found == {"buy": 2, "cart": 1, "blog": 1}
+    assert matcher.score(found) == {"shop": 2, "blog": 1}
+
+
+def test_matches_at_word_start_only():
+    """Test keywords match word prefixes, not the middle of words"""
+    matcher = KeywordMatcher({"kw": ["book", "api", "product"]})
+
+    assert matcher.find("Booking our products") == {"book": 1, "product": 1}
+    assert not matcher.search("Follow us on Facebook for capital news")
+
+
+def test_overlapping_keywords_all_reported():
+    """Test keywords contained in longer keywords are still counted"""
+    matcher = KeywordMatcher({"a": ["add to cart", "cart"], "b": ["sign", "sign up", "signup"]})
+
+    assert matcher.find("Add to cart") == {"add to cart": 1, "cart": 1}
+    assert matcher.find("signup") == {"sign": 1, "signup": 1}
+    assert matcher.count_categories("Sign up, add to cart") == {"a": 2, "b": 2}
+
+
+def test_keyword_in_several_categories():
+    """Test a shared keyword scores for each of its categories"""
+    matcher = KeywordMatcher({"x": ["book"], "y": ["book", "read"]})
+
+    assert matcher.count_categories("book") == {"x": 1, "y": 1}
+
+
+def test_business_matcher_scores():
+    """Test the business-type matcher built from BUSINESS_KEYWORDS"""
+    scores = BUSINESS_MATCHER.count_categories("shop our products, add to cart and checkout")
+
+    assert scores[BusinessType.ECOMMERCE] == 5
+    assert BusinessType.BLOG not in scores
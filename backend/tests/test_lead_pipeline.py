@@ -0,0 +1,147 @@
+"""
+Unit tests for the background lead-processing pipeline
+"""
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from services.email_service import EmailDeliveryError
+from services.lead_pipeline import LeadPipeline, LEAD_STEP_MAX_ATTEMPTS, STEPS
+
+
+def make_collection():
+    collection = MagicMock()
+    collection.find_one = AsyncMock(return_value=None)
+    collection.insert_one = AsyncMock()
+    collection.update_one = AsyncMock()
+    collection.create_index = AsyncMock()
+    return collection
+
+
+@pytest.fixture
+def mock_db():
+    """Mock database with leads and websites collections"""
+    collections = {"leads": make_collection(), "websites": make_collection()}
+    collections["websites"].find_one = AsyncMock(return_value={
+        "_id": "test-website-1", "title": "Test Company", "url": "https://test.com", "owner_id": "user-1"
+    })
+    db = MagicMock()
+    db.__getitem__.side_effect = lambda name: collections[name]
+    return db
+
+
+def make_lead(data, **steps):
+    now = datetime.now(timezone.utc)
+    lead = {
+        "_id": "lead-1",
+        "form_id": "form-1",
+        "website_id": "test-website-1",
+        "owner_id": "user-1",
+        "data": data,
+        "score": None,
+        "autoresponse_content": None,
+        "created_at": now,
+        "pipeline": LeadPipeline.initial_state(now)
+    }
+    for step, state in steps.items():
+        lead["pipeline"]["steps"][step].update(state)
+    return lead
+
+
+def final_pipeline_update(mock_db):
+    return mock_db["leads"].update_one.await_args.args[1]["$set"]
+
+
+AMBIGUOUS_LEAD = {"name": "John Doe", "email": "john@example.com", "phone": "+1234567890", "message": "I'm interested in your product"}
+SPAM_LEAD = {"name": "Spam", "email": "x@mailinator.com", "message": "hi"}
+
+
+@pytest.mark.asyncio
+async def test_submit_stores_pending_pipeline(mock_db):
+    """Test a submitted lead is stored with every step pending"""
+    pipeline = LeadPipeline(mock_db)
+
+    lead = await pipeline.submit({"_id": "lead-1", "data": AMBIGUOUS_LEAD, "created_at": datetime.now(timezone.utc)})
+
+    assert lead["pipeline"]["status"] == "pending"
+    assert list(lead["pipeline"]["steps"]) == STEPS
+    mock_db["leads"].insert_one.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_ambiguous_lead_scored_and_answered_in_one_call(mock_db):
+    """Test the score step's combined AI call also fills in the auto-response"""
+    pipeline = LeadPipeline(mock_db)
+
+    with patch('services.lead_service.request_lead_processing', AsyncMock(return_value=("hot", "Thanks John!"))), \
+         patch('services.lead_pipeline.request_autoresponse', AsyncMock()) as write, \
+         patch('services.lead_pipeline.send_autoresponse', AsyncMock(return_value=True)) as send, \
+         patch('services.lead_pipeline.track_usage', AsyncMock()) as usage:
+        await pipeline.run_lead(make_lead(AMBIGUOUS_LEAD))
+
+    write.assert_not_awaited()
+    assert send.await_args.args[2] == "Thanks John!"
+    usage.assert_awaited_once()
+    updates = [call.args[1]["$set"] for call in mock_db["leads"].update_one.await_args_list]
+    assert any(update.get("score") == "hot" for update in updates)
+    assert any(update.get("pipeline.steps.autoresponse.status") == "skipped" for update in updates)
+    assert final_pipeline_update(mock_db)["pipeline.status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_clear_cut_lead_skips_ai_scoring(mock_db):
+    """Test a lead the rules settle only calls AI for the auto-response"""
+    pipeline = LeadPipeline(mock_db)
+
+    with patch('services.lead_service.request_lead_processing', AsyncMock()) as combined, \
+         patch('services.lead_pipeline.request_autoresponse', AsyncMock(return_value="Thank you!")), \
+         patch('services.lead_pipeline.send_autoresponse', AsyncMock(return_value=True)), \
+         patch('services.lead_pipeline.track_usage', AsyncMock()):
+        await pipeline.run_lead(make_lead(SPAM_LEAD))
+
+    combined.assert_not_awaited()
+    updates = [call.args[1]["$set"] for call in mock_db["leads"].update_one.await_args_list]
+    score_update = next(update for update in updates if "score" in update)
+    assert score_update["score"] == "cold"
+    assert score_update["scoring"]["path"] == "rules"
+
+
+@pytest.mark.asyncio
+async def test_failed_step_is_rescheduled(mock_db):
+    """Test a failing step is retried later without rerunning finished steps"""
+    pipeline = LeadPipeline(mock_db)
+    lead = make_lead(
+        SPAM_LEAD,
+        score={"status": "done", "attempts": 1},
+        autoresponse={"status": "done", "attempts": 1}
+    )
+    lead.update({"score": "cold", "autoresponse_content": "Thank you!"})
+
+    with patch('services.lead_pipeline.send_autoresponse', AsyncMock(side_effect=EmailDeliveryError("SMTP error"))), \
+         patch('services.lead_pipeline.track_usage', AsyncMock()) as usage:
+        await pipeline.run_lead(lead)
+
+    usage.assert_not_awaited()
+    final = final_pipeline_update(mock_db)
+    assert final["pipeline.status"] == "pending"
+    assert final["pipeline.steps.email.status"] == "retrying"
+    assert final["pipeline.next_run_at"] > datetime.now(timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_exhausted_step_falls_back_and_continues(mock_db):
+    """Test a step out of attempts stores its fallback and later steps still run"""
+    pipeline = LeadPipeline(mock_db)
+    lead = make_lead(AMBIGUOUS_LEAD, score={"status": "retrying", "attempts": LEAD_STEP_MAX_ATTEMPTS - 1})
+
+    with patch('services.lead_service.request_lead_processing', AsyncMock(side_effect=ValueError("bad JSON"))), \
+         patch('services.lead_pipeline.request_autoresponse', AsyncMock(return_value="Thank you!")), \
+         patch('services.lead_pipeline.send_autoresponse', AsyncMock(return_value=True)), \
+         patch('services.lead_pipeline.track_usage', AsyncMock()) as usage:
+        await pipeline.run_lead(lead)
+
+    updates = [call.args[1]["$set"] for call in mock_db["leads"].update_one.await_args_list]
+    score_update = next(update for update in updates if "score" in update)
+    assert score_update["score"] == "warm"
+    assert score_update["pipeline.steps.score.status"] == "failed"
+    usage.assert_awaited_once()
+    assert final_pipeline_update(mock_db)["pipeline.status"] == "failed"
@@ -0,0 +1,76 @@
+"""
+Unit tests for rule-based lead pre-scoring
+"""
+from services.lead_prescorer import prescore_lead
+
+
+def test_prescore_hot_lead():
+    """Test a detailed, contactable lead with buying intent is confidently hot"""
+    result = prescore_lead({
+        "email": "jane@acme.io",
+        "phone": "+1 555 123 4567",
+        "website": "https://www.acme.io",
+        "message": "We'd like pricing and a demo, ready to start this week"
+    }, {"utm_medium": "cpc"})
+
+    assert result["score"] == "hot"
+    assert result["confidence"] >= 0.8
+    assert "email_matches_website" in result["signals"]
+    assert "paid_traffic" in result["signals"]
+
+
+def test_prescore_cold_lead():
+    """Test a throwaway submission is confidently cold"""
+    result = prescore_lead({"email": "x@mailinator.com", "message": "hi"})
+
+    assert result["score"] == "cold"
+    assert result["confidence"] >= 0.8
+    assert "disposable_email" in result["signals"]
+
+
+def test_prescore_spam_is_cold():
+    """Test junk keywords outweigh otherwise complete details"""
+    result = prescore_lead({
+        "email": "seo@agency.net",
+        "message": "We offer SEO services, backlinks and guest post placements for your site"
+    })
+
+    assert result["score"] == "cold"
+    assert "junk" in result["signals"]
+
+
+def test_prescore_ambiguous_lead():
+    """Test a middling lead is warm with low confidence so the LLM decides"""
+    result = prescore_lead({
+        "email": "sam@gmail.com",
+        "company": "Sam's Bakery",
+        "message": "Can you tell me more about what you do?"
+    })
+
+    assert result["score"] == "warm"
+    assert result["confidence"] < 0.8
+
+
+def test_prescore_invalid_email():
+    """Test a malformed email counts against the lead"""
+    result = prescore_lead({"email": "not-an-email", "message": "Interested in learning more about automation"})
+
+    assert "invalid_email" in result["signals"]
+    assert result["points"] < 0
+
+
+def test_prescore_ignores_non_string_fields():
+    """Test list, number and dict values posted by a form are treated as empty"""
+    result = prescore_lead({
+        "email": ["jane@acme.io"],
+        "phone": 5551234567,
+        "company": {"name": "Acme"},
+        "website": 42,
+        "message": ["We need pricing"]
+    }, {"utm_medium": ["cpc"], "utm_source": 7})
+
+    assert result["score"] == "cold"
+    assert "invalid_email" in result["signals"]
+    assert "phone" in result["signals"]
+    assert "company" not in result["signals"]
+    assert "short_message" in result["signals"]
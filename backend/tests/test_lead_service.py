@@ -7,7 +7,9 @@ from datetime import datetime, timezone
 from services.lead_service import (
     generate_lead_autoresponse,
     generate_and_send_lead_autoresponse,
-    score_lead
+    decide_lead_score,
+    score_lead,
+    score_lead_detailed
 )
 
 
@@ -46,7 +48,7 @@ async def test_generate_lead_autoresponse_success(mock_db, sample_website, sampl
     """Test successful auto-response generation"""
     mock_db["websites"].find_one = AsyncMock(return_value=sample_website)
     
-    with patch('services.lead_service.LlmChat') as mock_chat:
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
         mock_chat_instance = AsyncMock()
         mock_chat_instance.send_message = AsyncMock(return_value="Thank you for your interest, John!")
         mock_chat.return_value.with_model.return_value = mock_chat_instance
@@ -72,7 +74,7 @@ async def test_generate_lead_autoresponse_ai_error(mock_db, sample_website, samp
     """Test auto-response when AI fails"""
     mock_db["websites"].find_one = AsyncMock(return_value=sample_website)
     
-    with patch('services.lead_service.LlmChat') as mock_chat:
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
         mock_chat.return_value.with_model.return_value.send_message = AsyncMock(side_effect=Exception("API Error"))
         
         result = await generate_lead_autoresponse(mock_db, sample_lead_data, "test-website-1")
@@ -85,7 +87,7 @@ async def test_generate_lead_autoresponse_ai_error(mock_db, sample_website, samp
 @pytest.mark.asyncio
 async def test_score_lead_hot(mock_db, sample_lead_data):
     """Test lead scoring - hot lead"""
-    with patch('services.lead_service.LlmChat') as mock_chat:
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
         mock_chat_instance = AsyncMock()
         mock_chat_instance.send_message = AsyncMock(return_value="HOT")
         mock_chat.return_value.with_model.return_value = mock_chat_instance
@@ -98,7 +100,7 @@ async def test_score_lead_hot(mock_db, sample_lead_data):
 @pytest.mark.asyncio
 async def test_score_lead_warm(mock_db, sample_lead_data):
     """Test lead scoring - warm lead"""
-    with patch('services.lead_service.LlmChat') as mock_chat:
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
         mock_chat_instance = AsyncMock()
         mock_chat_instance.send_message = AsyncMock(return_value="WARM")
         mock_chat.return_value.with_model.return_value = mock_chat_instance
@@ -111,7 +113,7 @@ async def test_score_lead_warm(mock_db, sample_lead_data):
 @pytest.mark.asyncio
 async def test_score_lead_cold(mock_db, sample_lead_data):
     """Test lead scoring - cold lead"""
-    with patch('services.lead_service.LlmChat') as mock_chat:
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
         mock_chat_instance = AsyncMock()
         mock_chat_instance.send_message = AsyncMock(return_value="COLD")
         mock_chat.return_value.with_model.return_value = mock_chat_instance
@@ -124,7 +126,7 @@ async def test_score_lead_cold(mock_db, sample_lead_data):
 @pytest.mark.asyncio
 async def test_score_lead_invalid_response(mock_db, sample_lead_data):
     """Test lead scoring with invalid AI response"""
-    with patch('services.lead_service.LlmChat') as mock_chat:
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
         mock_chat_instance = AsyncMock()
         mock_chat_instance.send_message = AsyncMock(return_value="MAYBE")
         mock_chat.return_value.with_model.return_value = mock_chat_instance
@@ -138,7 +140,7 @@ async def test_score_lead_invalid_response(mock_db, sample_lead_data):
 @pytest.mark.asyncio
 async def test_score_lead_error(mock_db, sample_lead_data):
     """Test lead scoring when AI fails"""
-    with patch('services.lead_service.LlmChat') as mock_chat:
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
         mock_chat.return_value.with_model.return_value.send_message = AsyncMock(side_effect=Exception("API Error"))
         
         result = await score_lead(mock_db, sample_lead_data)
@@ -147,12 +149,42 @@ async def test_score_lead_error(mock_db, sample_lead_data):
         assert result == "warm"
 
 
+@pytest.mark.asyncio
+async def test_score_lead_clear_cut_skips_llm(mock_db):
+    """Test a lead the rules are confident about is scored without the LLM"""
+    lead = {
+        "name": "Jane Roe",
+        "email": "jane@acme.io",
+        "phone": "+1 555 123 4567",
+        "company": "Acme",
+        "message": "We have budget approved and need a quote for a demo this week"
+    }
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        result = await score_lead_detailed(mock_db, lead)
+
+    assert result["score"] == "hot"
+    assert result["path"] == "rules"
+    mock_chat.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_score_lead_ambiguous_uses_llm(mock_db, sample_lead_data):
+    """Test an ambiguous lead is sent to the LLM and the path is recorded"""
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        mock_chat.return_value.with_model.return_value.send_message = AsyncMock(return_value="HOT")
+        result = await score_lead_detailed(mock_db, sample_lead_data)
+
+    assert result["score"] == "hot"
+    assert result["path"] == "llm"
+    assert result["prescore"] == "warm"
+
+
 @pytest.mark.asyncio
 async def test_generate_and_send_lead_autoresponse_with_email(mock_db, sample_website, sample_lead_data):
     """Test generating and sending auto-response email"""
     mock_db["websites"].find_one = AsyncMock(return_value=sample_website)
     
-    with patch('services.lead_service.LlmChat') as mock_chat, \
+    with patch('services.llm_gateway.LlmChat') as mock_chat, \
          patch('services.lead_service.send_lead_autoresponse_email') as mock_email:
         
         mock_chat_instance = AsyncMock()
@@ -174,7 +206,7 @@ async def test_generate_and_send_lead_autoresponse_without_email(mock_db, sample
     """Test generating auto-response without sending email"""
     mock_db["websites"].find_one = AsyncMock(return_value=sample_website)
     
-    with patch('services.lead_service.LlmChat') as mock_chat:
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
         mock_chat_instance = AsyncMock()
         mock_chat_instance.send_message = AsyncMock(return_value="Thank you!")
         mock_chat.return_value.with_model.return_value = mock_chat_instance
@@ -192,7 +224,7 @@ async def test_generate_and_send_lead_autoresponse_email_failure(mock_db, sample
     """Test auto-response when email sending fails"""
     mock_db["websites"].find_one = AsyncMock(return_value=sample_website)
     
-    with patch('services.lead_service.LlmChat') as mock_chat, \
+    with patch('services.llm_gateway.LlmChat') as mock_chat, \
          patch('services.lead_service.send_lead_autoresponse_email') as mock_email:
         
         mock_chat_instance = AsyncMock()
@@ -208,3 +240,42 @@ async def test_generate_and_send_lead_autoresponse_email_failure(mock_db, sample
         
         assert content == "Thank you!"
         assert email_sent is False  # Email failed but content was generated
+
+
+@pytest.mark.asyncio
+async def test_decide_lead_score_single_call(sample_website, sample_lead_data):
+    """Test an ambiguous lead is scored and answered by one AI call"""
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        send = mock_chat.return_value.with_model.return_value.send_message = AsyncMock(
+            return_value='```json\n{"score": "HOT", "autoresponse": "Thanks John!"}\n```'
+        )
+        result = await decide_lead_score(sample_lead_data, sample_website)
+
+    assert send.await_count == 1
+    assert result["score"] == "hot"
+    assert result["scoring"]["path"] == "llm"
+    assert result["autoresponse"] == "Thanks John!"
+
+
+@pytest.mark.asyncio
+async def test_decide_lead_score_clear_cut_skips_ai(sample_website):
+    """Test a lead the rules are confident about is scored without AI"""
+    lead = {"name": "Spam", "email": "x@mailinator.com", "message": "hi"}
+
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        send = mock_chat.return_value.with_model.return_value.send_message = AsyncMock()
+        result = await decide_lead_score(lead, sample_website)
+
+    send.assert_not_awaited()
+    assert result["score"] == "cold"
+    assert result["scoring"]["path"] == "rules"
+    assert result["autoresponse"] is None
+
+
+@pytest.mark.asyncio
+async def test_decide_lead_score_unparseable_response(sample_website, sample_lead_data):
+    """Test a non-JSON combined response raises so the caller can retry or fall back"""
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        mock_chat.return_value.with_model.return_value.send_message = AsyncMock(return_value="HOT")
+        with pytest.raises(ValueError):
+            await decide_lead_score(sample_lead_data, sample_website)
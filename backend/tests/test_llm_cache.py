@@ -0,0 +1,76 @@
+"""
+Unit tests for the LLM response cache
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+from analyzer.llm_cache import LLMResultCache, make_key, prompt_version, estimate_tokens
+
+
+@pytest.fixture
+def mock_db():
+    """Mock database with an llm_cache collection"""
+    collection = MagicMock()
+    collection.find_one = AsyncMock(return_value=None)
+    collection.replace_one = AsyncMock()
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    return db
+
+
+def test_key_covers_model_prompt_and_version():
+    """Test any change to model, system prompt or prompt changes the key"""
+    key = make_key("gpt-4o", prompt_version("system"), "prompt")
+
+    assert key == make_key("gpt-4o", prompt_version("system"), "prompt")
+    assert key != make_key("gpt-4o-mini", prompt_version("system"), "prompt")
+    assert key != make_key("gpt-4o", prompt_version("system v2"), "prompt")
+    assert key != make_key("gpt-4o", prompt_version("system"), "prompt ")
+
+
+@pytest.mark.asyncio
+async def test_hit_counts_saved_tokens():
+    """Test hits return the stored result and add its tokens to the savings"""
+    cache = LLMResultCache()
+    await cache.put("k", {"summary": "cached"}, tokens=1200)
+
+    assert await cache.get("missing") is None
+    assert await cache.get("k") == {"summary": "cached"}
+    assert await cache.get("k") == {"summary": "cached"}
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 1, "hit_rate": 0.667, "saved_tokens": 2400}
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_not_served(mock_db):
+    """Test expired entries miss, in memory and from Mongo"""
+    cache = LLMResultCache(ttl=60)
+    cache.attach(mock_db)
+    await cache.put("k", {"summary": "old"})
+    cache._entries["k"]["expires_at"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+    mock_db["llm_cache"].find_one = AsyncMock(return_value=dict(cache._entries["k"]))
+
+    assert await cache.get("k") is None
+    assert "k" not in cache._entries
+    assert cache.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_mongo_entry_shared_across_workers(mock_db):
+    """Test a result written by another worker is served from Mongo"""
+    mock_db["llm_cache"].find_one = AsyncMock(return_value={
+        "_id": "k",
+        "result": {"summary": "from another worker"},
+        "tokens": 500,
+        "expires_at": datetime.now(timezone.utc) + timedelta(hours=1)
+    })
+    cache = LLMResultCache()
+    cache.attach(mock_db)
+
+    assert await cache.get("k") == {"summary": "from another worker"}
+    assert cache.saved_tokens == 500
+
+
+def test_estimate_tokens():
+    """Test rough token estimate"""
+    assert estimate_tokens("a" * 400, "b" * 400) == 200
+    assert estimate_tokens(None) == 0
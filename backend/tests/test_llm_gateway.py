@@ -0,0 +1,148 @@
+"""
+Unit tests for the LLM gateway
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from services import llm_gateway as gateway_module
+from services.llm_gateway import LLMGateway, LLMPriority, LLMDeadlineExceeded, _ModelLane
+from services.llm_standin import SyntheticProvider
+
+
+@pytest.fixture
+def gateway():
+    return LLMGateway()
+
+
+@pytest.mark.asyncio
+async def test_complete_returns_response(gateway):
+    """Test a call goes through LlmChat and is counted"""
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        mock_chat.return_value.with_model.return_value.send_message = AsyncMock(return_value="Hello")
+        result = await gateway.complete("gpt-4o-mini", "Hi", system_message="Be nice", priority=LLMPriority.INTERACTIVE)
+
+    assert result == "Hello"
+    mock_chat.return_value.with_model.assert_called_with("openai", "gpt-4o-mini")
+    stats = gateway.stats()
+    assert stats["models"]["gpt-4o-mini"]["calls"] == 1
+    assert stats["queue_wait"]["interactive"]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_interactive_served_before_batch():
+    """Test a saturated model grants waiting interactive calls before batch ones"""
+    lane = _ModelLane(rpm=6000, burst=10, concurrency=1)
+    order = []
+
+    await lane.acquire(LLMPriority.BACKGROUND)  # Occupy the only slot
+
+    async def waiter(name, priority):
+        await lane.acquire(priority)
+        order.append(name)
+        lane.release()
+
+    batch = asyncio.create_task(waiter("batch", LLMPriority.BATCH))
+    await asyncio.sleep(0)
+    chat = asyncio.create_task(waiter("chat", LLMPriority.INTERACTIVE))
+    await asyncio.sleep(0)
+
+    lane.release()
+    await asyncio.gather(batch, chat)
+
+    assert order == ["chat", "batch"]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_spaces_out_calls():
+    """Test calls beyond the burst wait for the bucket to refill"""
+    lane = _ModelLane(rpm=600, burst=1, concurrency=10)  # One token per 0.1s
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    for _ in range(3):
+        await lane.acquire(LLMPriority.BACKGROUND)
+
+    assert loop.time() - started >= 0.18
+
+
+@pytest.mark.asyncio
+async def test_deadline_raises(gateway):
+    """Test a call that outlives its deadline raises LLMDeadlineExceeded"""
+    async def slow(_):
+        await asyncio.sleep(1)
+        return "late"
+
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        mock_chat.return_value.with_model.return_value.send_message = AsyncMock(side_effect=slow)
+        with pytest.raises(LLMDeadlineExceeded):
+            await gateway.complete("gpt-4o", "Hi", system_message="", deadline=0.05, hedge_after=0)
+
+    assert gateway.stats()["models"]["gpt-4o"]["deadline_exceeded"] == 1
+    assert gateway.stats()["models"]["gpt-4o"]["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged(gateway):
+    """Test a duplicate is started for a slow call and the faster answer wins"""
+    calls = []
+
+    async def send(_):
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+            return "slow"
+        return "fast"
+
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        mock_chat.return_value.with_model.return_value.send_message = AsyncMock(side_effect=send)
+        result = await gateway.complete("gpt-4o-mini", "Hi", system_message="", hedge_after=0.05)
+
+    assert result == "fast"
+    stats = gateway.stats()["models"]["gpt-4o-mini"]
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_call_is_retried(gateway, monkeypatch):
+    """Test a provider error is retried once before giving up"""
+    monkeypatch.setattr(gateway_module, "LLM_RETRY_BACKOFF", 0.01)
+
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        send = mock_chat.return_value.with_model.return_value.send_message = AsyncMock(
+            side_effect=[RuntimeError("503"), "ok"]
+        )
+        result = await gateway.complete("gpt-4o", "Hi", system_message="", hedge_after=0)
+
+    assert result == "ok"
+    assert send.await_count == 2
+    assert gateway.stats()["models"]["gpt-4o"]["retries"] == 1
+    sessions = [call.kwargs["session_id"] for call in mock_chat.call_args_list]
+    assert len(set(sessions)) == 2  # The retry gets its own provider session
+
+
+@pytest.mark.asyncio
+async def test_calls_are_recorded_by_feature(gateway, monkeypatch):
+    """Test each provider call is reported to the metrics with its feature and owner"""
+    observe = MagicMock()
+    monkeypatch.setattr(gateway_module.llm_metrics, "observe", observe)
+
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        mock_chat.return_value.with_model.return_value.send_message = AsyncMock(return_value="HOT")
+        await gateway.complete("gpt-4o-mini", "Score", system_message="", feature="lead_score", owner_id="user-1")
+
+    model, feature, prompt_tokens, completion_tokens, latency, error, owner_id = observe.call_args.args
+    assert (model, feature, error, owner_id) == ("gpt-4o-mini", "lead_score", None, "user-1")
+
+
+@pytest.mark.asyncio
+async def test_standin_provider_replaces_live_calls(gateway):
+    """Test a plugged-in stand-in answers without constructing LlmChat"""
+    gateway.set_provider(SyntheticProvider(latency="fixed:0", latency_by_feature={}))
+
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        result = await gateway.complete("gpt-4o-mini", "Score", system_message="", feature="lead_score")
+
+    assert result in ("HOT", "WARM", "COLD")
+    mock_chat.assert_not_called()
+    assert gateway.stats()["provider"] == "SyntheticProvider"
@@ -0,0 +1,92 @@
+"""
+Unit tests for LLM call instrumentation
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from services.llm_metrics import LLMMetrics, llm_owner, estimate_cost
+
+
+@pytest.fixture
+def mock_db():
+    """Mock database with an llm_usage_daily collection"""
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock()
+    collection.create_index = AsyncMock()
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    return db
+
+
+def test_cost_uses_model_prices():
+    """Test cost is priced per million prompt and completion tokens"""
+    assert estimate_cost("gpt-4o-mini", 1_000_000, 1_000_000) == pytest.approx(0.75)
+    assert estimate_cost("unknown-model", 1000, 1000) == 0.0
+
+
+def test_render_prometheus_text():
+    """Test counters and latency histograms are rendered in exposition format"""
+    metrics = LLMMetrics()
+    metrics.observe("gpt-4o", "analysis", 1000, 500, 1.2)
+    metrics.observe("gpt-4o", "analysis", 1000, 0, 0.3, error="timeout")
+
+    text = metrics.render()
+
+    assert '# TYPE llm_calls_total counter' in text
+    assert 'llm_calls_total{model="gpt-4o",feature="analysis",outcome="ok"} 1' in text
+    assert 'llm_calls_total{model="gpt-4o",feature="analysis",outcome="timeout"} 1' in text
+    assert 'llm_prompt_tokens_total{model="gpt-4o",feature="analysis"} 1000' in text
+    assert 'llm_call_latency_seconds_bucket{model="gpt-4o",feature="analysis",le="0.5"} 1' in text
+    assert 'llm_call_latency_seconds_bucket{model="gpt-4o",feature="analysis",le="+Inf"} 2' in text
+    assert 'llm_call_latency_seconds_count{model="gpt-4o",feature="analysis"} 2' in text
+
+
+@pytest.mark.asyncio
+async def test_rollup_is_per_owner_and_day(mock_db):
+    """Test flushed totals are incremented on one document per owner, day, feature and model"""
+    metrics = LLMMetrics()
+    metrics.attach(mock_db)
+
+    with llm_owner("user-1"):
+        metrics.observe("gpt-4o-mini", "chatbot", 100, 50, 0.5)
+        metrics.observe("gpt-4o-mini", "chatbot", 100, 50, 0.5)
+    metrics.observe("gpt-4o-mini", "chatbot", 100, 0, 0.1, error="RuntimeError", owner_id="user-2")
+    await metrics.flush()
+
+    operations = mock_db["llm_usage_daily"].bulk_write.await_args.args[0]
+    by_owner = {op._doc["$setOnInsert"]["owner_id"]: op._doc["$inc"] for op in operations}
+    assert by_owner["user-1"]["calls"] == 2
+    assert by_owner["user-1"]["prompt_tokens"] == 200
+    assert by_owner["user-2"]["errors"] == 1
+    assert "prompt_tokens" not in by_owner["user-2"]
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_totals(mock_db):
+    """Test totals from a failed flush are written by the next one"""
+    metrics = LLMMetrics()
+    metrics.attach(mock_db)
+    mock_db["llm_usage_daily"].bulk_write = AsyncMock(side_effect=[RuntimeError("down"), None])
+
+    metrics.observe("gpt-4o", "content", 10, 10, 0.1, owner_id="user-1")
+    await metrics.flush()
+    metrics.observe("gpt-4o", "content", 10, 10, 0.1, owner_id="user-1")
+    await metrics.flush()
+
+    operations = mock_db["llm_usage_daily"].bulk_write.await_args.args[0]
+    assert operations[0]._doc["$inc"]["calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_owner_follows_tasks_started_in_block():
+    """Test calls made in tasks started inside llm_owner are attributed to that owner"""
+    metrics = LLMMetrics()
+
+    async def call():
+        metrics.observe("gpt-4o", "job_mapping", 10, 10, 0.1)
+
+    with llm_owner("user-9"):
+        task = asyncio.create_task(call())
+    await task
+
+    assert [key[0] for key in metrics._pending] == ["user-9"]
@@ -0,0 +1,116 @@
+"""
+Unit tests for the record/replay and synthetic LLM stand-ins
+"""
+import json
+import random
+import pytest
+from unittest.mock import AsyncMock
+from analyzer.schema import AutomationCategory, Priority
+from services.llm_standin import (
+    CassetteStore,
+    RecordingProvider,
+    ReplayProvider,
+    SyntheticProvider,
+    build_provider,
+    parse_latency
+)
+
+
+@pytest.fixture
+def synthetic():
+    return SyntheticProvider(latency="fixed:0", latency_by_feature={})
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay(tmp_path, synthetic):
+    """Test a recorded response is replayed for the same prompt"""
+    store = CassetteStore(str(tmp_path))
+    send = AsyncMock(return_value="Recorded reply")
+    recorder = RecordingProvider(send, store)
+
+    await recorder.complete(feature="chatbot", model="gpt-4o-mini", system_message="sys", prompt="Hi",
+                            session_id="s1", provider="openai", api_key=None)
+    replay = ReplayProvider(store, speed=0, synthetic=synthetic)
+    result = await replay.complete(feature="chatbot", model="gpt-4o-mini", system_message="sys", prompt="Hi")
+
+    assert result == "Recorded reply"
+    assert replay.hits == 1
+    assert send.await_args.kwargs["session_id"] == "s1"
+
+
+@pytest.mark.asyncio
+async def test_replay_miss(tmp_path, synthetic):
+    """Test an unrecorded prompt is synthesized, or rejected when configured"""
+    store = CassetteStore(str(tmp_path))
+
+    synthesized = await ReplayProvider(store, speed=0, synthetic=synthetic).complete(
+        feature="lead_score", model="gpt-4o-mini", system_message="sys", prompt="new lead"
+    )
+    assert synthesized in ("HOT", "WARM", "COLD")
+
+    with pytest.raises(LookupError):
+        await ReplayProvider(store, on_miss="error").complete(
+            feature="lead_score", model="gpt-4o-mini", system_message="sys", prompt="new lead"
+        )
+
+
+@pytest.mark.asyncio
+async def test_synthetic_analysis_is_schema_valid(synthetic):
+    """Test synthetic analyses parse into valid categories and priorities"""
+    response = await synthetic.complete(feature="analysis", model="gpt-4o", system_message="sys", prompt="site")
+    data = json.loads(response)
+
+    assert 5 <= len(data["recommendations"]) <= 8
+    for rec in data["recommendations"]:
+        AutomationCategory(rec["category"])
+        Priority(rec["priority"])
+
+
+@pytest.mark.asyncio
+async def test_synthetic_batch_mapping_covers_every_job(synthetic):
+    """Test a batched job-mapping prompt gets one entry per job"""
+    prompt = "Job 0:\nJob Title: Receptionist\n\nJob 1:\nJob Title: Bookkeeper"
+
+    data = json.loads(await synthetic.complete(feature="job_mapping", model="gpt-4o", system_message="sys", prompt=prompt))
+
+    assert [entry["job"] for entry in data] == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_synthetic_lead_processing(synthetic):
+    """Test combined lead processing gets a score and an auto-response"""
+    data = json.loads(await synthetic.complete(feature="lead_process", model="gpt-4o-mini", system_message="sys", prompt="lead"))
+
+    assert data["score"] in ("HOT", "WARM", "COLD")
+    assert data["autoresponse"]
+
+
+@pytest.mark.asyncio
+async def test_synthetic_is_deterministic(synthetic):
+    """Test the same prompt always synthesizes the same response"""
+    first = await synthetic.complete(feature="chatbot", model="gpt-4o-mini", system_message="sys", prompt="Hi")
+    second = await synthetic.complete(feature="chatbot", model="gpt-4o-mini", system_message="sys", prompt="Hi")
+
+    assert first == second
+
+
+def test_latency_distributions():
+    """Test latency specs sample within their distribution"""
+    rng = random.Random(1)
+
+    assert parse_latency("fixed:0.8")(rng) == 0.8
+    assert 0.5 <= parse_latency("uniform:0.5:2")(rng) <= 2
+    assert parse_latency("lognormal:1.5:0.5")(rng) > 0
+    with pytest.raises(ValueError):
+        parse_latency("pareto:1")
+
+
+def test_build_provider_modes():
+    """Test LLM_PROVIDER modes map to stand-ins, with live meaning no stand-in"""
+    send = AsyncMock()
+
+    assert build_provider(send, "live") is None
+    assert isinstance(build_provider(send, "record"), RecordingProvider)
+    assert isinstance(build_provider(send, "synthetic"), SyntheticProvider)
+    with pytest.raises(ValueError):
+        build_provider(send, "mystery")
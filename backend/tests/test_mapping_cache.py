@@ -0,0 +1,99 @@
+"""
+Unit tests for the job mapping cache
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from analyzer.mapping_cache import JobMappingCache, normalize_job_title
+
+MAPPING = {
+    "ai_agent": "AI Chat Support Agent",
+    "automation_potential": 80,
+    "classification": "Hybrid",
+    "automated_tasks": ["Answer FAQs"],
+    "explanation": "Handles routine questions",
+    "estimated_annual_salary": 42000,
+    "monthly_savings": 3401
+}
+
+
+@pytest.fixture
+def mock_db():
+    """Mock database with a job_mappings collection"""
+    collection = MagicMock()
+    collection.find_one = AsyncMock(return_value=None)
+    collection.replace_one = AsyncMock()
+    collection.delete_many = AsyncMock(return_value=MagicMock(deleted_count=3))
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    return db
+
+
+def test_normalize_job_title():
+    """Test punctuation, case and common abbreviations are normalized"""
+    assert normalize_job_title("Sr. Sales Rep") == "senior sales representative"
+    assert normalize_job_title("  Customer Service REPRESENTATIVE ") == "customer service representative"
+    assert normalize_job_title("Admin Asst (Part-Time)") == "administrative assistant part time"
+
+
+@pytest.mark.asyncio
+async def test_hit_strips_savings_fields():
+    """Test cached mappings are returned without salary and savings fields"""
+    cache = JobMappingCache(version="gpt-4o/v1")
+    await cache.put("Customer Service Rep", MAPPING)
+
+    cached = await cache.get("customer service representative")
+
+    assert cached["ai_agent"] == "AI Chat Support Agent"
+    assert "monthly_savings" not in cached
+    assert "estimated_annual_salary" not in cached
+    assert cache.stats()["hit_rate"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_versions_are_isolated(mock_db):
+    """Test mappings from another prompt version are not served"""
+    old = JobMappingCache(version="gpt-4o/v1")
+    await old.put("Sales Rep", MAPPING)
+    new = JobMappingCache(version="gpt-4o/v2")
+    new.attach(mock_db)
+
+    assert await new.get("Sales Rep") is None
+    mock_db["job_mappings"].find_one.assert_awaited_with({"_id": "gpt-4o/v2:sales representative"})
+    assert new.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_mongo_hit_fills_memory(mock_db):
+    """Test a Mongo hit is kept in the LRU"""
+    mock_db["job_mappings"].find_one = AsyncMock(return_value={"_id": "v1:sales representative", "mapping": {"ai_agent": "AI Sales Assistant"}})
+    cache = JobMappingCache(version="v1")
+    cache.attach(mock_db)
+
+    assert (await cache.get("Sales Rep"))["ai_agent"] == "AI Sales Assistant"
+    assert (await cache.get("Sales Rep"))["ai_agent"] == "AI Sales Assistant"
+    assert mock_db["job_mappings"].find_one.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_by_version(mock_db):
+    """Test invalidation drops one version, or all outdated versions by default"""
+    cache = JobMappingCache(version="v2")
+    cache.attach(mock_db)
+    cache._remember("v1:sales representative", {})
+    cache._remember("v2:sales representative", {})
+
+    assert await cache.invalidate() == 3
+    mock_db["job_mappings"].delete_many.assert_awaited_with({"version": {"$ne": "v2"}})
+    assert list(cache._entries) == ["v2:sales representative"]
+
+    await cache.invalidate("v2")
+    mock_db["job_mappings"].delete_many.assert_awaited_with({"version": "v2"})
+    assert len(cache._entries) == 0
+
+
+def test_lru_evicts_oldest():
+    """Test the in-process LRU is bounded"""
+    cache = JobMappingCache(version="v1", max_entries=2)
+    for key in ["a", "b", "c"]:
+        cache._remember(key, {})
+    assert list(cache._entries) == ["b", "c"]
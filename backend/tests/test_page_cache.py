@@ -0,0 +1,153 @@
+"""
+Unit tests for the website page cache
+"""
+import asyncio
+import pytest
+import httpx
+from datetime import datetime, timedelta, timezone
+from analyzer import http_client
+from analyzer import website_fetcher
+from analyzer.page_cache import PageCache, normalize_url
+from analyzer.parse_pool import ExtractionPool
+from analyzer.schema import FetchedPage, WebsiteExtraction
+
+SAMPLE_HTML = b"<html><head><title>Test Shop</title></head><body><h1>Welcome</h1></body></html>"
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Fresh memory-only cache installed in the fetcher"""
+    cache = PageCache(ttl=3600)
+    monkeypatch.setattr(website_fetcher, "page_cache", cache)
+    monkeypatch.setattr(website_fetcher, "extraction_pool", ExtractionPool(workers=0))
+    return cache
+
+
+@pytest.fixture
+def mock_transport():
+    state = {"handler": None, "requests": []}
+
+    async def dispatch(request):
+        state["requests"].append(request)
+        return await state["handler"](request)
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(dispatch))
+    yield state
+    http_client._client = None
+    http_client._host_slots.clear()
+
+
+def test_normalize_url():
+    """Test equivalent URLs share a cache key"""
+    assert normalize_url("Example.COM/") == "https://example.com/"
+    assert normalize_url("https://example.com:443/about/#team") == "https://example.com/about"
+    assert normalize_url("http://example.com/?b=2&a=1") == "http://example.com/?a=1&b=2"
+    assert normalize_url("http://example.com:8080") == "http://example.com:8080/"
+
+
+def test_lru_evicts_by_entries_and_bytes():
+    """Test oldest entries are evicted past the entry or byte limits"""
+    cache = PageCache(max_entries=2, max_bytes=100)
+    for key in ["a", "b", "c"]:
+        cache._remember(key, {"html": "x" * 10})
+    assert list(cache._entries) == ["b", "c"]
+
+    cache._remember("d", {"html": "x" * 95})
+    assert list(cache._entries) == ["d"]
+    assert cache._bytes == 95
+    assert cache.evictions == 3
+
+
+@pytest.mark.asyncio
+async def test_fresh_entry_skips_network(cache, mock_transport):
+    """Test a fresh entry is served without a request"""
+    async def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html", "etag": '"v1"'}, content=SAMPLE_HTML)
+    mock_transport["handler"] = handler
+
+    first = await website_fetcher.fetch_and_extract_website("https://test.com")
+    second = await website_fetcher.fetch_and_extract_website("test.com/")
+
+    assert len(mock_transport["requests"]) == 1
+    assert second == first
+    assert cache.misses == 1
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_revalidates_with_304(cache, mock_transport):
+    """Test a stale entry sends validators and reuses the extraction on 304"""
+    key = normalize_url("https://test.com")
+    extraction = WebsiteExtraction(url="https://test.com", title="Cached Title")
+    await cache.put(key, FetchedPage(url="https://test.com", etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT"), extraction)
+    cache._entries[key]["fetched_at"] = datetime.now(timezone.utc) - timedelta(hours=2)
+
+    async def handler(request):
+        assert request.headers["if-none-match"] == '"v1"'
+        assert request.headers["if-modified-since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+        return httpx.Response(304, headers={"etag": '"v1"'})
+    mock_transport["handler"] = handler
+
+    result = await website_fetcher.fetch_and_extract_website("https://test.com")
+
+    assert result.title == "Cached Title"
+    assert cache.revalidated == 1
+    assert cache.is_fresh(cache._entries[key])
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_replaced_on_change(cache, mock_transport):
+    """Test a changed page is re-extracted and stored"""
+    key = normalize_url("https://test.com")
+    await cache.put(key, FetchedPage(url="https://test.com", etag='"v1"'), WebsiteExtraction(url="https://test.com", title="Old"))
+    cache._entries[key]["fetched_at"] = datetime.now(timezone.utc) - timedelta(hours=2)
+
+    async def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html", "etag": '"v2"'}, content=SAMPLE_HTML)
+    mock_transport["handler"] = handler
+
+    result = await website_fetcher.fetch_and_extract_website("https://test.com")
+
+    assert result.title == "Test Shop"
+    assert cache._entries[key]["etag"] == '"v2"'
+    assert cache.misses == 2  # The seeded entry and the refetch
+    assert cache.hits == 0
+
+
+@pytest.mark.asyncio
+async def test_context_keeps_html_and_links(cache, mock_transport):
+    """Test the analysis context carries the page HTML and discovered links, fresh or cached"""
+    html = b"<html><body><nav><a href='/careers'>Careers</a></nav><a href='/signup'>Start free trial</a></body></html>"
+
+    async def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=html)
+    mock_transport["handler"] = handler
+
+    fresh = await website_fetcher.fetch_analysis_context("https://test.com")
+    cached = await website_fetcher.fetch_analysis_context("https://test.com")
+
+    assert len(mock_transport["requests"]) == 1
+    for context in (fresh, cached):
+        assert context.html == html.decode()
+        assert context.links == [
+            {"text": "Careers", "href": "https://test.com/careers"},
+            {"text": "Start free trial", "href": "https://test.com/signup"}
+        ]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_fetches_of_same_url_coalesce(cache, mock_transport):
+    """Test simultaneous analyses of one URL make a single request"""
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=SAMPLE_HTML)
+    mock_transport["handler"] = handler
+
+    results = await asyncio.gather(
+        website_fetcher.fetch_analysis_context("https://test.com"),
+        website_fetcher.fetch_analysis_context("test.com/"),
+        website_fetcher.fetch_analysis_context("https://TEST.com")
+    )
+
+    assert len(mock_transport["requests"]) == 1
+    assert all(r.extraction.title == "Test Shop" for r in results)
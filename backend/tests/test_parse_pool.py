@@ -0,0 +1,99 @@
+"""
+Unit tests for the extraction process pool
+"""
+import os
+import asyncio
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+from analyzer.parse_pool import ExtractionPool
+from analyzer.website_fetcher import extract_website_data
+from analyzer.schema import WebsiteExtraction
+
+SAMPLE_HTML = """
+<html><head><title>Acme Store</title></head>
+<body><h1>Shop our products</h1><a href="/cart">Buy now</a></body></html>
+"""
+
+
+@pytest.mark.asyncio
+async def test_extraction_runs_in_process_pool():
+    """Test extraction result comes back from a worker process as a WebsiteExtraction"""
+    pool = ExtractionPool(workers=1, max_pending=2)
+    try:
+        result = await pool.run(extract_website_data, SAMPLE_HTML, "https://acme.com")
+    finally:
+        pool.shutdown()
+
+    assert isinstance(result, WebsiteExtraction)
+    assert result.title == "Acme Store"
+    assert result.h1_tags == ["Shop our products"]
+    assert pool.stats()["completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_inline_mode_matches_direct_call():
+    """Test workers=0 runs on the thread executor with the same result"""
+    pool = ExtractionPool(workers=0)
+
+    result = await pool.run(extract_website_data, SAMPLE_HTML, "https://acme.com")
+
+    assert result == extract_website_data(SAMPLE_HTML, "https://acme.com")
+
+
+@pytest.mark.asyncio
+async def test_pending_jobs_are_bounded():
+    """Test callers beyond max_pending wait and are reported as queue depth"""
+    pool = ExtractionPool(workers=0, max_pending=1)
+    release = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def blocking_job():
+        asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+        return "done"
+
+    first = asyncio.create_task(pool.run(blocking_job))
+    second = asyncio.create_task(pool.run(blocking_job))
+    await asyncio.sleep(0.05)
+
+    stats = pool.stats()
+    assert stats["running"] == 1
+    assert stats["waiting"] == 1
+
+    release.set()
+    assert await first == "done"
+    assert await second == "done"
+    assert pool.stats()["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failures_are_counted():
+    """Test exceptions propagate and are counted"""
+    pool = ExtractionPool(workers=0)
+
+    def failing_job():
+        raise ValueError("bad html")
+
+    with pytest.raises(ValueError):
+        await pool.run(failing_job)
+
+    assert pool.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_broken_pool_is_shut_down_and_replaced():
+    """Test a dead worker's executor is shut down and the next job gets a fresh one"""
+    pool = ExtractionPool(workers=1)
+    try:
+        pool.start()
+        broken = pool._executor
+
+        with patch.object(broken, "shutdown", wraps=broken.shutdown) as shutdown:
+            with pytest.raises(BrokenProcessPool):
+                await pool.run(os._exit, 1)
+
+        shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        assert pool._executor is None
+        assert await pool.run(abs, -3) == 3
+    finally:
+        pool.shutdown()
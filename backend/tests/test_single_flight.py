@@ -0,0 +1,120 @@
+"""
+Unit tests for single-flight coalescing
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import DuplicateKeyError
+from analyzer import single_flight
+from analyzer.single_flight import SingleFlight
+
+
+@pytest.fixture
+def mock_db():
+    """Mock database with an analysis_locks collection"""
+    collection = MagicMock()
+    collection.insert_one = AsyncMock()
+    collection.delete_one = AsyncMock(return_value=MagicMock(deleted_count=0))
+    db = MagicMock()
+    db.__getitem__.return_value = collection
+    return db
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_run():
+    """Test callers with the same key await the first caller's work"""
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"result": len(calls)}
+
+    results = await asyncio.gather(*(flights.run("fetch:https://a.com/", work) for _ in range(5)))
+
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4, "lock_waits": 0}
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately():
+    """Test distinct keys are not coalesced"""
+    flights = SingleFlight()
+
+    async def work(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    assert await asyncio.gather(flights.run("a", lambda: work(1)), flights.run("b", lambda: work(2))) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_error_reaches_every_caller():
+    """Test a failure is raised to all waiting callers, and the next call retries"""
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(flights.run("k", fail), flights.run("k", fail), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+    async def succeed():
+        return "ok"
+    assert await flights.run("k", succeed) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_work():
+    """Test other callers still get the result when one caller is cancelled"""
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.create_task(flights.run("k", work))
+    second = asyncio.create_task(flights.run("k", work))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == "done"
+
+
+@pytest.mark.asyncio
+async def test_waits_for_lock_held_by_another_worker(mock_db, monkeypatch):
+    """Test a worker waits while another worker holds the Mongo lock, then runs"""
+    monkeypatch.setattr(single_flight, "SINGLE_FLIGHT_POLL", 0.01)
+    collection = mock_db["analysis_locks"]
+    collection.insert_one = AsyncMock(side_effect=[DuplicateKeyError("held"), DuplicateKeyError("held"), None])
+    flights = SingleFlight()
+    flights.attach(mock_db)
+
+    async def work():
+        return "ok"
+
+    assert await flights.run("k", work) == "ok"
+    assert collection.insert_one.await_count == 3
+    assert flights.stats()["lock_waits"] == 1
+    collection.delete_one.assert_awaited_with({"_id": "k", "owner": flights.owner})
+
+
+@pytest.mark.asyncio
+async def test_runs_unlocked_after_wait_limit(mock_db, monkeypatch):
+    """Test a stuck lock only delays work up to SINGLE_FLIGHT_WAIT"""
+    monkeypatch.setattr(single_flight, "SINGLE_FLIGHT_POLL", 0.01)
+    monkeypatch.setattr(single_flight, "SINGLE_FLIGHT_WAIT", 0.05)
+    collection = mock_db["analysis_locks"]
+    collection.insert_one = AsyncMock(side_effect=DuplicateKeyError("held"))
+    flights = SingleFlight()
+    flights.attach(mock_db)
+
+    async def work():
+        return "ok"
+
+    assert await flights.run("k", work) == "ok"
+    # Never held the lock, so never released it
+    assert all(call.args[0].get("owner") is None for call in collection.delete_one.await_args_list)
@@ -0,0 +1,94 @@
+"""
+Unit tests for the incremental analysis stream parser
+"""
+import json
+import httpx
+import pytest
+from analyzer.stream_parser import AnalysisStreamParser
+from analyzer import llm_stream
+
+ANALYSIS = {
+    "summary": "A bakery with \"fresh\" bread, {daily}",
+    "strengths": ["Clear menu"],
+    "opportunities": ["Online orders", "Catering"],
+    "recommendations": [
+        {"key": "ai-chatbot", "workflow_config": {"actions": ["a", "b"]}},
+        {"key": "lead-capture", "priority": "high"}
+    ],
+    "confidence": 0.9
+}
+
+
+def feed_all(text, size):
+    parser = AnalysisStreamParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return parser, events
+
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_events_match_document_for_any_chunking(size):
+    """Test the same events come out however the text is split"""
+    parser, events = feed_all(json.dumps(ANALYSIS, indent=2), size)
+
+    assert parser.done
+    assert events == [
+        ("summary", ANALYSIS["summary"]),
+        ("strengths", ["Clear menu"]),
+        ("opportunities", ["Online orders", "Catering"]),
+        ("recommendation", ANALYSIS["recommendations"][0]),
+        ("recommendation", ANALYSIS["recommendations"][1]),
+        ("confidence", 0.9)
+    ]
+
+
+def test_recommendation_emitted_before_document_ends():
+    """Test a recommendation is available as soon as its object closes"""
+    text = json.dumps(ANALYSIS)
+    cut = text.index('{"key": "lead-capture"')
+    parser = AnalysisStreamParser()
+
+    events = parser.feed(text[:cut])
+
+    assert ("recommendation", ANALYSIS["recommendations"][0]) in events
+    assert not parser.done
+
+
+def test_code_fence_is_ignored():
+    """Test markdown fences around the JSON don't produce events"""
+    parser, events = feed_all("```json\n" + json.dumps({"summary": "ok"}) + "\n```", 3)
+
+    assert parser.done
+    assert events == [("summary", "ok")]
+
+
+def test_malformed_recommendation_is_skipped():
+    """Test a recommendation that isn't an object is not emitted"""
+    parser, events = feed_all('{"recommendations": [{"key": "a"}, "oops", {"key": "b"}]}', 4)
+
+    assert [value["key"] for _, value in events] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_completion_yields_deltas(monkeypatch):
+    """Test content deltas are read from the SSE response until [DONE]"""
+    lines = [
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+        'data: {"choices": [{"delta": {"content": "{\\"sum"}}]}',
+        ': keep-alive',
+        'data: {"choices": [{"delta": {"content": "mary\\": 1}"}}]}',
+        'data: [DONE]',
+        'data: {"choices": [{"delta": {"content": "ignored"}}]}'
+    ]
+
+    def handler(request):
+        assert request.url == "https://llm.test/v1/chat/completions"
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, text="\n\n".join(lines), headers={"content-type": "text/event-stream"})
+
+    monkeypatch.setattr(llm_stream, "LLM_STREAM_BASE_URL", "https://llm.test/v1")
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        deltas = [delta async for delta in llm_stream.stream_chat_completion("gpt-4o", "system", "prompt", client=client)]
+
+    assert "".join(deltas) == '{"summary": 1}'
@@ -0,0 +1,242 @@
+"""
+Unit tests for the workforce scanner
+"""
+import asyncio
+import json
+import time
+import pytest
+import httpx
+from unittest.mock import AsyncMock, patch
+from analyzer import http_client
+from analyzer import workforce_scanner
+from analyzer.parse_pool import ExtractionPool
+from analyzer.mapping_cache import JobMappingCache
+from analyzer.schema import AnalysisContext, WebsiteExtraction
+
+JOBS_HTML = b"<html><body><h2>Customer Support Specialist</h2><p>Help our customers</p></body></html>"
+HIRING_HTML = b"<html><body><div class='careers'><h3>Join our team</h3></div></body></html>"
+
+
+@pytest.fixture(autouse=True)
+def mapping_cache(monkeypatch):
+    """Fresh memory-only job mapping cache per test"""
+    cache = JobMappingCache(version="test")
+    monkeypatch.setattr(workforce_scanner, "job_mapping_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def mock_transport(monkeypatch):
+    """Mock transport keyed by path; unknown paths return 404"""
+    state = {"routes": {}, "requests": []}
+
+    async def dispatch(request):
+        state["requests"].append(request.url.path)
+        route = state["routes"].get(request.url.path)
+        if route is None:
+            return httpx.Response(404, headers={"content-type": "text/html"}, content=b"")
+        return await route(request)
+
+    monkeypatch.setattr(workforce_scanner, "extraction_pool", ExtractionPool(workers=0))
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(dispatch))
+    yield state
+    http_client._client = None
+    http_client._host_slots.clear()
+
+
+def html_route(body, delay=0.0):
+    async def route(request):
+        await asyncio.sleep(delay)
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=body)
+    return route
+
+
+@pytest.mark.asyncio
+async def test_first_careers_page_with_jobs_wins(mock_transport):
+    """Test probes run concurrently and slow ones are cancelled once jobs are found"""
+    mock_transport["routes"]["/careers"] = html_route(JOBS_HTML, delay=5)
+    mock_transport["routes"]["/jobs"] = html_route(JOBS_HTML)
+
+    started = time.monotonic()
+    jobs = await workforce_scanner.extract_job_postings("https://acme.com")
+
+    assert time.monotonic() - started < 1
+    assert jobs == [{
+        "title": "Customer Support Specialist",
+        "description": "Help our customers",
+        "source_url": "https://acme.com/jobs"
+    }]
+
+
+@pytest.mark.asyncio
+async def test_probes_stop_at_deadline(mock_transport, monkeypatch):
+    """Test hanging careers pages give up at the deadline and fall back to the main page"""
+    monkeypatch.setattr(workforce_scanner, "CAREERS_PROBE_DEADLINE", 0.2)
+    for path in workforce_scanner.CAREER_PATHS:
+        mock_transport["routes"][path] = html_route(JOBS_HTML, delay=5)
+    mock_transport["routes"]["/"] = html_route(HIRING_HTML)
+
+    started = time.monotonic()
+    jobs = await workforce_scanner.extract_job_postings("https://acme.com/")
+
+    assert time.monotonic() - started < 1
+    assert [job["title"] for job in jobs] == ["Join our team"]
+
+
+@pytest.mark.asyncio
+async def test_probe_concurrency_is_capped(mock_transport, monkeypatch):
+    """Test no more than CAREERS_PROBE_CONCURRENCY probes are in flight"""
+    monkeypatch.setattr(workforce_scanner, "CAREERS_PROBE_CONCURRENCY", 2)
+    in_flight = {"now": 0, "peak": 0}
+
+    async def counting_route(request):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return httpx.Response(404, headers={"content-type": "text/html"}, content=b"")
+
+    for path in workforce_scanner.CAREER_PATHS:
+        mock_transport["routes"][path] = counting_route
+
+    await workforce_scanner.extract_job_postings("https://acme.com")
+
+    assert in_flight["peak"] == 2
+
+
+@pytest.mark.asyncio
+async def test_context_links_replace_guessed_paths(mock_transport):
+    """Test careers links from the homepage are probed instead of guessed paths"""
+    mock_transport["routes"]["/about/open-roles"] = html_route(JOBS_HTML)
+    context = AnalysisContext(
+        url="https://acme.com",
+        html=HIRING_HTML.decode(),
+        extraction=WebsiteExtraction(url="https://acme.com"),
+        links=[
+            {"text": "Pricing", "href": "https://acme.com/pricing"},
+            {"text": "We're hiring!", "href": "https://acme.com/about/open-roles"}
+        ]
+    )
+
+    jobs = await workforce_scanner.extract_job_postings("https://acme.com", context)
+
+    assert mock_transport["requests"] == ["/about/open-roles"]
+    assert jobs[0]["source_url"] == "https://acme.com/about/open-roles"
+
+
+@pytest.mark.asyncio
+async def test_context_homepage_is_not_refetched(mock_transport, monkeypatch):
+    """Test the hiring-section fallback parses the context HTML"""
+    monkeypatch.setattr(workforce_scanner, "CAREERS_PROBE_DEADLINE", 0.2)
+    context = AnalysisContext(
+        url="https://acme.com",
+        html=HIRING_HTML.decode(),
+        extraction=WebsiteExtraction(url="https://acme.com")
+    )
+
+    jobs = await workforce_scanner.extract_job_postings("https://acme.com", context)
+
+    assert "/" not in mock_transport["requests"]
+    assert [job["title"] for job in jobs] == ["Join our team"]
+
+
+def test_find_careers_links_matches_text_and_path():
+    """Test careers links are found by link text or URL path"""
+    context = AnalysisContext(
+        url="https://acme.com",
+        extraction=WebsiteExtraction(url="https://acme.com"),
+        links=[
+            {"text": "Team", "href": "https://acme.com/team"},
+            {"text": "Work here", "href": "https://acme.com/careers"},
+            {"text": "Join us", "href": "https://boards.example.com/acme"},
+            {"text": "Email", "href": "mailto:jobs@acme.com"}
+        ]
+    )
+
+    assert workforce_scanner.find_careers_links(context) == [
+        "https://acme.com/careers",
+        "https://boards.example.com/acme"
+    ]
+
+
+def agent_mapping(agent, job=None):
+    mapping = {
+        "ai_agent": agent,
+        "secondary_agent": None,
+        "automation_potential": 80,
+        "classification": "Hybrid",
+        "automated_tasks": ["Answer FAQs"],
+        "explanation": "Handles routine work"
+    }
+    if job is not None:
+        mapping["job"] = job
+    return mapping
+
+
+JOBS = [
+    {"title": "Sales Representative", "description": "Close deals"},
+    {"title": "Customer Service Agent", "description": "Answer tickets"},
+    {"title": "Data Entry Clerk", "description": "Type records"}
+]
+
+
+@pytest.mark.asyncio
+async def test_jobs_mapped_in_one_batched_call():
+    """Test all jobs are mapped by a single LLM call, in job order"""
+    response = "```json\n" + json.dumps([agent_mapping("C", 2), agent_mapping("A", 0), agent_mapping("B", 1)]) + "\n```"
+
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        send = mock_chat.return_value.with_model.return_value.send_message = AsyncMock(return_value=response)
+        mappings = await workforce_scanner.map_jobs_to_ai_agents(JOBS)
+
+    assert send.await_count == 1
+    assert [m["ai_agent"] for m in mappings] == ["A", "B", "C"]
+    assert mappings[0]["estimated_annual_salary"] == 55000
+    assert mappings[1]["estimated_annual_salary"] == 38000
+    assert "job" not in mappings[0]
+
+
+@pytest.mark.asyncio
+async def test_malformed_batch_falls_back_to_per_job_calls():
+    """Test a malformed batch response is retried one job at a time"""
+    responses = ["Sorry, I can't do that", *(json.dumps(agent_mapping(f"Agent {i}")) for i in range(3))]
+
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        send = mock_chat.return_value.with_model.return_value.send_message = AsyncMock(side_effect=responses)
+        mappings = await workforce_scanner.map_jobs_to_ai_agents(JOBS)
+
+    assert send.await_count == 4
+    assert sorted(m["ai_agent"] for m in mappings) == ["Agent 0", "Agent 1", "Agent 2"]
+
+
+@pytest.mark.asyncio
+async def test_incomplete_batch_maps_only_missing_jobs():
+    """Test jobs missing or invalid in the batch response are mapped individually"""
+    partial = json.dumps([agent_mapping("A", 0), {"job": 1, "ai_agent": "B"}])
+    responses = [partial, json.dumps(agent_mapping("Single"))]
+
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        send = mock_chat.return_value.with_model.return_value.send_message = AsyncMock(side_effect=responses)
+        mappings = await workforce_scanner.map_jobs_to_ai_agents(JOBS[:2])
+
+    assert send.await_count == 2
+    assert [m["ai_agent"] for m in mappings] == ["A", "Single"]
+
+
+@pytest.mark.asyncio
+async def test_cached_titles_skip_the_llm(mapping_cache):
+    """Test cached job titles are not sent to the LLM and savings are recomputed"""
+    await mapping_cache.put("Sales Rep", {**agent_mapping("Cached"), "monthly_savings": 1})
+
+    with patch('services.llm_gateway.LlmChat') as mock_chat:
+        send = mock_chat.return_value.with_model.return_value.send_message = AsyncMock(
+            return_value=json.dumps(agent_mapping("Fresh"))
+        )
+        mappings = await workforce_scanner.map_jobs_to_ai_agents(JOBS[:2])
+        again = await workforce_scanner.map_job_to_ai_agent("Customer Service Agent", "")
+
+    assert send.await_count == 1
+    assert [m["ai_agent"] for m in mappings] == ["Cached", "Fresh"]
+    assert mappings[0]["monthly_savings"] == int((55000 - 99 * 12) / 12)
+    assert again["ai_agent"] == "Fresh"
+    assert mapping_cache.stats()["hits"] == 2
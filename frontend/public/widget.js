@@ -337,15 +337,28 @@
     // Show typing indicator
     showTyping();
     
-    // Send to API
-    fetch(config.apiUrl + '/chatbot/message', {
+    // Stream the reply where the browser can read response bodies
+    const send = window.ReadableStream && window.TextDecoder ? streamMessage : requestMessage;
+    send(message).catch(error => {
+      console.error('Chat error:', error);
+      hideTyping();
+      addMessage('Sorry, I couldn\'t process your message. Please try again.', 'bot');
+    });
+  }
+
+  function requestBody(message) {
+    return JSON.stringify({
+      website_id: config.websiteId,
+      session_id: sessionId,
+      message: message
+    });
+  }
+
+  function requestMessage(message) {
+    return fetch(config.apiUrl + '/chatbot/message', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({
-        website_id: config.websiteId,
-        session_id: sessionId,
-        message: message
-      })
+      body: requestBody(message)
     })
     .then(res => res.json())
     .then(data => {
@@ -355,14 +368,75 @@
       } else {
         addMessage('Sorry, I encountered an error. Please try again.', 'bot');
       }
-    })
-    .catch(error => {
-      console.error('Chat error:', error);
-      hideTyping();
-      addMessage('Sorry, I couldn\'t process your message. Please try again.', 'bot');
     });
   }
 
+  async function streamMessage(message) {
+    const res = await fetch(config.apiUrl + '/chatbot/stream', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+      body: requestBody(message)
+    });
+    if (!res.ok) {
+      throw new Error('Chat request failed with status ' + res.status);
+    }
+    
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let bubble = null;
+    let entry = null;
+    
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      
+      // Events are separated by a blank line
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        
+        let event = 'message';
+        let data = '';
+        block.split('\n').forEach(line => {
+          if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+          } else if (line.startsWith('data:')) {
+            data += line.slice(5).trim();
+          }
+        });
+        data = data ? JSON.parse(data) : null;
+        
+        if (event === 'token') {
+          if (!bubble) {
+            hideTyping();
+            bubble = addMessage('', 'bot');
+            entry = messageHistory[messageHistory.length - 1];
+          }
+          entry.text += data;
+          bubble.textContent = entry.text;
+          scrollToBottom();
+        } else if (event === 'done') {
+          hideTyping();
+          // The saved reply replaces the streamed text (e.g. the fallback after a failure)
+          const reply = data.response || 'Sorry, I encountered an error. Please try again.';
+          if (bubble) {
+            bubble.textContent = reply;
+            entry.text = reply;
+          } else {
+            addMessage(reply, 'bot');
+          }
+          return;
+        } else if (event === 'error') {
+          throw new Error(data.detail || 'Chat failed');
+        }
+      }
+    }
+    throw new Error('Chat stream ended early');
+  }
+
   function addMessage(text, role) {
     const messagesContainer = document.getElementById('gr8-chatbot-messages');
     const messageDiv = document.createElement('div');
@@ -370,9 +444,15 @@
     messageDiv.innerHTML = `<div class="gr8-message-bubble">${escapeHtml(text)}</div>`;
     
     messagesContainer.appendChild(messageDiv);
-    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    scrollToBottom();
     
     messageHistory.push({ role, text });
+    return messageDiv.firstChild;
+  }
+
+  function scrollToBottom() {
+    const messagesContainer = document.getElementById('gr8-chatbot-messages');
+    messagesContainer.scrollTop = messagesContainer.scrollHeight;
   }
 
   function showTyping() {
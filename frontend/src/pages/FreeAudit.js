@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Sparkles, Mail, Globe, Zap, Check, TrendingUp, Clock, DollarSign, Briefcase, Users } from 'lucide-react';
 import { Button } from '../components/ui/button';
@@ -8,8 +8,7 @@ import { Progress } from '../components/ui/progress';
 import { Badge } from '../components/ui/badge';
 import { Tabs, TabsList, TabsTrigger, TabsContent } from '../components/ui/tabs';
 import { toast } from 'sonner';
-
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+import { newIdempotencyKey, runAnalysisJob } from '../utils/api';
 
 export default function FreeAudit() {
   const navigate = useNavigate();
@@ -19,6 +18,7 @@ export default function FreeAudit() {
   const [isAnalyzing, setIsAnalyzing] = useState(false);
   const [progress, setProgress] = useState(0);
   const [report, setReport] = useState(null);
+  const submission = useRef(null);
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -28,40 +28,36 @@ export default function FreeAudit() {
       return;
     }
 
+    // One idempotency key per submission, so a double submit gets the same job
+    const body = {
+      url: url.trim(),
+      email: email.trim(),
+      name: name.trim() || 'there'
+    };
+    const fingerprint = JSON.stringify(body);
+    if (submission.current?.fingerprint !== fingerprint) {
+      submission.current = { fingerprint, key: newIdempotencyKey() };
+    }
+
     setIsAnalyzing(true);
     setProgress(10);
 
     try {
-      // Simulate progress
-      const progressInterval = setInterval(() => {
-        setProgress((prev) => Math.min(prev + 15, 85));
-      }, 800);
-
-      const response = await fetch(`${BACKEND_URL}/api/reports/generate`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ 
-          url: url.trim(), 
-          email: email.trim(),
-          name: name.trim() || 'there'
-        })
+      // Report is generated by a background job; progress follows its stages
+      const data = await runAnalysisJob('/api/reports/generate', body, {
+        idempotencyKey: submission.current.key,
+        onProgress: (value) => setProgress(Math.max(10, Math.min(value, 95)))
       });
 
-      clearInterval(progressInterval);
-
-      if (!response.ok) {
-        const error = await response.json();
-        throw new Error(error.detail || 'Analysis failed');
-      }
-
-      const data = await response.json();
       setProgress(100);
       setReport(data);
+      submission.current = null;
       toast.success('Report generated! Check your email.');
 
     } catch (error) {
       console.error('Analysis error:', error);
       toast.error(error.message || 'Failed to generate report. Please try again.');
+      submission.current = null;
       setIsAnalyzing(false);
       setProgress(0);
     }
@@ -9,6 +9,7 @@ import { Card, CardHeader, CardContent, CardTitle, CardDescription } from '../co
 import { Badge } from '../components/ui/badge';
 import { toast } from 'sonner';
 import { useAuth } from '../contexts/AuthContext';
+import { streamAnalysis } from '../utils/api';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
@@ -43,34 +44,25 @@ export default function Landing() {
     setProgress(10);
 
     try {
-      // Simulate progress
-      const progressInterval = setInterval(() => {
-        setProgress((prev) => Math.min(prev + 15, 85));
-      }, 500);
-
-      const token = localStorage.getItem('gr8_session_token');
-      const headers = { 'Content-Type': 'application/json' };
-      if (token) {
-        headers['Authorization'] = `Bearer ${token}`;
-      }
-
-      const response = await fetch(`${BACKEND_URL}/api/analyze`, {
-        method: 'POST',
-        headers,
-        credentials: 'include',
-        body: JSON.stringify({ url: url.trim() })
+      // Results render as they stream in: summary first, then each recommendation
+      await streamAnalysis({ url: url.trim() }, (event, data) => {
+        if (event === 'extraction') {
+          setProgress(30);
+          setAnalysis({ business_type: data.business_type, summary: null, strengths: [], opportunities: [], recommendations: [], workforce: null, confidence_score: null, analysis_id: null });
+        } else if (event === 'summary') {
+          setProgress(60);
+          setAnalysis((current) => current && { ...current, ...data });
+        } else if (event === 'strengths' || event === 'opportunities' || event === 'workforce') {
+          setAnalysis((current) => current && { ...current, [event]: data });
+        } else if (event === 'recommendation') {
+          setProgress((value) => Math.min(value + 5, 95));
+          setAnalysis((current) => current && { ...current, recommendations: [...current.recommendations, data] });
+        } else if (event === 'done') {
+          setAnalysis((current) => current && { ...current, ...data });
+        }
       });
 
-      clearInterval(progressInterval);
-
-      if (!response.ok) {
-        const error = await response.json();
-        throw new Error(error.detail || 'Analysis failed');
-      }
-
-      const data = await response.json();
       setProgress(100);
-      setAnalysis(data);
       toast.success('Analysis complete!');
 
     } catch (error) {
@@ -254,7 +246,7 @@ export default function Landing() {
       </section>
 
       {/* Analysis Results */}
-      {analysis && (
+      {analysis?.summary && (
         <section className="py-16 bg-muted/30">
           <div className="mx-auto max-w-7xl px-4 sm:px-6 lg:px-8">
             <div className="mb-12">
@@ -266,7 +258,7 @@ export default function Landing() {
                 <Check className="h-4 w-4 text-success" />
                 Business Type: <span className="font-medium">{analysis.business_type}</span>
                 <span className="mx-2">•</span>
-                Confidence: <span className="font-medium">{Math.round(analysis.confidence_score * 100)}%</span>
+                Confidence: <span className="font-medium">{analysis.confidence_score === null ? '…' : `${Math.round(analysis.confidence_score * 100)}%`}</span>
               </div>
             </div>
 
@@ -315,6 +307,7 @@ export default function Landing() {
                       <Button
                         data-testid="automation-deploy-button"
                         onClick={() => activateAutomation(rec)}
+                        disabled={!analysis.analysis_id}
                         className="w-full transition-colors duration-300"
                       >
                         Activate <ArrowRight className="h-4 w-4 ml-2" />
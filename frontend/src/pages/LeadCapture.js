@@ -146,7 +146,7 @@ export default function LeadCapture() {
                         </div>
                         <div>
                           <Badge variant={lead.score === 'hot' ? 'default' : 'secondary'}>
-                            {lead.score}
+                            {lead.score || 'scoring…'}
                           </Badge>
                         </div>
                       </div>
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Sparkles, Users, Zap, TrendingDown, Check, DollarSign, Bot, Target } from 'lucide-react';
 import { Button } from '../components/ui/button';
@@ -8,7 +8,7 @@ import { Tabs, TabsList, TabsTrigger, TabsContent } from '../components/ui/tabs'
 import { Progress } from '../components/ui/progress';
 import { Badge } from '../components/ui/badge';
 import { toast } from 'sonner';
-import { apiCall } from '../utils/api';
+import { newIdempotencyKey, runAnalysisJob } from '../utils/api';
 
 export default function WorkforceScan() {
   const navigate = useNavigate();
@@ -17,6 +17,7 @@ export default function WorkforceScan() {
   const [progress, setProgress] = useState(0);
   const [automationResults, setAutomationResults] = useState(null);
   const [workforceResults, setWorkforceResults] = useState(null);
+  const submission = useRef(null);
 
   const handleDualScan = async () => {
     if (!url) {
@@ -24,27 +25,23 @@ export default function WorkforceScan() {
       return;
     }
 
+    // One idempotency key per submission, so a double submit gets the same job
+    const body = { url: url.trim() };
+    const fingerprint = JSON.stringify(body);
+    if (submission.current?.fingerprint !== fingerprint) {
+      submission.current = { fingerprint, key: newIdempotencyKey() };
+    }
+
     setScanning(true);
     setProgress(10);
 
     try {
-      const progressInterval = setInterval(() => {
-        setProgress((prev) => Math.min(prev + 12, 85));
-      }, 600);
-
-      const response = await apiCall('/api/analyze', {
-        method: 'POST',
-        body: JSON.stringify({ url: url.trim() })
+      // Scan runs as a background job; progress follows its stages
+      const data = await runAnalysisJob('/api/analyze', body, {
+        idempotencyKey: submission.current.key,
+        onProgress: (value) => setProgress(Math.max(10, Math.min(value, 95)))
       });
 
-      clearInterval(progressInterval);
-
-      if (!response.ok) {
-        const error = await response.json();
-        throw new Error(error.detail || 'Scan failed');
-      }
-
-      const data = await response.json();
       setProgress(100);
       
       // Split into 2 separate reports
@@ -58,9 +55,11 @@ export default function WorkforceScan() {
       setWorkforceResults(data.workforce);
       
       setScanning(false);
+      submission.current = null;
       toast.success('Dual scan complete! View both reports below.');
     } catch (error) {
       setScanning(false);
+      submission.current = null;
       setProgress(0);
       toast.error(error.message || 'Scan failed. Please try again.');
     }
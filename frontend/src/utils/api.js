@@ -33,3 +33,118 @@ export async function apiCall(endpoint, options = {}) {
   
   return response;
 }
+
+/**
+ * Idempotency key for one form submission; pass it to every submit of that form
+ */
+export function newIdempotencyKey() {
+  return window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random()}`;
+}
+
+/**
+ * Submit an analysis job (/api/analyze, /api/reports/generate) and poll it until it finishes
+ * Resolves with the job result; onProgress receives 0-100 as pipeline stages complete.
+ * idempotencyKey should come from the form submission, so a double submit or a retried
+ * POST returns the existing job instead of starting another
+ */
+export async function runAnalysisJob(endpoint, body, { idempotencyKey = newIdempotencyKey(), onProgress, intervalMs = 1500, submitAttempts = 3 } = {}) {
+  let submitted;
+  for (let attempt = 1; ; attempt++) {
+    try {
+      submitted = await apiCall(endpoint, {
+        method: 'POST',
+        headers: { 'Idempotency-Key': idempotencyKey },
+        body: JSON.stringify(body)
+      });
+      if (submitted.status < 500 || attempt >= submitAttempts) {
+        break;
+      }
+    } catch (error) {
+      // Network error: the job may or may not exist, resend with the same key
+      if (attempt >= submitAttempts) {
+        throw error;
+      }
+    }
+    await new Promise((resolve) => setTimeout(resolve, 500 * attempt));
+  }
+
+  if (!submitted.ok) {
+    const error = await submitted.json();
+    throw new Error(error.detail || 'Request failed');
+  }
+
+  const { job_id } = await submitted.json();
+
+  while (true) {
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+
+    const response = await apiCall(`/api/analysis-jobs/${job_id}`);
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.detail || 'Failed to check job status');
+    }
+
+    const job = await response.json();
+    if (onProgress) {
+      onProgress(job.progress);
+    }
+    if (job.status === 'completed') {
+      return job.result;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Analysis failed');
+    }
+  }
+}
+
+/**
+ * Stream a website analysis from /api/analyze/stream
+ * onEvent(event, data) is called for each server-sent event as it arrives
+ * (extraction, summary, strengths, opportunities, recommendation, workforce, done)
+ */
+export async function streamAnalysis(body, onEvent) {
+  const response = await apiCall('/api/analyze/stream', {
+    method: 'POST',
+    headers: { Accept: 'text/event-stream' },
+    body: JSON.stringify(body)
+  });
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.detail || 'Request failed');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) {
+      break;
+    }
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      block.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) {
+          event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          data += line.slice(5).trim();
+        }
+      });
+
+      if (event === 'error') {
+        throw new Error(JSON.parse(data).detail || 'Analysis failed');
+      }
+      onEvent(event, data ? JSON.parse(data) : null);
+    }
+  }
+}